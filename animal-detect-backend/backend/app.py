@@ -1,7 +1,10 @@
 # app.py
+import os
+
 from flask import Flask
 from flask_cors import CORS
 from backend.routes import routes     # your Blueprint
+from backend.constants import SERVING_MODE, STREAM_SERVER_ENABLED
 
 app = Flask(__name__)
 
@@ -17,4 +20,10 @@ CORS(
 )
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5002, debug=True)
+    # Production mode ("process") runs without debugger/reloader (the reloader would start a second worker pool)
+    debug = SERVING_MODE != "process"
+    # With the reloader on, only the reloaded child process serves, so start the stream server there
+    if STREAM_SERVER_ENABLED and (not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+        from backend.streamServer import start_in_thread
+        start_in_thread()
+    app.run(host="0.0.0.0", port=5002, debug=debug, threaded=True)
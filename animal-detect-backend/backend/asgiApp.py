@@ -0,0 +1,162 @@
+"""
+Asyncio (ASGI) serving mode, an alternative to the Flask app in app.py.
+
+Exposes /health, /detect_photo, /mock_detect_photo and /metrics with the same
+request and response contract. An upload waiting for inference is a suspended
+coroutine, not a blocked thread: CPU-bound steps run on a bounded executor, the
+frame goes into the shared micro-batching queue and the handler awaits its
+future. SNS and IoT calls already run on the alert dispatcher's threads, so no
+request waits on them. One process can therefore hold hundreds of uploads.
+The WebSocket stream server runs on the same event loop.
+
+example:
+python -m backend.asgiApp
+hypercorn backend.asgiApp:app --bind 0.0.0.0:5002
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from quart import Quart, Response, g, jsonify, request
+
+import backend.pipeline as pipeline
+from backend.constants import *
+from backend.requestParams import get_camera_id, get_edge_metadata
+from backend.services.fairSchedulerService import FrameSkipped
+from backend.services.imageDecodeService import read_upload
+from backend.services.metricsService import registry, requests_total, span, stage_seconds
+
+app = Quart(__name__)
+# Quart answers 413 above MAX_CONTENT_LENGTH and 408 when the body is not received in time
+app.config["MAX_CONTENT_LENGTH"] = ASGI_MAX_UPLOAD_BYTES
+app.config["BODY_TIMEOUT"] = ASGI_BODY_TIMEOUT_S
+app.config["RESPONSE_TIMEOUT"] = ASGI_REQUEST_TIMEOUT_S + 5
+
+try:
+    from quart_cors import cors
+
+    app = cors(app, allow_origin="http://172.20.10.2:3000", allow_headers=["Content-Type"])
+except ImportError:
+    logging.warning("[AsgiApp] quart_cors not installed; CORS headers are not added.")
+
+cpu_executor = ThreadPoolExecutor(max_workers=ASGI_CPU_THREADS, thread_name_prefix="AsgiCpu")
+in_flight = asyncio.Semaphore(ASGI_MAX_IN_FLIGHT)
+_stream_server = None
+
+
+@app.before_serving
+async def start_stream_server():
+    global _stream_server
+    if STREAM_SERVER_ENABLED:
+        from backend.streamServer import main as stream_main
+
+        _stream_server = asyncio.get_running_loop().create_task(stream_main())
+
+
+@app.after_serving
+async def stop_stream_server():
+    if _stream_server is not None:
+        _stream_server.cancel()
+    cpu_executor.shutdown(wait=False)
+
+
+@app.before_request
+async def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+async def record_request(response):
+    # Same per-endpoint metrics as the Flask routes: whole request time, including the upload
+    if request.endpoint and request.endpoint.endswith("_photo"):
+        stage_seconds.observe(time.perf_counter() - g.request_started, stage="request")
+        requests_total.inc(endpoint=request.endpoint.split(".")[-1], status=response.status_code)
+    return response
+
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    """
+    Health check endpoint to verify the server is running.
+    """
+    return jsonify({'status': 'OK', 'message': 'Animal Detect Backend is running!'}), 200
+
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/detect_photo", methods=["POST"])
+async def handle_photo():
+    with span("upload_read"):
+        files = await request.files
+        form = await request.form
+    if "image" not in files:
+        return jsonify({"error": "No image part"}), 400
+
+    image_bytes = read_upload(files["image"])
+    crop = files.get("crop")
+    camera_id = get_camera_id(form, request.headers)
+    try:
+        edge = get_edge_metadata(form)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    # One deadline covers waiting for an in-flight slot and the detection itself
+    deadline = time.monotonic() + ASGI_REQUEST_TIMEOUT_S
+    try:
+        await asyncio.wait_for(in_flight.acquire(), timeout=ASGI_REQUEST_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        logging.warning(f"[AsgiApp] No in-flight slot for camera {camera_id} within {ASGI_REQUEST_TIMEOUT_S}s")
+        return jsonify({"success": False, "error": "Server busy"}), 503, {"Retry-After": "1"}
+    try:
+        message = await asyncio.wait_for(
+            pipeline.process_frame_async(image_bytes, camera_id,
+                                         crop_bytes=read_upload(crop) if crop else None,
+                                         edge=edge, executor=cpu_executor),
+            timeout=max(0.0, deadline - time.monotonic()),
+        )
+        return jsonify(message), 200
+
+    except FrameSkipped as e:
+        logging.warning("[AsgiApp] %s", e)
+        return jsonify({"success": False, "skipped": True, "error": e.reason}), 429, {"Retry-After": "1"}
+    except asyncio.TimeoutError:
+        logging.error(f"[AsgiApp] Detection for camera {camera_id} timed out after {ASGI_REQUEST_TIMEOUT_S}s")
+        return jsonify({"success": False, "error": "Timeout"}), 504
+    except Exception as e:
+        logging.exception("Rekognition failed: %s", e)
+        return jsonify({"success": False, "error": "Internal error"}), 500
+    finally:
+        in_flight.release()
+
+
+@app.route('/mock_detect_photo', methods=['POST'])
+async def handle_mock_photo():
+    files = await request.files
+    if 'image' not in files:
+        return jsonify({'error': 'No image part'}), 400
+
+    image_file = files['image']
+    # check file extension to check if is .jpg
+    if not image_file.filename.lower().endswith('.jpg'):
+        return jsonify({'error': 'Uploaded file is not a valid JPG image'}), 400
+
+    try:
+        return jsonify(pipeline.process_mock_frame()), 200
+    except IOError:
+        return jsonify({'error': 'Uploaded file is not a valid image'}), 400
+
+
+def main(host="0.0.0.0", port=5002):
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"{host}:{port}"]
+    asyncio.run(serve(app, config))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,154 @@
+import json
+import os
+
 MQTT_CLIENT_ID="LedDeviceClient"
 THING_NAME = "pi_led"
 LED_STATE_TOPIC = "iot/alerts"
-IOT_CORE_ENDPOINT="a2rwg7fxsn0b1i-ats.iot.us-east-1.amazonaws.com"
\ No newline at end of file
+IOT_CORE_ENDPOINT="a2rwg7fxsn0b1i-ats.iot.us-east-1.amazonaws.com"
+
+# Micro-batching inference queue
+BATCH_MAX_SIZE = 8
+BATCH_MAX_WAIT_MS = 20
+
+# Background alert dispatcher
+ALERT_QUEUE_SIZE = 100
+ALERT_MAX_RETRIES = 3
+ALERT_BACKOFF_BASE_S = 0.5
+ALERT_BACKOFF_MAX_S = 8.0
+
+# Detection result cache
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_MAX_ENTRIES_PER_CAMERA = 256
+CACHE_TTL_S = 60
+CACHE_PERCEPTUAL_HASH = False  # near-duplicate hits can hide a small animal entering a static scene
+CACHE_PHASH_MAX_DISTANCE = 4
+DEFAULT_CAMERA_ID = "default"
+# Per-camera state (scheduler, cache, motion gate, alert state, tracker) is keyed by a client-supplied
+# camera id, so each component forgets idle cameras and keeps at most this many
+CAMERA_STATE_MAX_CAMERAS = int(os.getenv("CAMERA_STATE_MAX_CAMERAS", "256"))
+CAMERA_STATE_IDLE_S = 3600
+
+# Motion gate (skip inference on static frames)
+MOTION_GATE_ENABLED = False
+MOTION_GATE_WIDTH = 160
+MOTION_GATE_ALPHA = 0.05
+MOTION_GATE_PIXEL_THRESHOLD = 25
+MOTION_GATE_MIN_CHANGED_FRACTION = 0.005
+
+# Detector backends (models load lazily on first use)
+DETECTOR_WARMUP = False
+YOLO_MODEL_PATH = os.getenv("YOLO_MODEL_PATH")  # local .pt weights
+YOLO_REPO_DIR = os.getenv("YOLO_REPO_DIR")  # local clone of ultralytics/yolov5, avoids any hub download
+YOLO_INPUT_SIZE = 640  # inference size of the hub model; frames are decoded close to it
+DETECTOR_METHOD = os.getenv("DETECTOR_METHOD", "rek")  # backend used by the pipeline, see pipeline.py
+MOCK_DETECTOR_LABELS = ("Tiger",)
+MOCK_DETECTOR_LATENCY_MS = int(os.getenv("MOCK_DETECTOR_LATENCY_MS", "0"))  # simulated inference time
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH")  # YOLOv5 exported with export.py --include onnx
+ONNX_INPUT_SIZE = 640
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = let ONNX Runtime decide
+ONNX_INTER_OP_THREADS = int(os.getenv("ONNX_INTER_OP_THREADS", "0"))
+
+# Serving mode: "thread" runs inference in the Flask process, "process" uses a pool of worker processes
+SERVING_MODE = os.getenv("SERVING_MODE", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))  # 0 = one worker per CPU
+INFERENCE_PIN_CPUS = True
+INFERENCE_WORKER_START_TIMEOUT_S = 120
+INFERENCE_WORKER_TIMEOUT_S = 30
+INFERENCE_WORKER_CHECK_INTERVAL_S = 1.0
+
+# Streaming ingestion (persistent WebSocket per camera)
+STREAM_SERVER_ENABLED = True
+STREAM_PORT = 5003
+STREAM_MAX_QUEUED_FRAMES = 2  # per connection; older frames are dropped first
+STREAM_MAX_FRAME_BYTES = 5 * 1024 * 1024
+
+# Multi-resolution inference ("multires" method wraps another backend)
+MULTIRES_INNER_METHOD = "yolo"
+MULTIRES_COARSE_SIZE = 640  # longest side of the first, downscaled pass
+MULTIRES_TILES = (2, 2)  # tile grid for the full-resolution pass when the first pass finds nothing
+MULTIRES_TILE_OVERLAP = 0.2
+MULTIRES_ROI_MARGIN = 0.15
+MULTIRES_MAX_REGIONS = 4
+MULTIRES_TILE_BILLED = False  # tile empty frames also for billed inner backends (Rekognition, OpenAI)
+MULTIRES_JPEG_QUALITY = 90
+
+# Alert debouncing (per-camera state machine)
+ALERT_CONFIRM_FRAMES = 2  # threat frames needed ...
+ALERT_CONFIRM_WINDOW = 3  # ... among this many recent frames to raise an alert
+ALERT_COOLDOWN_S = 300  # repeat alerts for the same threat are suppressed this long
+ALERT_QUIET_PERIOD_S = 30  # LED goes off after this long without a threat frame
+ALERT_TICK_INTERVAL_S = 1.0
+
+# AWS clients (shared, connection-pooled; see services/cloudClientService.py)
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+AWS_ENDPOINT_URL = os.getenv("AWS_ENDPOINT_URL")  # e.g. a local moto/localstack stub for tests
+CLOUD_MAX_POOL_CONNECTIONS = int(os.getenv("CLOUD_MAX_POOL_CONNECTIONS", str(BATCH_MAX_SIZE * 2)))
+CLOUD_CONNECT_TIMEOUT_S = 2
+CLOUD_READ_TIMEOUT_S = 10
+CLOUD_MAX_ATTEMPTS = 3
+SNS_TOPIC_ARN = os.getenv("SNS_TOPIC_ARN", "arn:aws:sns:us-east-1:408485681593:animal-threat-alert")
+
+# Hedged detection ("hedge" method): cloud backend first, local backend as a hedge
+HEDGE_PRIMARY = "rek"
+HEDGE_SECONDARY = "yolo"
+HEDGE_DELAY_MS = 300  # start the secondary when the primary has not answered by then (0 = start both at once)
+HEDGE_STRATEGY = "first"  # "first" answer wins, or "merge" both answers
+HEDGE_TIMEOUT_S = 5.0  # calls slower than this count as failures for the circuit breaker
+BREAKER_FAILURE_THRESHOLD = 3  # consecutive failures that open a backend's circuit
+BREAKER_RESET_S = 30  # how long an open circuit stays open before one trial call
+
+# Metrics and logging
+METRICS_LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOG_ASYNC = True  # request threads only enqueue log records; a background thread formats and writes them
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "1"))  # keep 1 in N INFO records per call site (1 = all)
+
+# Offline re-scoring CLI (python -m backend.rescore)
+RESCORE_BATCH_SIZE = 16
+RESCORE_DECODE_THREADS = 4
+RESCORE_PREFETCH_BATCHES = 4  # decoded batches held in memory ahead of inference
+
+# Async (ASGI) serving mode, see asgiApp.py
+ASGI_MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # larger requests get 413
+ASGI_BODY_TIMEOUT_S = 15  # time allowed to receive the upload
+ASGI_REQUEST_TIMEOUT_S = 30  # time allowed for a slot and detection before answering 503/504
+ASGI_CPU_THREADS = os.cpu_count() or 4  # executor for decode/motion gate/hashing
+ASGI_MAX_IN_FLIGHT = 512  # concurrent detections; more uploads wait for a slot, within the request timeout
+
+# Per-camera fair scheduling in front of inference
+SCHEDULER_CAMERA_WEIGHTS = json.loads(os.getenv("SCHEDULER_CAMERA_WEIGHTS", "{}"))  # e.g. {"gate": 2.0}
+SCHEDULER_THREAT_BOOST = 4.0  # weight multiplier for a camera with a recent threat
+SCHEDULER_THREAT_BOOST_S = 60  # how long the boost lasts after the last threat frame
+SCHEDULER_QUEUE_DEADLINE_S = 2.0  # frames still queued after this long are skipped (429)
+SCHEDULER_MAX_QUEUE_PER_CAMERA = 32
+
+# Per-camera object tracking (skips inference while a tracked animal stays in view)
+TRACKER_ENABLED = os.getenv("TRACKER_ENABLED", "1") == "1"
+TRACKER_DETECT_EVERY = 5  # run the detector at least once every N frames of a camera
+TRACKER_IOU_THRESHOLD = 0.3
+TRACKER_MAX_CENTROID_DISTANCE = 0.5  # fraction of the track box diagonal
+TRACKER_MAX_MISSES = 2
+TRACKER_CONFIDENCE_DECAY = 0.9  # per predicted frame
+TRACKER_MIN_CONFIDENCE = 0.4
+TRACKER_VELOCITY_SMOOTHING = 0.5
+TRACKER_MAX_IDLE_S = 5
+
+# Local detection event store (SQLite, WAL mode)
+# Off unless configured, so no database lands in whatever directory the server starts from;
+# point it at a data directory, e.g. EVENT_STORE_PATH=/var/lib/animal-detect/events.db
+EVENT_STORE_PATH = os.getenv("EVENT_STORE_PATH") or None
+EVENT_STORE_BATCH_SIZE = 256
+EVENT_STORE_FLUSH_INTERVAL_S = 0.5
+EVENT_STORE_QUEUE_SIZE = 10000
+EVENT_STORE_RETENTION_DAYS = 90
+EVENT_STORE_PURGE_INTERVAL_S = 3600
+EVENT_STORE_RECORD_SAFE = False  # True also stores a row for every frame without a threat
+EVENT_STORE_PAGE_SIZE = 100
+EVENT_STORE_MAX_PAGE_SIZE = 1000
+
+# MQTT payloads and LED shadow updates (MessagePublish)
+MQTT_PAYLOAD_ENCODING = os.getenv("MQTT_PAYLOAD_ENCODING", "json")  # "json", "msgpack" or "cbor"
+MQTT_SHADOW_MIN_INTERVAL_S = 1.0  # shadow changes closer together than this are coalesced
+MQTT_SHADOW_RETRY_BASE_S = 0.5  # backoff for deferred shadow updates that failed
+MQTT_SHADOW_RETRY_MAX_S = 30
+MQTT_ALERT_ID_HISTORY = 256  # published alert IDs remembered so dispatcher retries do not publish twice
+MQTT_SUMMARY_INTERVAL_S = 30  # safe frames are reported in one summary (and heartbeat) per interval
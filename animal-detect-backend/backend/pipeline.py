@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import threading
+
+import backend.services.snsService as sns
+import backend.services.rekognition as rk
+import backend.services.messagePublishService as mpub
+from backend.services.batchInferenceService import BatchInference
+from backend.services.inferenceWorkerPool import InferenceWorkerPool
+from backend.services.alertDispatchService import build_alert_dispatcher
+from backend.services.resultCacheService import DetectionCache
+from backend.services.motionGateService import MotionGate
+from backend.services.alertStateService import AlertStateMachine
+from backend.services.trackerService import ObjectTracker
+from backend.services.eventStoreService import EventStore
+from backend.threat_labels import THREAT_LABELS, ThreatProfiles, threat_taxonomy
+from backend.services.metricsService import registry, frames_total, span
+from backend.services.loggingService import setup_async_logging
+from backend.constants import DEFAULT_CAMERA_ID, DETECTOR_METHOD, DETECTOR_WARMUP, LOG_ASYNC, SERVING_MODE
+
+
+# Shared detection pipeline used by the HTTP routes and the streaming server.
+
+# DETECTOR_METHOD: "rek" for AWS Rekognition, "yolo" for YOLOv5, "onnx" for YOLOv5 on ONNX Runtime,
+# "multires" (two-pass around MULTIRES_INNER_METHOD), "hedge" (HEDGE_PRIMARY with
+# HEDGE_SECONDARY as a fallback), "openai" or "mock"
+METHOD = DETECTOR_METHOD
+
+# Every server (app.py, asgiApp.py, streamServer.py) imports this module before logging anything
+logging.basicConfig(level=logging.INFO)
+if LOG_ASYNC:
+    # Request threads only enqueue log records; a background thread writes them
+    setup_async_logging()
+
+image_recognition = rk.ImageDetection(method=METHOD)
+if SERVING_MODE == "process":
+    # Each worker process loads its own model; this process only ships image bytes to them
+    inference_queue = InferenceWorkerPool(METHOD)
+else:
+    if DETECTOR_WARMUP:
+        # Load the model in the background so the server starts accepting requests right away
+        threading.Thread(target=image_recognition.warmup, name="DetectorWarmup", daemon=True).start()
+    inference_queue = BatchInference(image_recognition)
+detection_cache = DetectionCache()
+motion_gate = MotionGate()
+# Follows threat boxes between frames so the detector only runs every TRACKER_DETECT_EVERY frames
+object_tracker = ObjectTracker()
+# Which canonical threats each camera alerts on (reloaded when THREAT_PROFILES_PATH changes)
+threat_profiles = ThreatProfiles()
+messagePublisher = mpub.MessagePublish()
+alert_dispatcher = build_alert_dispatcher(messagePublisher, sns.publish_threat_alert)
+# Only alert state transitions (confirmed threat / all clear) reach SNS and MQTT
+alert_state = AlertStateMachine(alert_dispatcher.dispatch)
+# Queryable history of detections; written in batches by a background thread
+event_store = EventStore()
+
+
+def collect_metrics():
+    """
+    Gauges for /metrics taken from the stats the pipeline components already keep.
+    """
+    inference = inference_queue.stats()
+    cache = detection_cache.stats()
+    tracker = object_tracker.stats()
+    alerts = alert_dispatcher.metrics()
+    events = event_store.stats()
+    mqtt = messagePublisher.stats()
+    return [
+        ("animal_detect_inference_queue_depth", "Frames waiting for the inference queue.",
+         [({}, inference["queue_depth"])]),
+        ("animal_detect_inference_batches", "Inference batches run so far.", [({}, inference["total_batches"])]),
+        ("animal_detect_camera_queue_depth", "Frames waiting for inference per camera.",
+         [({"camera": camera_id}, camera["queue_depth"]) for camera_id, camera in inference["cameras"].items()]),
+        ("animal_detect_camera_shed", "Frames shed by the scheduler per camera and reason.",
+         [({"camera": camera_id, "reason": reason}, count)
+          for camera_id, camera in inference["cameras"].items() for reason, count in camera["shed"].items()]),
+        ("animal_detect_cache_lookups", "Detection cache lookups by result.",
+         [({"result": key}, cache[key]) for key in ("exact_hits", "perceptual_hits", "misses")]),
+        ("animal_detect_tracked_frames", "Frames answered by the tracker without running the detector.",
+         [({"camera": camera_id}, camera["tracked_frames"]) for camera_id, camera in tracker["cameras"].items()]),
+        ("animal_detect_active_tracks", "Threat tracks currently followed per camera.",
+         [({"camera": camera_id}, len(camera["tracks"])) for camera_id, camera in tracker["cameras"].items()]),
+        ("animal_detect_alerts", "Alert deliveries per sink and outcome.",
+         [({"sink": sink, "outcome": key}, metrics[key])
+          for sink, metrics in alerts.items() for key in ("sent", "failed", "retries", "dropped")]),
+        ("animal_detect_alert_queue_depth", "Alerts waiting per sink.",
+         [({"sink": sink}, metrics["queue_depth"]) for sink, metrics in alerts.items()]),
+        ("animal_detect_mqtt", "MQTT messages and LED shadow updates by kind.",
+         [({"kind": key}, mqtt[key]) for key in ("published", "republish_skipped", "summaries", "safe_batched",
+                                                 "shadow_updates", "shadow_skipped", "shadow_coalesced",
+                                                 "shadow_retries")]),
+        ("animal_detect_event_store", "Detection events by outcome in the event store writer.",
+         [({"outcome": key}, events[key]) for key in ("written", "dropped", "failed")]),
+        ("animal_detect_event_store_queue_depth", "Detection events waiting for the writer.",
+         [({}, events["queue_depth"])]),
+    ]
+
+
+registry.register_collector(collect_metrics)
+
+
+def process_frame(image_bytes, camera_id=DEFAULT_CAMERA_ID, crop_bytes=None, edge=None):
+    """
+    Runs one frame through the motion gate, result cache and detector, and queues the alert.
+    :param image_bytes: The image data in bytes.
+    :param camera_id: Camera the frame came from.
+    :param crop_bytes: Optional JPEG of the region the camera's edge detector flagged; detection runs on it.
+    :param edge: Optional edge detection metadata ({"label", "confidence", "boxes"}) sent by the camera.
+    :return: The response message, e.g. {"success": True, "danger": True, "threat": [...]}.
+    :raises FrameSkipped: When the scheduler shed the frame under overload.
+    """
+    if not _has_motion(image_bytes, camera_id, edge):
+        return _no_motion(camera_id)
+    tracks = object_tracker.predict(camera_id)
+    if tracks is not None:
+        return _finish_tracked(camera_id, tracks)
+
+    # Repeated or near-identical frames reuse the cached result instead of running the model
+    with span("detect"):
+        detected_labels = detection_cache.get_or_compute(
+            crop_bytes or image_bytes, camera_id,
+            lambda detect_bytes: inference_queue.detect_labels(detect_bytes, camera_id=camera_id))
+    return _finish(camera_id, detected_labels, _track(camera_id, detected_labels, crop_bytes))
+
+
+async def process_frame_async(image_bytes, camera_id=DEFAULT_CAMERA_ID, crop_bytes=None, edge=None, executor=None):
+    """
+    process_frame for asyncio servers. The CPU-bound steps (motion gate, perceptual hash)
+    run in the executor, and waiting for inference holds no thread at all: the frame goes
+    into the same micro-batching queue and the coroutine awaits its future.
+    :param executor: concurrent.futures executor for the CPU-bound steps (None = the loop's default).
+    """
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(executor, _has_motion, image_bytes, camera_id, edge):
+        return _no_motion(camera_id)
+    tracks = object_tracker.predict(camera_id)
+    if tracks is not None:
+        return _finish_tracked(camera_id, tracks)
+
+    with span("detect"):
+        detect_bytes = crop_bytes or image_bytes
+        detected_labels, key = await loop.run_in_executor(executor, detection_cache.lookup, detect_bytes, camera_id)
+        if key is not None:
+            detected_labels = await asyncio.wrap_future(inference_queue.submit(detect_bytes, camera_id))
+            detection_cache.store(camera_id, key, detected_labels)
+    return _finish(camera_id, detected_labels, _track(camera_id, detected_labels, crop_bytes))
+
+
+def _has_motion(image_bytes, camera_id, edge):
+    if edge is not None:
+        # The camera already gated this frame, so the backend motion gate is skipped
+        logging.info("[Pipeline] Edge candidate from camera %s: %s", camera_id, edge)
+        return True
+    with span("motion_gate"):
+        return motion_gate.check(image_bytes, camera_id)["motion"]
+
+
+def _no_motion(camera_id):
+    # Nothing moved since the last frames: classify as safe without running the model
+    message = {"success": True, "danger": False}
+    frames_total.inc(outcome="no_motion")
+    messagePublisher.record_safe_frame()
+    alert_state.update(camera_id, [])
+    logging.info("[Pipeline] No motion on camera %s, inference skipped.", camera_id)
+    return message
+
+
+def _track(camera_id, detected_labels, crop_bytes):
+    # Boxes of an edge crop are not in full-frame coordinates, so those frames are not tracked
+    objects = None if crop_bytes else getattr(detected_labels, "objects", None)
+    return object_tracker.update(camera_id, objects)
+
+
+def _finish_tracked(camera_id, tracks):
+    # The tracker still follows the animals: reuse its prediction instead of running the detector
+    logging.info("[Pipeline] Camera %s tracked without inference: %s", camera_id,
+                 [track["track_id"] for track in tracks])
+    return _finish(camera_id, {track["label"] for track in tracks}, tracks, tracked=True)
+
+
+def _finish(camera_id, detected_labels, tracks=(), tracked=False):
+    logging.info("Labels: %s", detected_labels)
+
+    threat = sorted(threat_profiles.filter(camera_id, detected_labels))
+    tracks = [track for track in tracks if track["label"] in threat]
+    if threat:
+        # Frames from this camera jump ahead of other cameras' for a while
+        inference_queue.record_threat(camera_id)
+    motion_gate.record_result(camera_id, threat)
+    alert_state.update(camera_id, threat, tracks=tracks)
+    frames_total.inc(outcome="threat" if threat else "safe")
+    event_store.record(camera_id, threat, severity=threat_taxonomy.severity(threat) if threat else None,
+                       tracks=tracks, tracked=tracked)
+
+    if threat:
+        logging.warning("[Pipeline] Threat detected: %s", threat)
+        message = {"success": True, "danger": True, "threat": threat}
+        if tracks:
+            message["tracks"] = tracks
+    else:
+        message = {"success": True, "danger": False}
+        messagePublisher.record_safe_frame()
+        logging.info("[Pipeline] No threat detected.")
+    if tracked:
+        message["tracked"] = True
+    return message
+
+
+def process_mock_frame():
+    """
+    Fixed-label detection behind /mock_detect_photo: exercises matching and MQTT delivery
+    without a model or SNS e-mails.
+    :return: The response body.
+    """
+    logging.info("Mock mode: Processing image as a valid JPG.")
+    dummy_labels = {'Tiger', 'Elephant'}  # Example dummy labels
+    threat_detected = THREAT_LABELS.intersection(dummy_labels)
+
+    if threat_detected:
+        threat = list(threat_detected)
+        logging.warning(f"[Route] Threat detected (mock): {threat_detected}")
+        threat_message = {"success": True, "danger": True, "threat": threat}
+        alert_dispatcher.dispatch("threat", threat_message, sinks=["mqtt"])
+        return threat_message
+
+    safe_message = {"success": True, "danger": False}
+    alert_dispatcher.dispatch("safe", safe_message, sinks=["mqtt"])
+    return {'threat': []}
@@ -0,0 +1,59 @@
+"""
+Request parsing shared by the Flask routes (routes.py) and the ASGI app (asgiApp.py).
+
+Every function takes the form fields, headers or query values as plain mappings, so this
+module does not depend on either web framework. Malformed input raises ValueError, which
+both apps answer with a 400 and the error message.
+"""
+import json
+from datetime import datetime
+
+from backend.constants import DEFAULT_CAMERA_ID
+
+
+def get_camera_id(form, headers):
+    """
+    Camera identity of an upload: the "camera_id" form field or the X-Camera-Id header.
+    """
+    return form.get("camera_id") or headers.get("X-Camera-Id") or DEFAULT_CAMERA_ID
+
+
+def get_edge_metadata(form):
+    """
+    Detection metadata attached by a camera running in edge mode, or None for plain uploads.
+    :raises ValueError: When edge_confidence or edge_boxes is malformed.
+    """
+    if "edge_confidence" not in form:
+        return None
+    try:
+        confidence = float(form["edge_confidence"])
+    except ValueError:
+        raise ValueError("edge_confidence must be a number.")
+    if not 0.0 <= confidence <= 1.0:
+        raise ValueError("edge_confidence must be between 0 and 1.")
+    try:
+        boxes = json.loads(form.get("edge_boxes") or "[]")
+    except ValueError:
+        raise ValueError("edge_boxes must be JSON.")
+    if not isinstance(boxes, list) or not all(
+            isinstance(box, list) and len(box) == 4
+            and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in box)
+            for box in boxes):
+        raise ValueError("edge_boxes must be a list of [x1, y1, x2, y2] boxes.")
+    return {"label": form.get("edge_label") or None, "confidence": confidence, "boxes": boxes}
+
+
+def parse_time(value):
+    """
+    Epoch seconds or an ISO 8601 timestamp from a query parameter; None when absent.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}'; use epoch seconds or ISO 8601.")
@@ -0,0 +1,371 @@
+"""
+Offline re-scoring of archived camera footage.
+
+Streams a directory or tarball of JPEGs through decode -> infer -> match and
+writes one row per image to a CSV or Parquet file. Decoding runs on a thread
+pool, inference on batches (one forward pass per batch for YOLO/ONNX), and the
+queues between the stages are bounded, so memory stays flat however large the
+archive is. A manifest records every scored file; re-running the same command
+skips them, so an interrupted run just resumes. Changing the method or the
+threat taxonomy changes the manifest fingerprint and everything is re-scored.
+
+example:
+python -m backend.rescore /data/trailcam/2024-05 --method onnx --output scores.parquet
+python -m backend.rescore footage.tar.gz --method yolo --output scores.csv --workers 2
+
+The camera id of an image is its parent directory name.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.constants import *
+from backend.threat_labels import THREAT_TAXONOMY, threat_taxonomy
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+COLUMNS = ["path", "camera_id", "width", "height", "threat", "danger", "severity",
+           "max_confidence", "labels", "method", "scored_at", "error"]
+_DONE = object()
+_POLL_S = 0.1  # how often blocked stages check whether another stage failed
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def iter_images(source):
+    """
+    Yields (path, key, read) for every image in a directory or a tarball, in a stable order.
+    key identifies this version of the file for the manifest; read() returns its bytes.
+    Tarballs are read as a stream, so compressed archives are never unpacked to disk.
+    """
+    if os.path.isdir(source):
+        for root, dirs, names in os.walk(source):
+            dirs.sort()
+            for name in sorted(names):
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                yield os.path.relpath(path, source), f"{os.path.relpath(path, source)}:{stat.st_size}:{int(stat.st_mtime)}", \
+                    (lambda path=path: _read_file(path))
+        return
+
+    with tarfile.open(source, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile() or not member.name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            # In stream mode a member can only be read before moving on, so read it now
+            data = archive.extractfile(member).read()
+            yield member.name, f"{member.name}:{member.size}:{int(member.mtime)}", (lambda data=data: data)
+
+
+class Manifest:
+    def __init__(self, path, fingerprint):
+        """
+        Append-only JSON-lines record of scored files. Entries from a run with a different
+        fingerprint (method or taxonomy) do not count as scored.
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue    # half-written last line of an interrupted run
+                    if entry.get("fingerprint") == fingerprint:
+                        self.done.add(entry["key"])
+        self._file = open(path, "a")
+
+    def add(self, keys):
+        for key in keys:
+            self._file.write(json.dumps({"key": key, "fingerprint": self.fingerprint}) + "\n")
+            self.done.add(key)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CsvWriter:
+    def __init__(self, path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        """
+        Writes each batch as a row group. Parquet files cannot be appended to, so a
+        resumed run writes a new numbered file next to the first one.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        stem, ext = os.path.splitext(path)
+        part = 1
+        while os.path.exists(path):
+            path = f"{stem}.part{part}{ext}"
+            part += 1
+        self.path = path
+        self._pa = pa
+        self._schema = pa.schema([
+            ("path", pa.string()), ("camera_id", pa.string()), ("width", pa.int32()), ("height", pa.int32()),
+            ("threat", pa.string()), ("danger", pa.bool_()), ("severity", pa.string()),
+            ("max_confidence", pa.float32()), ("labels", pa.string()), ("method", pa.string()),
+            ("scored_at", pa.float64()), ("error", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        if rows:
+            self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def open_writer(path):
+    if path.lower().endswith(".parquet"):
+        try:
+            return ParquetWriter(path)
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow); use a .csv output instead.")
+    return CsvWriter(path)
+
+
+def decode(path, key, read):
+    """
+    Decode stage: reads the file and its header. Pixels are decoded later by the backend,
+    in the batch, so a frame is only held once in memory as JPEG bytes.
+    """
+    from PIL import Image
+
+    try:
+        image_bytes = read()
+        width, height = Image.open(io.BytesIO(image_bytes)).size
+        return {"path": path, "key": key, "bytes": image_bytes, "width": width, "height": height, "error": None}
+    except Exception as e:
+        return {"path": path, "key": key, "bytes": None, "width": None, "height": None, "error": f"decode: {e}"}
+
+
+def match(item, objects, method):
+    """
+    Match stage: turns backend records into one output row.
+    """
+    threats = threat_taxonomy.match_records(objects)
+    confidences = [c for c in threats.values() if c is not None]
+    return {
+        "path": item["path"],
+        "camera_id": os.path.basename(os.path.dirname(item["path"])) or DEFAULT_CAMERA_ID,
+        "width": item["width"],
+        "height": item["height"],
+        "threat": ";".join(sorted(threats)),
+        "danger": bool(threats),
+        "severity": threat_taxonomy.severity(threats),
+        "max_confidence": max(confidences) if confidences else None,
+        "labels": json.dumps([[obj["label"], obj["confidence"]] for obj in objects]),
+        "method": method,
+        "scored_at": time.time(),
+        "error": item["error"],
+    }
+
+
+def fingerprint(method, backend_options):
+    payload = json.dumps({"method": method, "options": backend_options, "taxonomy": THREAT_TAXONOMY},
+                         sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def run(source, output, method, manifest_path=None, batch_size=RESCORE_BATCH_SIZE,
+        decode_threads=RESCORE_DECODE_THREADS, workers=1, prefetch=RESCORE_PREFETCH_BATCHES,
+        backend_options=None, limit=None):
+    """
+    Scores every image under source that the manifest does not list yet.
+    :param workers: Inference threads, each with its own backend instance.
+    :return: Dict of counters for the run.
+    """
+    from backend.services.detectors import create_backend
+
+    backend_options = backend_options or {}
+    manifest = Manifest(manifest_path or output + ".manifest.jsonl", fingerprint(method, backend_options))
+    writer = open_writer(output)
+    backends = [create_backend(method, **backend_options) for _ in range(workers)]
+    counters = {"seen": 0, "skipped": 0, "scored": 0, "threats": 0, "errors": 0}
+    counters_lock = threading.Lock()
+    write_lock = threading.Lock()
+    # Bounded hand-offs between the stages keep at most `prefetch` batches in memory
+    batches = queue.Queue(maxsize=prefetch)
+    # Set when a stage fails, so the other stages stop instead of waiting on each other forever
+    stop = threading.Event()
+    errors = []
+    started = time.perf_counter()
+
+    def fail(error):
+        logging.error(f"[Rescore] {threading.current_thread().name} failed: {error}")
+        errors.append(error)
+        stop.set()
+
+    def hand_off(item):
+        while True:
+            if stop.is_set():
+                raise _Stopped
+            try:
+                batches.put(item, timeout=_POLL_S)
+                return
+            except queue.Full:
+                pass
+
+    def produce():
+        """Reads and decodes in parallel, in order, and groups the results into batches."""
+        try:
+            decode_all()
+        except _Stopped:
+            pass
+        except Exception as e:
+            fail(e)
+        finally:
+            if not stop.is_set():
+                for _ in backends:
+                    hand_off(_DONE)
+
+    def decode_all():
+        with ThreadPoolExecutor(max_workers=decode_threads, thread_name_prefix="RescoreDecode") as pool:
+            pending = []
+            batch = []
+            for path, key, read in iter_images(source):
+                with counters_lock:
+                    counters["seen"] += 1
+                if key in manifest.done:
+                    with counters_lock:
+                        counters["skipped"] += 1
+                    continue
+                if limit is not None and counters["seen"] - counters["skipped"] > limit:
+                    break
+                pending.append(pool.submit(decode, path, key, read))
+                # Keep only a couple of batches of decode work in flight
+                while len(pending) > batch_size * 2:
+                    batch.append(pending.pop(0).result())
+                    if len(batch) == batch_size:
+                        hand_off(batch)
+                        batch = []
+            for future in pending:
+                batch.append(future.result())
+                if len(batch) == batch_size:
+                    hand_off(batch)
+                    batch = []
+            if batch:
+                hand_off(batch)
+
+    def consume(backend):
+        try:
+            consume_batches(backend)
+        except Exception as e:
+            fail(e)
+
+    def consume_batches(backend):
+        while not stop.is_set():
+            try:
+                batch = batches.get(timeout=_POLL_S)
+            except queue.Empty:
+                continue
+            if batch is _DONE:
+                return
+            decoded = [item for item in batch if item["bytes"] is not None]
+            try:
+                results = backend.detect_batch([item["bytes"] for item in decoded])
+            except Exception as e:
+                logging.error(f"[Rescore] Batch failed, scoring one by one: {e}")
+                results = []
+                for item in decoded:
+                    try:
+                        results.append(backend.detect(item["bytes"]))
+                    except Exception as frame_error:
+                        item["error"] = f"infer: {frame_error}"
+                        results.append([])
+            objects_by_key = {item["key"]: objects for item, objects in zip(decoded, results)}
+            rows = [match(item, objects_by_key.get(item["key"], []), method) for item in batch]
+            with write_lock:
+                writer.write(rows)
+                # Only after the rows are on disk: an interrupted run re-scores at most one batch
+                manifest.add(item["key"] for item in batch)
+            with counters_lock:
+                counters["scored"] += len(rows)
+                counters["threats"] += sum(row["danger"] for row in rows)
+                counters["errors"] += sum(row["error"] is not None for row in rows)
+                scored = counters["scored"]
+            elapsed = time.perf_counter() - started
+            logging.info(f"[Rescore] {scored} scored ({scored / elapsed:.1f} images/s), "
+                         f"{counters['skipped']} skipped, {counters['threats']} with threats")
+
+    try:
+        for backend in backends:
+            backend.ensure_loaded()
+        producer = threading.Thread(target=produce, name="RescoreProducer", daemon=True)
+        producer.start()
+        consumers = [threading.Thread(target=consume, args=(backend,), name=f"RescoreInfer-{i}", daemon=True)
+                     for i, backend in enumerate(backends)]
+        for thread in consumers:
+            thread.start()
+        producer.join()
+        for thread in consumers:
+            thread.join()
+    finally:
+        writer.close()
+        manifest.close()
+    if errors:
+        # Rows written before the failure stay in the manifest, so a re-run resumes after them
+        raise errors[0]
+    counters["seconds"] = round(time.perf_counter() - started, 2)
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Directory or tarball (.tar, .tar.gz, ...) of images")
+    parser.add_argument("--output", required=True, help="Result file, .csv or .parquet")
+    parser.add_argument("--method", default=DETECTOR_METHOD, help="Detector backend (see ImageDetection)")
+    parser.add_argument("--backend-options", default="{}", help="JSON keyword arguments for the backend")
+    parser.add_argument("--manifest", help="Manifest path (default: <output>.manifest.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=RESCORE_BATCH_SIZE)
+    parser.add_argument("--decode-threads", type=int, default=RESCORE_DECODE_THREADS)
+    parser.add_argument("--workers", type=int, default=1, help="Inference threads, one backend instance each")
+    parser.add_argument("--limit", type=int, help="Score at most this many new images")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    counters = run(args.source, args.output, args.method, manifest_path=args.manifest,
+                   batch_size=args.batch_size, decode_threads=args.decode_threads, workers=args.workers,
+                   backend_options=json.loads(args.backend_options), limit=args.limit)
+    print(json.dumps(counters))
+
+
+if __name__ == "__main__":
+    main()
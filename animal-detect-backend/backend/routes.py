@@ -1,20 +1,29 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, g, request, jsonify
 import logging
-import base64  # Import base64 for encoding the image
+import time
 # import snsService as sns  # 👈 加在頂部
 
-import backend.services.snsService as sns
-import backend.services.rekognition as rk
-import backend.services.messagePublishService as mpub
+import backend.pipeline as pipeline
+from backend.constants import EVENT_STORE_PAGE_SIZE
+from backend.requestParams import get_camera_id, get_edge_metadata, parse_time
 from backend.threat_labels import * 
+from backend.services.imageDecodeService import read_upload
+from backend.services.fairSchedulerService import FrameSkipped
+from backend.services.metricsService import registry, requests_total, span, stage_seconds
 
 routes = Blueprint('routes', __name__)
 
+@routes.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
 
-METHOD="rek"  # Change this to "rek" for AWS Rekognition or "yolo" for YOLOv5
-
-image_recognition = rk.ImageDetection(method=METHOD)
-messagePublisher = mpub.MessagePublish()
+@routes.after_request
+def record_request(response):
+    # Whole request time, including reading the multipart upload, per endpoint
+    if request.endpoint and request.endpoint.endswith("_photo"):
+        stage_seconds.observe(time.perf_counter() - g.request_started, stage="request")
+        requests_total.inc(endpoint=request.endpoint.split(".")[-1], status=response.status_code)
+    return response
 
 @routes.route('/health', methods=['GET'])
 def health_check():
@@ -23,6 +32,135 @@ def health_check():
     """
     return jsonify({'status': 'OK', 'message': 'Animal Detect Backend is running!'}), 200
 
+@routes.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Stage latency histograms, counters and component gauges in the Prometheus text format.
+    """
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+@routes.route('/inference_stats', methods=['GET'])
+def inference_stats():
+    """
+    Batch size and latency statistics of the micro-batching inference queue.
+    """
+    stats = pipeline.inference_queue.stats()
+    # Backend counters (e.g. multires payload savings) live in the worker processes in "process" mode
+    stats["detector"] = pipeline.image_recognition.backend.stats()
+    return jsonify(stats), 200
+
+@routes.route('/alert_stats', methods=['GET'])
+def alert_stats():
+    """
+    Per-sink delivery metrics of the background alert dispatcher.
+    """
+    return jsonify(pipeline.alert_dispatcher.metrics()), 200
+
+@routes.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """
+    Hit/miss counters of the detection result cache.
+    """
+    return jsonify(pipeline.detection_cache.stats()), 200
+
+@routes.route('/motion_stats', methods=['GET'])
+def motion_stats():
+    """
+    Per-camera counters of the motion gate, including how many inferences it saved.
+    """
+    return jsonify(pipeline.motion_gate.stats()), 200
+
+@routes.route('/tracks', methods=['GET'])
+def tracks():
+    """
+    Threat tracks per camera (track IDs, boxes, dwell time) and how many inferences tracking saved.
+    """
+    return jsonify(pipeline.object_tracker.stats()), 200
+
+@routes.route('/events', methods=['GET'])
+def events():
+    """
+    Stored detection events, newest first, e.g. /events?label=bear&camera_id=3&start=2024-05-01T00:00:00
+    Query parameters: start, end (epoch seconds or ISO 8601), camera_id, label, limit, cursor
+    (the next_cursor of the previous page).
+    """
+    if not pipeline.event_store.enabled:
+        return event_store_disabled()
+    try:
+        page = pipeline.event_store.query(
+            start=parse_time(request.args.get("start")),
+            end=parse_time(request.args.get("end")),
+            camera_id=request.args.get("camera_id"),
+            label=get_label(),
+            limit=request.args.get("limit", EVENT_STORE_PAGE_SIZE, type=int),
+            cursor=request.args.get("cursor"),
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify(page), 200
+
+@routes.route('/events/aggregate', methods=['GET'])
+def events_aggregate():
+    """
+    Stored detection event counts grouped by label, camera, hour or day (the group_by parameter),
+    with the same start, end, camera_id and label filters as /events.
+    """
+    if not pipeline.event_store.enabled:
+        return event_store_disabled()
+    try:
+        groups = pipeline.event_store.aggregate(
+            group_by=request.args.get("group_by", "label"),
+            start=parse_time(request.args.get("start")),
+            end=parse_time(request.args.get("end")),
+            camera_id=request.args.get("camera_id"),
+            label=get_label(),
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify(groups), 200
+
+@routes.route('/threat_profiles', methods=['GET'])
+def threat_profiles():
+    """
+    Threats each camera alerts on; edit THREAT_PROFILES_PATH to change them without a restart.
+    """
+    return jsonify(pipeline.threat_profiles.describe()), 200
+
+@routes.route('/scheduler_stats', methods=['GET'])
+def scheduler_stats():
+    """
+    Per-camera queue depth, weight, threat boost and shed counts of the inference scheduler.
+    """
+    return jsonify(pipeline.inference_queue.stats()["cameras"]), 200
+
+@routes.route('/alert_state', methods=['GET'])
+def alert_state():
+    """
+    Per-camera alert state and how many per-frame messages the debouncing suppressed.
+    """
+    return jsonify(pipeline.alert_state.stats()), 200
+
+def skipped_response(error):
+    """
+    429 answer for a frame the scheduler shed.
+    """
+    response = jsonify({"success": False, "skipped": True, "error": error.reason})
+    response.headers["Retry-After"] = "1"
+    return response, 429
+
+def event_store_disabled():
+    """
+    503 answer for the event endpoints while no EVENT_STORE_PATH is configured.
+    """
+    return jsonify({"success": False, "error": "The event store is disabled; set EVENT_STORE_PATH to enable it."}), 503
+
+def get_label():
+    """
+    The "label" query parameter as a canonical threat, so "bear" or "Grizzly Bear" find events stored as "Bear".
+    """
+    label = request.args.get("label")
+    return threat_taxonomy.canonical(label) or label if label else None
+
 '''
 exmaple:
 with open(image_path, "rb") as image_file:
@@ -31,37 +169,28 @@ with open(image_path, "rb") as image_file:
 '''
 @routes.route("/detect_photo", methods=["POST"])
 def handle_photo():
-    print("Handling")
     if "image" not in request.files:
         return jsonify({"error": "No image part"}), 400
 
-    image_bytes = request.files["image"].read()
+    with span("upload_read"):
+        # Read once; every backend (including OpenAI, which base64-encodes itself) takes these bytes
+        image_bytes = read_upload(request.files["image"])
+        crop = request.files.get("crop")
+        crop_bytes = read_upload(crop) if crop else None
+    camera_id = get_camera_id(request.form, request.headers)
+    try:
+        edge = get_edge_metadata(request.form)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     try:
-        if METHOD =="openai":
-            b64_image = base64.b64encode(request.files["image"].read()).decode("utf-8")
-            detected_labels = image_recognition.detect_labels(b64_image)
-
-        detected_labels = image_recognition.detect_labels(image_bytes)
-        logging.info("Labels: %s", detected_labels)
-
-        threat = list(detected_labels)
-        status = 200
-        message = {}
-
-        if threat:
-            logging.warning("[Route] Threat detected: %s", threat)
-            message = {"success": True, "danger": True, "threat": threat}
-            # use messagePublishService to publish message
-            sns.publish_threat_alert("Warning: A potential threat has been detected nearby. Details: " + str(message))
-            messagePublisher.publish_threat(message)
-            return jsonify(message), status
-        else:
-            message = {"success": True, "danger": False}
-            messagePublisher.publish_safe(message)
-            logging.info("[Route] No threat detected.")
-            return jsonify(message), status
-
-   
+        message = pipeline.process_frame(image_bytes, camera_id, crop_bytes=crop_bytes, edge=edge)
+        return jsonify(message), 200
+
+    except FrameSkipped as e:
+        # Shed under overload: the camera should just send its next frame
+        logging.warning("[Route] %s", e)
+        return skipped_response(e)
+
     except Exception as e:
         logging.exception("Rekognition failed: %s", e)
         return jsonify({"success": False, "error": "Internal error"}), 500
@@ -79,21 +208,7 @@ def handle_mock_photo():
 
     try:
         # Mock response
-        logging.info("Mock mode: Processing image as a valid JPG.")
-        dummy_labels = {'Tiger', 'Elephant'}  # Example dummy labels
-        threat_detected = THREAT_LABELS.intersection(dummy_labels)
-
-        if threat_detected:
-            threat = list(threat_detected)
-            logging.warning(f"[Route] Threat detected (mock): {threat_detected}")
-            threat_message = {"success": True, "danger": True, "threat": threat}
-            messagePublisher.publish_threat(threat_message)
-            return jsonify(threat_message), 200
-            
-        else:
-            safe_message = {"success": True, "danger": False}
-            messagePublisher.publish_safe(safe_message)
-            return jsonify({'threat': []}), 200
+        return jsonify(pipeline.process_mock_frame()), 200
 
     except IOError:
         return jsonify({'error': 'Uploaded file is not a valid image'}), 400
@@ -0,0 +1,176 @@
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+
+from backend.constants import *
+
+
+_STOP = object()
+
+
+class AlertSink:
+    def __init__(self, name, handlers, max_queue_size, max_retries, backoff_base, backoff_max):
+        """
+        One delivery target (SNS, MQTT, ...) with its own bounded queue and worker thread.
+        A single worker per sink keeps alerts for that sink in order, so an
+        "on" shadow update can never overtake a later "off".
+        :param handlers: Dict mapping an event name ("threat", "safe", ...) to a callable(message).
+                         The callable must raise on failure so the alert gets retried.
+        """
+        self.name = name
+        self.handlers = handlers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retries": 0,
+            "dropped": 0,
+            "total_latency_ms": 0.0,
+            "last_latency_ms": 0.0,
+        }
+        self._worker = threading.Thread(target=self._run, name=f"AlertSink-{name}", daemon=True)
+        self._worker.start()
+
+    def offer(self, event, message):
+        """
+        Queues an alert without blocking. Returns False (and counts a drop) if the queue is full.
+        """
+        try:
+            self._queue.put_nowait((event, message, time.monotonic()))
+        except queue.Full:
+            self._count("dropped")
+            logging.warning(f"[AlertDispatcher] Queue for sink '{self.name}' is full, dropping {event} alert")
+            return False
+        self._count("enqueued")
+        return True
+
+    def close(self, timeout=None):
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        delivered = metrics["sent"]
+        metrics["mean_latency_ms"] = metrics.pop("total_latency_ms") / delivered if delivered else 0.0
+        metrics["queue_depth"] = self._queue.qsize()
+        return metrics
+
+    def _count(self, key, amount=1):
+        with self._metrics_lock:
+            self._metrics[key] += amount
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            event, message, enqueued_at = item
+            self._deliver(event, message, enqueued_at)
+
+    def _deliver(self, event, message, enqueued_at):
+        handler = self.handlers[event]
+        for attempt in range(self.max_retries + 1):
+            try:
+                handler(message)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self._count("failed")
+                    logging.error(f"[AlertDispatcher] Sink '{self.name}' gave up on {event} alert after {attempt + 1} attempts: {e}")
+                    return
+                self._count("retries")
+                # Exponential backoff with full jitter
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                logging.warning(f"[AlertDispatcher] Sink '{self.name}' failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+            else:
+                latency_ms = (time.monotonic() - enqueued_at) * 1000
+                with self._metrics_lock:
+                    self._metrics["sent"] += 1
+                    self._metrics["total_latency_ms"] += latency_ms
+                    self._metrics["last_latency_ms"] = latency_ms
+                return
+
+
+class AlertDispatcher:
+    def __init__(self, max_queue_size=ALERT_QUEUE_SIZE, max_retries=ALERT_MAX_RETRIES,
+                 backoff_base=ALERT_BACKOFF_BASE_S, backoff_max=ALERT_BACKOFF_MAX_S):
+        """
+        Background fan-out of alerts to the registered sinks.
+        dispatch() only enqueues, so the request thread never waits on SNS or IoT Core.
+        """
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sinks = {}
+
+    def register_sink(self, name, handlers):
+        """
+        Registers a sink and starts its worker.
+        :param name: Sink name used in metrics, e.g. "sns" or "mqtt".
+        :param handlers: Dict mapping event names to callables taking the message.
+        """
+        if name in self.sinks:
+            raise ValueError(f"Sink '{name}' is already registered.")
+        self.sinks[name] = AlertSink(name, handlers, self.max_queue_size, self.max_retries,
+                                     self.backoff_base, self.backoff_max)
+
+    def dispatch(self, event, message, sinks=None):
+        """
+        Enqueues the message for every sink that handles this event.
+        Sinks get a copy carrying an "alert_id", the same for every sink and every retry, so a
+        sink (or the device receiving the alert) can tell a retried alert from a new one.
+        :param sinks: Optional list of sink names to restrict delivery to.
+        :return: True if every interested sink accepted the message.
+        """
+        message = dict(message, alert_id=message.get("alert_id") or uuid.uuid4().hex)
+        accepted = True
+        for name, sink in self.sinks.items():
+            if sinks is not None and name not in sinks:
+                continue
+            if event in sink.handlers:
+                accepted = sink.offer(event, message) and accepted
+        return accepted
+
+    def metrics(self):
+        """
+        Returns per-sink delivery metrics.
+        """
+        return {name: sink.metrics() for name, sink in self.sinks.items()}
+
+    def close(self, timeout=None):
+        """
+        Stops all sink workers after the alerts already queued are delivered.
+        """
+        for sink in self.sinks.values():
+            sink.close(timeout)
+
+
+def build_alert_dispatcher(message_publisher, sns_publish):
+    """
+    Wires the standard sinks: SNS e-mail for threats, MQTT/shadow for threats, safe frames and all-clears.
+    Dependencies are passed in so tests can use a local broker and a stubbed SNS client.
+    :param message_publisher: A MessagePublish instance.
+    :param sns_publish: A callable like snsService.publish_threat_alert.
+    """
+    dispatcher = AlertDispatcher()
+    dispatcher.register_sink("sns", {
+        "threat": lambda message: sns_publish(
+            "Warning: A potential threat has been detected nearby. Details: " + str(message),
+            raise_errors=True),
+    })
+    dispatcher.register_sink("mqtt", {
+        "threat": lambda message: message_publisher.publish_threat(message, raise_errors=True),
+        "safe": lambda message: message_publisher.publish_safe(message, raise_errors=True),
+        "clear": lambda message: message_publisher.publish_clear(message, raise_errors=True),
+    })
+    return dispatcher
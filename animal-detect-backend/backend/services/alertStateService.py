@@ -0,0 +1,149 @@
+import collections
+import logging
+import threading
+import time
+
+from backend.constants import *
+from backend.services.cameraTableService import CameraTable
+from backend.threat_labels import threat_taxonomy
+
+
+IDLE = "idle"
+PENDING = "pending"
+ALERTING = "alerting"
+
+
+class CameraAlertState:
+    def __init__(self, window):
+        self.state = IDLE
+        self.recent = collections.deque(maxlen=window)   # True for frames with a threat
+        self.labels = set()
+        self.tracks = []        # tracker tracks of the latest threat frame
+        self.last_alert_at = 0.0
+        self.last_threat_at = 0.0
+
+
+class AlertStateMachine:
+    def __init__(self, on_transition, confirm_frames=ALERT_CONFIRM_FRAMES, window=ALERT_CONFIRM_WINDOW,
+                 cooldown_s=ALERT_COOLDOWN_S, quiet_period_s=ALERT_QUIET_PERIOD_S,
+                 tick_interval_s=ALERT_TICK_INTERVAL_S):
+        """
+        Per-camera debouncing of alerts. Instead of publishing every frame, only state
+        transitions are emitted through on_transition(event, message):
+        - "threat" once a threat is seen in confirm_frames of the last `window` frames,
+          again when new threat labels appear, and as a reminder after cooldown_s;
+        - "clear" after quiet_period_s without any threat frame (turns the LED off).
+        A background thread checks quiet periods, so cameras that stop sending
+        frames (e.g. edge mode) still get cleared.
+        """
+        if confirm_frames > window:
+            raise ValueError("confirm_frames cannot be larger than window.")
+        self.on_transition = on_transition
+        self.confirm_frames = confirm_frames
+        self.window = window
+        self.cooldown_s = cooldown_s
+        self.quiet_period_s = quiet_period_s
+        # Only idle cameras are dropped: one still alerting must get its "clear"
+        self._cameras = CameraTable(lambda camera_id: CameraAlertState(self.window),
+                                    can_evict=lambda camera: camera.state == IDLE)
+        self._lock = threading.Lock()
+        self._counters = {"frames": 0, "threat_alerts": 0, "clears": 0, "suppressed": 0}
+        self._ticker = threading.Thread(target=self._tick_loop, args=(tick_interval_s,),
+                                        name="AlertStateTicker", daemon=True)
+        self._ticker.start()
+
+    def update(self, camera_id, threat, now=None, tracks=None):
+        """
+        Feeds one frame's detection result for a camera.
+        :param threat: Iterable of threat labels found in the frame (empty when safe).
+        :param tracks: Optional tracker tracks of the threats, attached to threat alerts.
+        """
+        now = time.monotonic() if now is None else now
+        threat = set(threat)
+        transitions = []
+        with self._lock:
+            self._counters["frames"] += 1
+            camera = self._cameras.get(camera_id, now)
+            camera.recent.append(bool(threat))
+
+            if threat:
+                camera.last_threat_at = now
+                camera.tracks = tracks or []
+                if camera.state == ALERTING:
+                    new_labels = threat - camera.labels
+                    if new_labels or now - camera.last_alert_at >= self.cooldown_s:
+                        transitions.append(self._alert(camera_id, camera, threat, now))
+                    camera.labels |= threat
+                elif sum(camera.recent) >= self.confirm_frames:
+                    camera.labels = set(threat)
+                    transitions.append(self._alert(camera_id, camera, threat, now))
+                else:
+                    camera.state = PENDING
+                    camera.labels |= threat
+            else:
+                transition = self._check_quiet(camera_id, camera, now)
+                if transition:
+                    transitions.append(transition)
+            if not transitions:
+                # A frame that used to produce an SNS/MQTT message but no longer does
+                self._counters["suppressed"] += 1
+
+        for event, message in transitions:
+            self.on_transition(event, message)
+
+    def tick(self, now=None):
+        """
+        Clears cameras whose quiet period has passed, even if they sent no frames.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            transitions = [self._check_quiet(camera_id, camera, now) for camera_id, camera in self._cameras.items()]
+        for transition in transitions:
+            if transition:
+                self.on_transition(*transition)
+
+    def stats(self):
+        """
+        Returns transition counters and the current state of every camera.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["cameras"] = {
+                camera_id: {"state": camera.state, "labels": sorted(camera.labels), "tracks": camera.tracks}
+                for camera_id, camera in self._cameras.items()
+            }
+        return stats
+
+    def _alert(self, camera_id, camera, threat, now):
+        camera.state = ALERTING
+        camera.last_alert_at = now
+        self._counters["threat_alerts"] += 1
+        logging.warning(f"[AlertState] Camera {camera_id}: threat confirmed {sorted(threat)}")
+        message = {"success": True, "danger": True, "threat": sorted(threat),
+                   "severity": threat_taxonomy.severity(threat), "camera_id": camera_id}
+        if camera.tracks:
+            message["tracks"] = camera.tracks
+        return "threat", message
+
+    def _check_quiet(self, camera_id, camera, now):
+        if camera.state == IDLE or now - camera.last_threat_at < self.quiet_period_s:
+            return None
+        was_alerting = camera.state == ALERTING
+        camera.state = IDLE
+        camera.labels = set()
+        camera.tracks = []
+        camera.recent.clear()
+        if not was_alerting:
+            # An unconfirmed threat just fades away; nothing was announced, so nothing to clear
+            return None
+        self._counters["clears"] += 1
+        logging.info(f"[AlertState] Camera {camera_id}: quiet for {self.quiet_period_s}s, clearing alert")
+        return "clear", {"success": True, "danger": False, "camera_id": camera_id}
+
+    def _tick_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logging.error(f"[AlertState] Tick failed: {e}")
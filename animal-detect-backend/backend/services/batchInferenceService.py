@@ -0,0 +1,202 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from backend.constants import *
+from backend.services.metricsService import span
+from backend.services.fairSchedulerService import FairScheduler, FrameSkipped
+
+
+_STOP = object()
+
+
+def _fail_shed_frame(item, error):
+    # The caller may already have cancelled the future (timeout, disconnected client)
+    future = item[1]
+    if future.set_running_or_notify_cancel():
+        future.set_exception(error)
+
+
+def _detect_batch(detector, images):
+    results = detector.detect_labels_batch(images)
+    if len(results) != len(images):
+        # Pairing results with futures would leave the unmatched ones pending until their callers time out
+        raise RuntimeError(f"Detector returned {len(results)} results for {len(images)} frames")
+    return results
+
+
+class BatchInference:
+    # Batch errors that fail every frame at once instead of being retried frame by frame
+    fail_fast_errors = ()
+
+    def __init__(self, detector, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+        """
+        Micro-batching queue in front of an ImageDetection instance.
+        Frames submitted by concurrent requests are collected for up to
+        max_wait_ms (or until max_batch_size frames are waiting) and run
+        through detector.detect_labels_batch() as a single batch.
+        Frames are taken from a per-camera fair scheduler rather than a FIFO, and shed with
+        FrameSkipped when the queue is overloaded (see FairScheduler).
+        :param detector: An object exposing detect_labels_batch(list_of_images), or a list
+                         of them to run one consumer thread per detector on the shared queue.
+        :param max_batch_size: Largest number of frames run in one batch.
+        :param max_wait_ms: How long the first frame of a batch waits for company.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.detectors = detector if isinstance(detector, list) else [detector]
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = FairScheduler(on_shed=_fail_shed_frame)
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = {}
+        self._total_batches = 0
+        self._total_frames = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+        self._last_batch_size = 0
+        self._last_latency = 0.0
+
+        self._workers = []
+        for index, worker_detector in enumerate(self.detectors):
+            worker = threading.Thread(target=self._run, args=(worker_detector,),
+                                      name=f"BatchInference-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logging.info(f"[BatchInference] Started (max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms})")
+
+    def submit(self, image_bytes, camera_id=DEFAULT_CAMERA_ID):
+        """
+        Queues one frame for detection.
+        :return: A Future resolving to the detect_labels() result for this frame, or
+                 failing with FrameSkipped when the scheduler sheds it.
+        """
+        future = Future()
+        try:
+            self._queue.put((image_bytes, future), camera_id, expected_wait_s=self._expected_wait())
+        except FrameSkipped as e:
+            future.set_exception(e)
+        return future
+
+    def detect_labels(self, image_bytes, timeout=None, camera_id=DEFAULT_CAMERA_ID):
+        """
+        Blocking drop-in for ImageDetection.detect_labels that goes through the batch queue.
+        """
+        return self.submit(image_bytes, camera_id).result(timeout)
+
+    def record_threat(self, camera_id):
+        """
+        Gives the camera priority for a while after it saw a threat.
+        """
+        self._queue.record_threat(camera_id)
+
+    def close(self):
+        """
+        Stops the worker threads once the frames already queued are processed.
+        """
+        for _ in self._workers:
+            self._queue.put_control(_STOP)
+        for worker in self._workers:
+            worker.join()
+
+    def stats(self):
+        """
+        Returns batch size and latency statistics collected so far.
+        """
+        with self._stats_lock:
+            batches = self._total_batches
+            return {
+                "total_batches": batches,
+                "total_frames": self._total_frames,
+                "queue_depth": self._queue.qsize(),
+                "mean_batch_size": self._total_frames / batches if batches else 0.0,
+                "last_batch_size": self._last_batch_size,
+                "mean_latency_ms": self._total_latency / batches * 1000 if batches else 0.0,
+                "last_latency_ms": self._last_latency * 1000,
+                "max_latency_ms": self._max_latency * 1000,
+                "batch_sizes": dict(self._batch_sizes),
+                "cameras": self._queue.stats(),
+            }
+
+    def _expected_wait(self):
+        """
+        Time to drain the current queue at the measured batch latency.
+        """
+        with self._stats_lock:
+            if not self._total_batches:
+                return 0.0
+            batch_latency = self._total_latency / self._total_batches
+        batches_ahead = self._queue.qsize() / (self.max_batch_size * len(self.detectors))
+        return batches_ahead * batch_latency
+
+    def _collect(self):
+        """
+        Blocks for the first frame, then gathers more until the batch is full or the window closes.
+        """
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Finish this batch, then stop on the next _collect()
+                self._queue.put_control(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self, detector):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            # Skip frames whose caller already gave up
+            batch = [(image_bytes, future) for image_bytes, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                with span("inference"):
+                    results = _detect_batch(detector, [image_bytes for image_bytes, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except self.fail_fast_errors as e:
+                logging.error(f"[BatchInference] Batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            except Exception as e:
+                logging.error(f"[BatchInference] Batch of {len(batch)} failed, retrying one by one: {e}")
+                # Isolate the bad frame so it does not fail the whole batch
+                for image_bytes, future in batch:
+                    if future.done():
+                        continue
+                    try:
+                        future.set_result(_detect_batch(detector, [image_bytes])[0])
+                    except Exception as frame_error:
+                        future.set_exception(frame_error)
+            latency = time.perf_counter() - start
+            self._record(len(batch), latency)
+
+    def _record(self, batch_size, latency):
+        with self._stats_lock:
+            self._total_batches += 1
+            self._total_frames += batch_size
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+            self._last_batch_size = batch_size
+            self._last_latency = latency
+            self._batch_sizes[batch_size] = self._batch_sizes.get(batch_size, 0) + 1
+        logging.info(f"[BatchInference] Batch size={batch_size} latency={latency * 1000:.1f} ms")
@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+
+from backend.constants import *
+
+
+class CameraTable:
+    def __init__(self, factory, max_cameras=CAMERA_STATE_MAX_CAMERAS, idle_s=CAMERA_STATE_IDLE_S, can_evict=None):
+        """
+        Per-camera state keyed by camera id, bounded in size. Camera ids come from clients
+        (form field or header), so cameras not seen for idle_s are dropped, and beyond
+        max_cameras the least recently seen camera is dropped first (LRU).
+        Not thread-safe: the owning component calls it under its own lock.
+        :param factory: Called with the camera id to create the state of a new camera.
+        :param can_evict: Optional predicate on a camera's state; False keeps the camera even when
+                          idle or over the limit (e.g. frames still queued, an alert not yet cleared).
+        """
+        self.factory = factory
+        self.max_cameras = max(1, max_cameras)
+        self.idle_s = idle_s
+        self.can_evict = can_evict
+        self.evicted = 0
+        self._states = OrderedDict()    # camera_id -> state, least recently seen first
+        self._seen = {}
+
+    def get(self, camera_id, now=None):
+        """
+        Returns the camera's state, creating it if needed, and marks the camera as seen.
+        """
+        now = time.monotonic() if now is None else now
+        state = self._states.get(camera_id)
+        if state is None:
+            state = self._states[camera_id] = self.factory(camera_id)
+        else:
+            self._states.move_to_end(camera_id)
+        self._seen[camera_id] = now
+        self._evict(now, keep=camera_id)
+        return state
+
+    def peek(self, camera_id):
+        """
+        Returns the camera's state, or None, without marking the camera as seen.
+        """
+        return self._states.get(camera_id)
+
+    def pop(self, camera_id):
+        self._seen.pop(camera_id, None)
+        return self._states.pop(camera_id, None)
+
+    def clear(self):
+        self._states.clear()
+        self._seen.clear()
+
+    def items(self):
+        return self._states.items()
+
+    def values(self):
+        return self._states.values()
+
+    def __contains__(self, camera_id):
+        return camera_id in self._states
+
+    def __len__(self):
+        return len(self._states)
+
+    def _evict(self, now, keep):
+        over = len(self._states) - self.max_cameras
+        victims = []
+        for camera_id, state in self._states.items():
+            if over <= 0 and now - self._seen[camera_id] <= self.idle_s:
+                # Cameras after this one were seen more recently
+                break
+            if camera_id != keep and (self.can_evict is None or self.can_evict(state)):
+                victims.append(camera_id)
+                over -= 1
+        for camera_id in victims:
+            self.pop(camera_id)
+        self.evicted += len(victims)
@@ -0,0 +1,66 @@
+import logging
+import threading
+
+from backend.constants import *
+
+
+_clients = {}
+_lock = threading.Lock()
+_session = None
+
+
+def client_config(max_pool_connections=CLOUD_MAX_POOL_CONNECTIONS, region_name=AWS_REGION):
+    """
+    botocore Config shared by every AWS client of the backend.
+    The default pool holds 10 connections, so concurrent Rekognition batch calls and
+    SNS alerts queued up behind each other; the pool is sized to the number of callers
+    instead, connections are kept alive, timeouts are short and retries adapt to throttling.
+    """
+    from botocore.config import Config
+
+    return Config(
+        region_name=region_name,
+        max_pool_connections=max_pool_connections,
+        connect_timeout=CLOUD_CONNECT_TIMEOUT_S,
+        read_timeout=CLOUD_READ_TIMEOUT_S,
+        retries={"mode": "adaptive", "max_attempts": CLOUD_MAX_ATTEMPTS},
+        tcp_keepalive=True,
+    )
+
+
+def get_client(service_name, region_name=AWS_REGION, endpoint_url=AWS_ENDPOINT_URL, **config_options):
+    """
+    Returns the shared client for an AWS service, creating it on first use.
+    Nothing is created or contacted at import time. Clients are thread-safe once built,
+    so one per (service, region, endpoint) is reused by every thread.
+    :param endpoint_url: Optional endpoint override, e.g. a local stub server for tests.
+    :param config_options: Overrides passed to client_config() (e.g. max_pool_connections).
+    """
+    key = (service_name, region_name, endpoint_url, tuple(sorted(config_options.items())))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        if key not in _clients:
+            # boto3's default session is not thread-safe for client creation, so use our own under the lock
+            global _session
+            if _session is None:
+                import boto3
+
+                _session = boto3.session.Session()
+            _clients[key] = _session.client(
+                service_name,
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                config=client_config(region_name=region_name, **config_options),
+            )
+            logging.info(f"[CloudClient] {service_name} client created for {endpoint_url or region_name}")
+        return _clients[key]
+
+
+def reset_clients():
+    """
+    Drops the cached clients (e.g. after changing credentials or the endpoint).
+    """
+    with _lock:
+        _clients.clear()
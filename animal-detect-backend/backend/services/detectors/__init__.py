@@ -0,0 +1,36 @@
+import importlib
+
+
+# Each backend lives in its own module and is only imported when selected,
+# so a "rek" worker never pays for importing torch and vice versa.
+DETECTOR_BACKENDS = {
+    "rek": "backend.services.detectors.rekDetector:RekognitionDetector",
+    "yolo": "backend.services.detectors.yoloDetector:YoloDetector",
+    "onnx": "backend.services.detectors.onnxDetector:OnnxDetector",
+    "openai": "backend.services.detectors.openaiDetector:OpenAIDetector",
+    "mock": "backend.services.detectors.mockDetector:MockDetector",
+    "multires": "backend.services.detectors.multiResolutionDetector:MultiResolutionDetector",
+    "hedge": "backend.services.detectors.hedgedDetector:HedgedDetector",
+}
+
+
+def register_backend(name, target):
+    """
+    Registers a detector backend.
+    :param name: Method name passed to ImageDetection(method=...).
+    :param target: "module.path:ClassName" of a DetectorBackend subclass.
+    """
+    DETECTOR_BACKENDS[name.lower()] = target
+
+
+def create_backend(name, **options):
+    """
+    Imports the backend module for this method and instantiates it. The model itself is not loaded yet.
+    """
+    try:
+        target = DETECTOR_BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Invalid method '{name}'. Choose one of: {', '.join(sorted(DETECTOR_BACKENDS))}.")
+    module_name, class_name = target.split(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(**options)
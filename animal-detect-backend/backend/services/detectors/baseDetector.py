@@ -0,0 +1,80 @@
+import io
+import logging
+import threading
+import time
+
+
+class DetectorBackend:
+    name = "base"
+    billed = False  # True for cloud APIs that charge per call
+
+    def __init__(self):
+        """
+        Base class for detector plugins.
+        Construction is cheap: heavy imports and model loading happen in load(),
+        which runs once, on the first detection or on an explicit warmup().
+        """
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """
+        Imports dependencies and loads the model. Subclasses override this.
+        """
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                self.load()
+                self._loaded = True
+                logging.info(f"[{self.name}] Loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def detect(self, image_bytes):
+        """
+        Detects objects in one image.
+        :return: A list of {'label', 'confidence', 'box'} records; 'box' is None when the backend has no boxes.
+                 Records may also carry 'parents', the label's parent labels nearest first (Rekognition).
+        """
+        self.ensure_loaded()
+        return self._detect(image_bytes)
+
+    def detect_batch(self, images):
+        """
+        Detects objects in several images. Backends that can batch override _detect_batch.
+        :return: One list of records per image, in order.
+        """
+        self.ensure_loaded()
+        return self._detect_batch(images)
+
+    def warmup(self):
+        """
+        Loads the model and runs one inference on a blank frame so the first real request is not slow.
+        """
+        self.ensure_loaded()
+        self._detect_batch([blank_jpeg()])
+
+    def stats(self):
+        """
+        Backend-specific counters; empty unless a backend has something to report.
+        """
+        return {}
+
+    def _detect(self, image_bytes):
+        raise NotImplementedError
+
+    def _detect_batch(self, images):
+        return [self._detect(image_bytes) for image_bytes in images]
+
+
+def blank_jpeg(size=(64, 64)):
+    """
+    Returns a small black JPEG used for warm-up calls.
+    """
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", size).save(buf, format="JPEG")
+    return buf.getvalue()
@@ -0,0 +1,88 @@
+import numpy as np
+
+
+def letterbox(image, new_size=640, pad_value=114, out=None):
+    """
+    Resizes an HxWx3 uint8 image to fit new_size x new_size, keeping the aspect
+    ratio, and pads the rest with pad_value (YOLOv5 convention).
+    :param out: Optional new_size x new_size x 3 uint8 array to fill instead of allocating one.
+    :return: (padded image, scale, (pad_x, pad_y))
+    """
+    from PIL import Image
+
+    height, width = image.shape[:2]
+    scale = min(new_size / height, new_size / width)
+    resized_w, resized_h = round(width * scale), round(height * scale)
+    if (resized_w, resized_h) != (width, height):
+        image = np.asarray(Image.fromarray(image).resize((resized_w, resized_h), Image.BILINEAR))
+
+    pad_x = (new_size - resized_w) // 2
+    pad_y = (new_size - resized_h) // 2
+    padded = np.full((new_size, new_size, 3), pad_value, dtype=np.uint8) if out is None else out
+    if out is not None:
+        out.fill(pad_value)
+    padded[pad_y:pad_y + resized_h, pad_x:pad_x + resized_w] = image
+    return padded, scale, (pad_x, pad_y)
+
+
+def xywh_to_xyxy(boxes):
+    """
+    Converts (center x, center y, width, height) boxes to (x1, y1, x2, y2).
+    """
+    half = boxes[:, 2:4] / 2
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], axis=1)
+
+
+def box_iou(box, boxes):
+    """
+    IoU of one (x1, y1, x2, y2) box against an Nx4 array of boxes.
+    """
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+def pairwise_iou(boxes_a, boxes_b):
+    """
+    IoU matrix between an Nx4 and an Mx4 array of (x1, y1, x2, y2) boxes.
+    """
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    x1 = np.maximum(a[..., 0], b[..., 0])
+    y1 = np.maximum(a[..., 1], b[..., 1])
+    x2 = np.minimum(a[..., 2], b[..., 2])
+    y2 = np.minimum(a[..., 3], b[..., 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return intersection / np.maximum(area_a + area_b - intersection, 1e-9)
+
+
+def nms(boxes, scores, iou_threshold=0.45, class_ids=None, max_det=300):
+    """
+    Greedy non-maximum suppression.
+    When class_ids is given, boxes of different classes never suppress each other.
+    :return: Indices of the kept boxes, highest score first.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    if class_ids is not None:
+        # Shift each class into its own coordinate range so one pass handles all classes
+        offset = (boxes.max() + 1) * class_ids.astype(boxes.dtype)
+        boxes = boxes + offset[:, None]
+
+    order = np.argsort(-scores)
+    keep = []
+    while order.size and len(keep) < max_det:
+        best = order[0]
+        keep.append(best)
+        if order.size == 1:
+            break
+        ious = box_iou(boxes[best], boxes[order[1:]])
+        order = order[1:][ious <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from backend.services.detectors import create_backend
+from backend.services.detectors.baseDetector import DetectorBackend
+from backend.constants import *
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_s=BREAKER_RESET_S):
+        """
+        Stops calling a backend after failure_threshold consecutive failures.
+        After reset_s one trial call is let through; its outcome closes or re-opens the circuit.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_s:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+class HedgedDetector(DetectorBackend):
+    name = "Hedged"
+
+    def __init__(self, primary=HEDGE_PRIMARY, secondary=HEDGE_SECONDARY, hedge_delay_ms=HEDGE_DELAY_MS,
+                 strategy=HEDGE_STRATEGY, timeout_s=HEDGE_TIMEOUT_S,
+                 failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_s=BREAKER_RESET_S):
+        """
+        Runs two backends (typically the cloud one and a local one) so that a slow or
+        throttled backend cannot hold up alerts.
+        The primary is called first; the secondary is started when the primary has not
+        answered within hedge_delay_ms, or right away when the primary failed or its circuit is open.
+        :param strategy: "first" returns the first successful answer; "merge" waits up to
+                         timeout_s for both and combines their records.
+        :param timeout_s: Longest wait for an answer; slower calls count as breaker failures.
+        """
+        super().__init__()
+        if strategy not in ("first", "merge"):
+            raise ValueError(f"Invalid hedge strategy '{strategy}'. Choose 'first' or 'merge'.")
+        self.backends = [(primary, create_backend(primary)), (secondary, create_backend(secondary))]
+        self.billed = any(backend.billed for _, backend in self.backends)
+        self.breakers = {name: CircuitBreaker(failure_threshold, reset_s) for name, _ in self.backends}
+        self.hedge_delay_s = hedge_delay_ms / 1000.0
+        self.strategy = strategy
+        self.timeout_s = timeout_s
+        # Two calls per request; losing calls keep running in the background until they finish
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="Hedged")
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "hedges": 0, "failures": 0,
+                       "wins": {name: 0 for name, _ in self.backends},
+                       "errors": {name: 0 for name, _ in self.backends}}
+
+    def warmup(self):
+        for name, backend in self.backends:
+            try:
+                backend.warmup()
+            except Exception as e:
+                # A backend that cannot load now is simply skipped by its breaker later
+                logging.warning(f"[Hedged] Warm-up of '{name}' failed: {e}")
+
+    def stats(self):
+        """
+        Returns which backend answered how often, how often the hedge fired and the breaker states.
+        """
+        with self._stats_lock:
+            stats = {key: dict(value) if isinstance(value, dict) else value for key, value in self._stats.items()}
+        stats["breakers"] = {
+            name: {"state": breaker.state, "times_opened": breaker.times_opened}
+            for name, breaker in self.breakers.items()
+        }
+        return stats
+
+    def _detect(self, image_bytes):
+        return self._run(lambda backend: backend.detect(image_bytes))
+
+    def _detect_batch(self, images):
+        return self._run(lambda backend: backend.detect_batch(images), batch=True)
+
+    def _run(self, call, batch=False):
+        candidates = [(name, backend) for name, backend in self.backends if self.breakers[name].allow()]
+        if not candidates:
+            # Both circuits are open: still try the local (secondary) backend rather than fail outright
+            candidates = [self.backends[-1]]
+        self._count("requests")
+
+        deadline = time.monotonic() + self.timeout_s
+        running = {}
+        answers = {}
+        errors = []
+        for name, backend in candidates[:len(candidates) if self.strategy == "merge" else 1]:
+            running[self._submit(name, backend, call)] = name
+        candidates = candidates[len(running):]
+
+        while running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # While a hedge is still available, only wait for the hedge delay
+            wait_s = min(self.hedge_delay_s, remaining) if candidates else remaining
+            done, _ = wait(running, timeout=wait_s, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    answers[name] = future.result()
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+            if answers and self.strategy == "first":
+                break
+            if candidates and not answers:
+                # The primary is slow or failed: start the hedge
+                name, backend = candidates.pop(0)
+                self._count("hedges")
+                running[self._submit(name, backend, call)] = name
+
+        if not answers:
+            self._count("failures")
+            raise RuntimeError(f"[Hedged] No backend answered in time ({'; '.join(errors) or 'timeout'}).")
+
+        with self._stats_lock:
+            for name in answers:
+                self._stats["wins"][name] += 1
+        if len(answers) == 1:
+            return next(iter(answers.values()))
+        # Merge: concatenate the records of both backends (per image for batches)
+        results = list(answers.values())
+        if batch:
+            return [sum(per_image, []) for per_image in zip(*results)]
+        return sum(results, [])
+
+    def _submit(self, name, backend, call):
+        breaker = self.breakers[name]
+        started = time.monotonic()
+        future = self.executor.submit(call, backend)
+
+        def record(done):
+            # Every call, including ones that lost the race, feeds its backend's breaker
+            if done.exception() is None and time.monotonic() - started <= self.timeout_s:
+                breaker.record_success()
+                return
+            breaker.record_failure()
+            with self._stats_lock:
+                self._stats["errors"][name] += 1
+
+        future.add_done_callback(record)
+        return future
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
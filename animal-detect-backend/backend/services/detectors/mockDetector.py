@@ -0,0 +1,29 @@
+import time
+
+from backend.services.detectors.baseDetector import DetectorBackend
+from backend.constants import *
+
+
+class MockDetector(DetectorBackend):
+    name = "Mock"
+
+    def __init__(self, labels=MOCK_DETECTOR_LABELS, latency_ms=MOCK_DETECTOR_LATENCY_MS):
+        """
+        Dependency-free backend that reports a fixed set of labels, for local runs and load tests.
+        :param labels: Labels reported for every frame.
+        :param latency_ms: Simulated inference time per call.
+        """
+        super().__init__()
+        self.labels = list(labels)
+        self.latency_ms = latency_ms
+
+    def _detect(self, image_bytes):
+        return self._detect_batch([image_bytes])[0]
+
+    def _detect_batch(self, images):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return [
+            [{'label': label, 'confidence': 1.0, 'box': None} for label in self.labels]
+            for _ in images
+        ]
@@ -0,0 +1,168 @@
+import io
+import logging
+import threading
+
+import numpy as np
+
+from backend.services.detectors import create_backend
+from backend.services.detectors.baseDetector import DetectorBackend
+from backend.services.detectors.boxUtils import nms
+from backend.services.imageDecodeService import open_upright
+from backend.threat_labels import threat_taxonomy
+from backend.constants import *
+
+
+class MultiResolutionDetector(DetectorBackend):
+    name = "MultiResolution"
+
+    def __init__(self, inner=MULTIRES_INNER_METHOD, coarse_size=MULTIRES_COARSE_SIZE,
+                 tiles=MULTIRES_TILES, tile_overlap=MULTIRES_TILE_OVERLAP, roi_margin=MULTIRES_ROI_MARGIN,
+                 max_regions=MULTIRES_MAX_REGIONS, jpeg_quality=MULTIRES_JPEG_QUALITY, iou_threshold=0.45,
+                 tile_billed=MULTIRES_TILE_BILLED):
+        """
+        Two-pass detection around another backend.
+        Pass 1 runs the inner backend on a downscaled copy of the frame. Pass 2
+        re-runs it at full resolution only on the threat regions found in pass 1, or,
+        when pass 1 found nothing on a downscaled frame, on a grid of overlapping
+        tiles so that distant animals still get enough pixels. Boxes from both passes
+        are mapped back to full-frame coordinates and merged with NMS.
+        :param inner: Method name of the wrapped backend ("rek", "yolo", "onnx", ...).
+        :param coarse_size: Longest side in pixels of the pass-1 frame.
+        :param tiles: (columns, rows) of the pass-2 tile grid; None disables tiling.
+        :param tile_overlap: Fraction by which neighbouring tiles overlap.
+        :param roi_margin: Fraction added around each pass-1 box before cropping.
+        :param max_regions: Largest number of pass-2 crops per frame.
+        :param tile_billed: Also tile empty frames when the inner backend is billed per call
+                            (each tile is one more paid request).
+        """
+        super().__init__()
+        self.inner = create_backend(inner)
+        self.billed = self.inner.billed
+        self.coarse_size = coarse_size
+        self.tiles = tiles if tile_billed or not self.billed else None
+        self.tile_overlap = tile_overlap
+        self.roi_margin = roi_margin
+        self.max_regions = max_regions
+        self.jpeg_quality = jpeg_quality
+        self.iou_threshold = iou_threshold
+        self._stats_lock = threading.Lock()
+        self._stats = {"frames": 0, "inner_calls": 0, "original_bytes": 0, "sent_bytes": 0}
+
+    def load(self):
+        self.inner.ensure_loaded()
+
+    def warmup(self):
+        self.inner.warmup()
+
+    def stats(self):
+        """
+        Returns how many payload bytes the two-pass scheme sent compared to sending every full frame.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["saved_bytes"] = stats["original_bytes"] - stats["sent_bytes"]
+        return stats
+
+    def _detect(self, image_bytes):
+        from PIL import Image
+
+        # Everything works on the upright frame (EXIF orientation applied), like the inner backends
+        image, (full_w, full_h) = open_upright(image_bytes)
+
+        # Pass 1: decode straight to a reduced size (JPEG draft mode) and run on that
+        coarse_scale = min(1.0, self.coarse_size / max(full_w, full_h))
+        if coarse_scale < 1.0:
+            coarse_w, coarse_h = round(full_w * coarse_scale), round(full_h * coarse_scale)
+            image, _ = open_upright(image_bytes, (coarse_w, coarse_h))
+            coarse = image.convert("RGB").resize((coarse_w, coarse_h), Image.BILINEAR)
+            coarse_bytes = self._encode(coarse)
+        else:
+            coarse_bytes = image_bytes
+        coarse_objects = self.inner.detect(coarse_bytes)
+        sent_bytes = len(coarse_bytes)
+        inner_calls = 1
+
+        records = []
+        for obj in coarse_objects:
+            box = obj['box']
+            if box is not None:
+                box = [int(v / coarse_scale) for v in box]
+            records.append(dict(obj, box=box))
+
+        # Pass 2: full-resolution crops of the regions of interest, or tiles when nothing was found
+        regions = self._regions(records, full_w, full_h, downscaled=coarse_scale < 1.0)
+        if regions:
+            full = open_upright(image_bytes)[0].convert("RGB")
+            crops = [self._encode(full.crop(tuple(region))) for region in regions]
+            sent_bytes += sum(len(crop) for crop in crops)
+            inner_calls += len(crops)
+            for (x1, y1, _, _), objects in zip(regions, self.inner.detect_batch(crops)):
+                for obj in objects:
+                    box = obj['box']
+                    if box is not None:
+                        box = [box[0] + x1, box[1] + y1, box[2] + x1, box[3] + y1]
+                    records.append(dict(obj, box=box))
+
+        merged = self._merge(records)
+        with self._stats_lock:
+            self._stats["frames"] += 1
+            self._stats["inner_calls"] += inner_calls
+            self._stats["original_bytes"] += len(image_bytes)
+            self._stats["sent_bytes"] += sent_bytes
+        logging.info(f"[MultiResolution] {inner_calls} inner calls sent {sent_bytes} bytes "
+                     f"for a {len(image_bytes)}-byte frame")
+        return merged
+
+    def _regions(self, records, full_w, full_h, downscaled=True):
+        # Only threats are worth a closer look; other labels would cost inner calls for nothing
+        boxes = np.array([obj['box'] for obj in records
+                          if obj['box'] is not None
+                          and threat_taxonomy.canonical(obj['label'], obj.get('parents') or ()) is not None],
+                         dtype=np.float32).reshape(-1, 4)
+        if len(boxes):
+            # Grow each box by the margin (vectorized) and clip it to the frame
+            size = boxes[:, 2:] - boxes[:, :2]
+            boxes[:, :2] -= size * self.roi_margin
+            boxes[:, 2:] += size * self.roi_margin
+            boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, full_w)
+            boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, full_h)
+            # Largest regions first
+            areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+            boxes = boxes[np.argsort(-areas)][:self.max_regions]
+            return [[int(v) for v in box] for box in boxes if box[2] > box[0] and box[3] > box[1]]
+        if records or not self.tiles or not downscaled:
+            # Something was found (labels without boxes, e.g. Rekognition scene labels, already answered
+            # the question), or pass 1 already saw the frame at full resolution
+            return []
+
+        columns, rows = self.tiles
+        tile_w = full_w / (columns - (columns - 1) * self.tile_overlap)
+        tile_h = full_h / (rows - (rows - 1) * self.tile_overlap)
+        xs = np.arange(columns) * tile_w * (1 - self.tile_overlap)
+        ys = np.arange(rows) * tile_h * (1 - self.tile_overlap)
+        return [
+            [int(x), int(y), min(full_w, int(x + tile_w)), min(full_h, int(y + tile_h))]
+            for y in ys for x in xs
+        ][:self.max_regions]
+
+    def _merge(self, records):
+        boxed = [obj for obj in records if obj['box'] is not None]
+        merged = []
+        if boxed:
+            boxes = np.array([obj['box'] for obj in boxed], dtype=np.float32)
+            scores = np.array([obj['confidence'] or 0.0 for obj in boxed], dtype=np.float32)
+            labels = sorted({obj['label'] for obj in boxed})
+            class_ids = np.array([labels.index(obj['label']) for obj in boxed])
+            merged = [boxed[i] for i in nms(boxes, scores, self.iou_threshold, class_ids=class_ids)]
+
+        # Box-less labels: keep the most confident record per label
+        best = {}
+        for obj in records:
+            if obj['box'] is None and (obj['label'] not in best or (obj['confidence'] or 0) > (best[obj['label']]['confidence'] or 0)):
+                best[obj['label']] = obj
+        return merged + list(best.values())
+
+    def _encode(self, image):
+        buf = io.BytesIO()
+        image.save(buf, format="JPEG", quality=self.jpeg_quality)
+        return buf.getvalue()
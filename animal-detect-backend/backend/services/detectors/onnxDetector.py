@@ -0,0 +1,146 @@
+import ast
+import logging
+
+import numpy as np
+
+from backend.services.detectors.baseDetector import DetectorBackend
+from backend.services.detectors.boxUtils import letterbox, nms, xywh_to_xyxy
+from backend.services.imageDecodeService import decode_rgb, reusable_buffer
+from backend.constants import *
+
+
+COCO_NAMES = [
+    'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck', 'boat', 'traffic light',
+    'fire hydrant', 'stop sign', 'parking meter', 'bench', 'bird', 'cat', 'dog', 'horse', 'sheep', 'cow',
+    'elephant', 'bear', 'zebra', 'giraffe', 'backpack', 'umbrella', 'handbag', 'tie', 'suitcase', 'frisbee',
+    'skis', 'snowboard', 'sports ball', 'kite', 'baseball bat', 'baseball glove', 'skateboard', 'surfboard',
+    'tennis racket', 'bottle', 'wine glass', 'cup', 'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple',
+    'sandwich', 'orange', 'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair', 'couch',
+    'potted plant', 'bed', 'dining table', 'toilet', 'tv', 'laptop', 'mouse', 'remote', 'keyboard', 'cell phone',
+    'microwave', 'oven', 'toaster', 'sink', 'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear',
+    'hair drier', 'toothbrush',
+]
+
+
+class OnnxDetector(DetectorBackend):
+    name = "ONNX"
+
+    def __init__(self, model_path=ONNX_MODEL_PATH, input_size=ONNX_INPUT_SIZE,
+                 intra_op_threads=ONNX_INTRA_OP_THREADS, inter_op_threads=ONNX_INTER_OP_THREADS,
+                 conf_threshold=0.25, iou_threshold=0.45, max_det=300):
+        """
+        YOLOv5 exported to ONNX (export.py --include onnx), run with ONNX Runtime on CPU.
+        Pre- and postprocessing are done in NumPy; results use the same
+        {'label', 'confidence', 'box'} records as the YOLO backend.
+        :param model_path: Path to the .onnx file.
+        :param input_size: Square input size the model was exported with.
+        :param intra_op_threads: Threads used inside one operator (0 lets ONNX Runtime decide).
+        :param inter_op_threads: Threads used across independent operators (0 lets ONNX Runtime decide).
+        """
+        super().__init__()
+        self.model_path = model_path
+        self.input_size = input_size
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_det = max_det
+        self.session = None
+        self.input_name = None
+        self.names = COCO_NAMES
+        self.dynamic_batch = False
+
+    def load(self):
+        import onnxruntime as ort
+
+        if not self.model_path:
+            raise ValueError("ONNX model path not set. Set ONNX_MODEL_PATH to an exported YOLOv5 .onnx file.")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.model_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # A symbolic first dimension means the model was exported with --dynamic and can take a batch
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+
+        # YOLOv5 stores its class names in the model metadata
+        names = self.session.get_modelmeta().custom_metadata_map.get("names")
+        if names:
+            names = ast.literal_eval(names)
+            self.names = [names[i] for i in sorted(names)] if isinstance(names, dict) else list(names)
+        logging.info(f"ONNX model loaded from {self.model_path} (dynamic batch: {self.dynamic_batch}).")
+
+    def preprocess(self, images):
+        """
+        Decodes and letterboxes the images into one NCHW float32 batch in [0, 1].
+        The letterbox canvas and the batch tensor are per-thread buffers reused across
+        calls, so a steady stream of frames allocates no new input arrays.
+        :return: (batch, list of (scale, (pad_x, pad_y), (width, height)) per image)
+        """
+        size = self.input_size
+        batch = reusable_buffer("onnx_batch", (len(images), 3, size, size))
+        canvas = reusable_buffer("onnx_canvas", (size, size, 3), np.uint8)
+        meta = []
+        for i, image_bytes in enumerate(images):
+            # The JPEG decoder skips straight to a resolution close to the model input
+            array, original_size = decode_rgb(image_bytes, size)
+            padded, scale, pad = letterbox(array, size, out=canvas)
+            # Account for the draft-mode downscale when mapping boxes back
+            scale *= array.shape[1] / original_size[0]
+            np.multiply(padded.transpose(2, 0, 1), 1 / 255.0, out=batch[i], casting="unsafe")
+            meta.append((scale, pad, original_size))
+        return batch, meta
+
+    def postprocess(self, predictions, meta):
+        """
+        Turns raw (N, 5 + classes) YOLOv5 predictions for one image into detection records.
+        """
+        scale, (pad_x, pad_y), (width, height) = meta
+        predictions = predictions[predictions[:, 4] > self.conf_threshold]
+        if not len(predictions):
+            return []
+
+        class_scores = predictions[:, 5:] * predictions[:, 4:5]
+        class_ids = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_scores)), class_ids]
+        mask = confidences > self.conf_threshold
+        boxes = xywh_to_xyxy(predictions[mask, :4])
+        class_ids = class_ids[mask]
+        confidences = confidences[mask]
+
+        keep = nms(boxes, confidences, self.iou_threshold, class_ids=class_ids, max_det=self.max_det)
+        boxes = boxes[keep]
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / scale, 0, width)
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / scale, 0, height)
+
+        return [
+            {
+                'label': self.names[int(class_id)],
+                'confidence': float(confidence),
+                'box': [int(v) for v in box],
+            }
+            for box, confidence, class_id in zip(boxes, confidences[keep], class_ids[keep])
+        ]
+
+    def _detect(self, image_bytes):
+        return self._detect_batch([image_bytes])[0]
+
+    def _detect_batch(self, images):
+        try:
+            batch, meta = self.preprocess(images)
+            if self.dynamic_batch:
+                outputs = self.session.run(None, {self.input_name: batch})[0]
+            else:
+                outputs = np.concatenate(
+                    [self.session.run(None, {self.input_name: batch[i:i + 1]})[0] for i in range(len(images))])
+            batch_objects = [self.postprocess(outputs[i], meta[i]) for i in range(len(images))]
+            logging.info(f"ONNX detection result: {batch_objects}")
+            return batch_objects
+        except Exception as e:
+            logging.error(f"Error during ONNX detection: {e}")
+            raise
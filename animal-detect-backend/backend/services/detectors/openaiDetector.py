@@ -0,0 +1,67 @@
+import base64
+import logging
+import os
+
+from backend.services.detectors.baseDetector import DetectorBackend
+from backend.threat_labels import threat_taxonomy
+
+
+class OpenAIDetector(DetectorBackend):
+    name = "OpenAI"
+    billed = True
+
+    def __init__(self, model="gpt-4"):
+        """
+        OpenAI Chat API backend: asks for a scene description and looks for threat names in it.
+        """
+        super().__init__()
+        self.model = model
+        self.openai = None
+
+    def load(self):
+        import openai
+
+        openai_api_key = os.getenv("OPENAI_API_KEY")
+        if not openai_api_key:
+            raise ValueError("OpenAI API key not found. Please set it in the .env file.")
+        openai.api_key = openai_api_key
+        self.openai = openai
+        logging.info("OpenAI API initialized.")
+
+    def warmup(self):
+        # Only validate the key; a real call would be billed
+        self.ensure_loaded()
+
+    def describe(self, image_bytes):
+        """
+        Returns the model's text description of the image.
+        :param image_bytes: Raw image bytes, or an already base64-encoded string.
+        """
+        self.ensure_loaded()
+        b64_image = image_bytes if isinstance(image_bytes, str) else base64.b64encode(image_bytes).decode("utf-8")
+        try:
+            # New Chat API call
+            prompt = "Describe the objects and scene in the image."
+
+            response = self.openai.chat.completions.create(
+                model=self.model,  # or "gpt-3.5-turbo"
+                messages=[
+                    {"role": "system", "content": "You are an image analysis assistant."},
+                    {"role": "user", "content": prompt},
+                    {"role": "user","type": "input_image", "image_url": f"data:image/png;base64,{b64_image}"},
+                ],
+                max_tokens=100,
+            )
+            description = response.choices[0].message.content
+            logging.info(f"OpenAI description: {description}")
+            return description
+        except Exception as e:
+            logging.error(f"Error during OpenAI detection: {e}")
+            raise
+
+    def _detect(self, image_bytes):
+        description = self.describe(image_bytes)
+        return [
+            {'label': name, 'confidence': None, 'box': None}
+            for name in threat_taxonomy.match_text(description)
+        ]
@@ -0,0 +1,73 @@
+import logging
+
+from backend.services.detectors.baseDetector import DetectorBackend
+from backend.services.imageDecodeService import decode_rgb
+from backend.constants import *
+
+
+class YoloDetector(DetectorBackend):
+    name = "YOLO"
+
+    def __init__(self, model_name="yolov5n", model_path=YOLO_MODEL_PATH, repo_dir=YOLO_REPO_DIR,
+                 input_size=YOLO_INPUT_SIZE):
+        """
+        Local YOLOv5 backend.
+        :param model_name: Hub model to load when no model_path is given.
+        :param model_path: Optional local .pt weights file.
+        :param repo_dir: Optional local clone of ultralytics/yolov5; when set nothing is downloaded.
+        :param input_size: Inference size; frames are decoded straight to about this resolution.
+        """
+        super().__init__()
+        self.model_name = model_name
+        self.model_path = model_path
+        self.repo_dir = repo_dir
+        self.input_size = input_size
+        self.yolo_model = None
+
+    def load(self):
+        import torch
+
+        if self.repo_dir:
+            # Fully offline: code and weights both come from disk
+            if self.model_path:
+                self.yolo_model = torch.hub.load(self.repo_dir, 'custom', path=self.model_path, source='local')
+            else:
+                self.yolo_model = torch.hub.load(self.repo_dir, self.model_name, pretrained=True, source='local')
+        elif self.model_path:
+            self.yolo_model = torch.hub.load('ultralytics/yolov5', 'custom', path=self.model_path)
+        else:
+            self.yolo_model = torch.hub.load('ultralytics/yolov5', self.model_name, pretrained=True)
+        logging.info("YOLOv5 model loaded.")
+
+    def _detect(self, image_bytes):
+        return self._detect_batch([image_bytes])[0]
+
+    def _detect_batch(self, images):
+        try:
+            # Decode straight to about the model's input size and hand the model RGB arrays,
+            # instead of full-size PIL images it would convert and shrink itself
+            decoded = [decode_rgb(image_bytes, self.input_size) for image_bytes in images]
+
+            # Run YOLO detection on the whole batch
+            results = self.yolo_model([array for array, _ in decoded], size=self.input_size)
+
+            batch_objects = []
+            for xyxy, (array, (width, height)) in zip(results.xyxy, decoded):
+                # Boxes are in decoded-array pixels; map them back to the original frame
+                scale_x, scale_y = width / array.shape[1], height / array.shape[0]
+                detected_objects = []
+                for *box, conf, cls in xyxy:
+                    x1, y1, x2, y2 = box
+                    label = self.yolo_model.names[int(cls)]
+                    detected_objects.append({
+                        'label': label,
+                        'confidence': float(conf),
+                        'box': [int(x1 * scale_x), int(y1 * scale_y), int(x2 * scale_x), int(y2 * scale_y)]
+                    })
+
+                logging.info(f"YOLO detection result: {detected_objects}")
+                batch_objects.append(detected_objects)
+            return batch_objects
+        except Exception as e:
+            logging.error(f"Error during YOLO detection: {e}")
+            raise
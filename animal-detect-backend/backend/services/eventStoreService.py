@@ -0,0 +1,315 @@
+import atexit
+import base64
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from backend.constants import *
+
+
+_STOP = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    camera_id TEXT NOT NULL,
+    danger INTEGER NOT NULL,
+    labels TEXT NOT NULL,
+    severity TEXT,
+    tracked INTEGER NOT NULL DEFAULT 0,
+    tracks TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_camera_ts ON events (camera_id, ts);
+CREATE TABLE IF NOT EXISTS event_labels (
+    event_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    camera_id TEXT NOT NULL,
+    label TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS event_labels_label_ts ON event_labels (label, ts);
+CREATE INDEX IF NOT EXISTS event_labels_label_camera_ts ON event_labels (label, camera_id, ts);
+CREATE INDEX IF NOT EXISTS event_labels_ts ON event_labels (ts);
+"""
+
+# Bucket sizes in seconds for aggregate(); "label" and "camera" group on columns instead
+_TIME_BUCKETS = {"hour": 3600, "day": 86400}
+
+
+class EventStore:
+    def __init__(self, path=EVENT_STORE_PATH, batch_size=EVENT_STORE_BATCH_SIZE,
+                 flush_interval_s=EVENT_STORE_FLUSH_INTERVAL_S, max_queue_size=EVENT_STORE_QUEUE_SIZE,
+                 retention_days=EVENT_STORE_RETENTION_DAYS, record_safe=EVENT_STORE_RECORD_SAFE):
+        """
+        Local detection event log in SQLite (WAL mode), indexed by time, camera and label.
+        record() only enqueues; one background writer inserts events in batches of up to
+        batch_size (or whatever arrived within flush_interval_s) in a single transaction, so
+        the detection path never waits on disk. Readers use their own connections and, thanks
+        to WAL, are not blocked by the writer.
+        :param path: SQLite database file; None disables the store.
+        :param batch_size: Largest number of events written in one transaction.
+        :param flush_interval_s: How long the writer waits to fill a batch.
+        :param max_queue_size: Events waiting for the writer before new ones are dropped.
+        :param retention_days: Events older than this are deleted; None keeps everything.
+        :param record_safe: Also record frames without a threat (one row per analysed frame).
+        """
+        self.path = path
+        self.enabled = path is not None
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.retention_days = retention_days
+        self.record_safe = record_safe
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._readers = threading.local()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
+        if not self.enabled:
+            return
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        connection.executescript(_SCHEMA)
+        connection.close()
+        self._writer = threading.Thread(target=self._run, name="EventStoreWriter", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+        logging.info(f"[EventStore] Recording detection events to {path}")
+
+    def record(self, camera_id, threat, severity=None, tracks=None, tracked=False, ts=None):
+        """
+        Queues one detection result without blocking. Returns False (and counts a drop) when the writer is behind.
+        :param threat: Canonical threat labels found in the frame.
+        :param tracks: Optional tracker tracks of the threats.
+        :param tracked: True when the result came from the tracker instead of the detector.
+        """
+        if not self.enabled or not (threat or self.record_safe):
+            return False
+        event = (time.time() if ts is None else ts, camera_id, sorted(threat), severity, tracks or [], tracked)
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    def query(self, start=None, end=None, camera_id=None, label=None, limit=EVENT_STORE_PAGE_SIZE, cursor=None):
+        """
+        Events in a time range, newest first, optionally for one camera and/or one label.
+        :param start: Earliest timestamp (epoch seconds, inclusive).
+        :param end: Latest timestamp (epoch seconds, exclusive).
+        :param limit: Page size, capped at EVENT_STORE_MAX_PAGE_SIZE.
+        :param cursor: next_cursor of the previous page.
+        :return: {"events": [...], "next_cursor": str or None}
+        """
+        limit = max(1, min(int(limit), EVENT_STORE_MAX_PAGE_SIZE))
+        # Label queries filter and sort on event_labels, whose (label, camera_id, ts) index covers them
+        table = "e" if label is None else "l"
+        where, params = self._filters(table, start, end, camera_id, label)
+        if cursor:
+            # Keyset pagination: continue strictly after the last (ts, id) of the previous page
+            cursor_ts, cursor_id = _decode_cursor(cursor)
+            where.append(f"({table}.ts < ? OR ({table}.ts = ? AND e.id < ?))")
+            params += [cursor_ts, cursor_ts, cursor_id]
+        sql = (f"SELECT e.id, e.ts, e.camera_id, e.danger, e.labels, e.severity, e.tracked, e.tracks "
+               f"FROM {self._source(label)} WHERE {' AND '.join(where) or '1'} "
+               f"ORDER BY {table}.ts DESC, e.id DESC LIMIT ?")
+        rows = self._reader().execute(sql, params + [limit + 1]).fetchall()
+
+        events = [
+            {
+                "id": row[0],
+                "ts": row[1],
+                "camera_id": row[2],
+                "danger": bool(row[3]),
+                "labels": json.loads(row[4]),
+                "severity": row[5],
+                "tracked": bool(row[6]),
+                "tracks": json.loads(row[7]) if row[7] else [],
+            }
+            for row in rows[:limit]
+        ]
+        next_cursor = _encode_cursor(events[-1]["ts"], events[-1]["id"]) if len(rows) > limit else None
+        return {"events": events, "next_cursor": next_cursor}
+
+    def aggregate(self, group_by="label", start=None, end=None, camera_id=None, label=None):
+        """
+        Event counts in a time range grouped by "label", "camera", "hour" or "day".
+        :return: List of {"key", "events", "first_ts", "last_ts"}, largest group first for
+                 label/camera and in time order for hour/day.
+        """
+        if group_by == "label":
+            # Counted per label row: an event with two threats counts once for each.
+            # event_labels repeats ts and camera_id, so this needs no join at all
+            table, source = "l", "event_labels l"
+            key = "l.label"
+        elif group_by == "camera":
+            table, source = ("e", "events e") if label is None else ("l", "event_labels l")
+            key = f"{table}.camera_id"
+        elif group_by in _TIME_BUCKETS:
+            table, source = ("e", "events e") if label is None else ("l", "event_labels l")
+            key = f"CAST({table}.ts / {_TIME_BUCKETS[group_by]} AS INTEGER) * {_TIME_BUCKETS[group_by]}"
+        else:
+            raise ValueError(f"Cannot group events by '{group_by}'; use label, camera, hour or day.")
+        where, params = self._filters(table, start, end, camera_id, label)
+        order = "key" if group_by in _TIME_BUCKETS else "events DESC"
+        sql = (f"SELECT {key} AS key, COUNT(*) AS events, MIN({table}.ts), MAX({table}.ts) FROM {source} "
+               f"WHERE {' AND '.join(where) or '1'} GROUP BY key ORDER BY {order}")
+        return [
+            {"key": row[0], "events": row[1], "first_ts": row[2], "last_ts": row[3]}
+            for row in self._reader().execute(sql, params).fetchall()
+        ]
+
+    def flush(self, timeout=None):
+        """
+        Blocks until every event queued so far is written.
+        """
+        if self.enabled:
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait(timeout)
+
+    def close(self, timeout=None):
+        """
+        Writes the queued events and stops the writer.
+        """
+        if self.enabled and self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout)
+
+    def stats(self):
+        """
+        Returns writer counters and the queue depth.
+        """
+        with self._metrics_lock:
+            stats = dict(self._metrics)
+        stats["enabled"] = self.enabled
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self):
+        # One read connection per request thread; sqlite3 connections are not shared across threads
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            if not self.enabled:
+                raise RuntimeError("The event store is disabled (EVENT_STORE_PATH is not set).")
+            connection = self._readers.connection = self._connect()
+        return connection
+
+    @staticmethod
+    def _source(label):
+        if label is None:
+            return "events e"
+        return "events e JOIN event_labels l ON l.event_id = e.id"
+
+    @staticmethod
+    def _filters(table, start, end, camera_id, label):
+        where, params = [], []
+        if start is not None:
+            where.append(f"{table}.ts >= ?")
+            params.append(float(start))
+        if end is not None:
+            where.append(f"{table}.ts < ?")
+            params.append(float(end))
+        if camera_id is not None:
+            where.append(f"{table}.camera_id = ?")
+            params.append(camera_id)
+        if label is not None:
+            where.append("l.label = ?")
+            params.append(label)
+        return where, params
+
+    def _count(self, key, amount=1):
+        with self._metrics_lock:
+            self._metrics[key] += amount
+
+    def _run(self):
+        connection = self._connect()
+        last_purge = 0.0
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval_s
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(connection, batch)
+            for waiter in waiters:
+                waiter.set()
+            if self.retention_days and time.monotonic() - last_purge > EVENT_STORE_PURGE_INTERVAL_S:
+                last_purge = time.monotonic()
+                self._purge(connection)
+        connection.close()
+
+    def _write(self, connection, batch):
+        try:
+            with connection:
+                for ts, camera_id, labels, severity, tracks, tracked in batch:
+                    cursor = connection.execute(
+                        "INSERT INTO events (ts, camera_id, danger, labels, severity, tracked, tracks) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (ts, camera_id, int(bool(labels)), json.dumps(labels), severity, int(tracked),
+                         json.dumps(tracks) if tracks else None),
+                    )
+                    if labels:
+                        connection.executemany(
+                            "INSERT INTO event_labels (event_id, ts, camera_id, label) VALUES (?, ?, ?, ?)",
+                            [(cursor.lastrowid, ts, camera_id, label) for label in labels],
+                        )
+        except sqlite3.Error as e:
+            self._count("failed", len(batch))
+            logging.error(f"[EventStore] Writing {len(batch)} events failed: {e}")
+            return
+        with self._metrics_lock:
+            self._metrics["written"] += len(batch)
+            self._metrics["batches"] += 1
+
+    def _purge(self, connection):
+        cutoff = time.time() - self.retention_days * 86400
+        try:
+            with connection:
+                # events_ts and event_labels_ts let both deletes find old rows without a full table scan
+                connection.execute("DELETE FROM event_labels WHERE ts < ?", (cutoff,))
+                deleted = connection.execute("DELETE FROM events WHERE ts < ?", (cutoff,)).rowcount
+            if deleted:
+                logging.info(f"[EventStore] Deleted {deleted} events older than {self.retention_days} days")
+        except sqlite3.Error as e:
+            logging.error(f"[EventStore] Purging old events failed: {e}")
+
+
+def _encode_cursor(ts, event_id):
+    return base64.urlsafe_b64encode(json.dumps([ts, event_id]).encode()).decode("ascii")
+
+
+def _decode_cursor(cursor):
+    try:
+        ts, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(ts), int(event_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
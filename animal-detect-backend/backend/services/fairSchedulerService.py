@@ -0,0 +1,157 @@
+import collections
+import logging
+import queue
+import threading
+import time
+
+from backend.constants import *
+from backend.services.cameraTableService import CameraTable
+
+
+class FrameSkipped(Exception):
+    def __init__(self, camera_id, reason):
+        """
+        Raised for a frame the scheduler shed instead of running.
+        :param reason: "queue_full", "overloaded" (expected wait beyond the deadline) or "deadline".
+        """
+        super().__init__(f"Frame from camera {camera_id} skipped: {reason}")
+        self.camera_id = camera_id
+        self.reason = reason
+
+
+class CameraQueue:
+    def __init__(self, weight):
+        self.weight = weight
+        self.items = collections.deque()   # (tag, deadline, item)
+        self.last_tag = 0.0
+        self.threat_until = 0.0
+        self.enqueued = 0
+        self.processed = 0
+        self.shed = {"queue_full": 0, "overloaded": 0, "deadline": 0}
+
+
+class FairScheduler:
+    def __init__(self, weights=SCHEDULER_CAMERA_WEIGHTS, default_weight=1.0, threat_boost=SCHEDULER_THREAT_BOOST,
+                 threat_boost_s=SCHEDULER_THREAT_BOOST_S, deadline_s=SCHEDULER_QUEUE_DEADLINE_S,
+                 max_per_camera=SCHEDULER_MAX_QUEUE_PER_CAMERA, on_shed=None):
+        """
+        Weighted fair queue across cameras (start-time fair queuing), used in place of a FIFO
+        queue.Queue: each camera gets a share of inference proportional to its weight, so a
+        chatty camera only delays itself. A camera with a recent threat has its weight boosted.
+        Frames are shed instead of queued without bound: on admission when the camera's queue is
+        full or its expected wait exceeds the deadline, and on dequeue when the deadline passed.
+        :param weights: Per-camera weights; other cameras get default_weight.
+        :param on_shed: Called as on_shed(item, FrameSkipped) for frames shed after admission.
+        """
+        self.weights = dict(weights)
+        self.default_weight = default_weight
+        self.threat_boost = threat_boost
+        self.threat_boost_s = threat_boost_s
+        self.deadline_s = deadline_s
+        self.max_per_camera = max_per_camera
+        self.on_shed = on_shed
+        # Cameras with queued frames are never dropped, or their futures would never resolve
+        self._cameras = CameraTable(lambda camera_id: CameraQueue(self.weights.get(camera_id, self.default_weight)),
+                                    can_evict=lambda camera: not camera.items)
+        self._control = collections.deque()
+        self._size = 0
+        self._virtual_time = 0.0
+        self._cond = threading.Condition()
+
+    def put(self, item, camera_id=DEFAULT_CAMERA_ID, expected_wait_s=0.0):
+        """
+        Queues an item for a camera.
+        :param expected_wait_s: Caller's estimate of how long the whole queue takes to drain.
+        :raises FrameSkipped: When the item is shed on admission.
+        """
+        now = time.monotonic()
+        with self._cond:
+            camera = self._cameras.get(camera_id, now)
+            reason = None
+            if len(camera.items) >= self.max_per_camera:
+                reason = "queue_full"
+            elif expected_wait_s > self.deadline_s and len(camera.items) * len(self._active()) >= self._size:
+                # Overloaded: only shed cameras holding at least their share of the queue
+                reason = "overloaded"
+            if reason:
+                camera.shed[reason] += 1
+                raise FrameSkipped(camera_id, reason)
+
+            weight = camera.weight * (self.threat_boost if now < camera.threat_until else 1.0)
+            tag = max(self._virtual_time, camera.last_tag)
+            camera.last_tag = tag + 1.0 / weight
+            camera.items.append((tag, now + self.deadline_s, item))
+            camera.enqueued += 1
+            self._size += 1
+            self._cond.notify()
+
+    def put_control(self, item):
+        """
+        Queues a control item (e.g. a stop marker), served once no camera has frames left.
+        """
+        with self._cond:
+            self._control.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Returns the item with the smallest virtual start tag, like queue.Queue.get.
+        :raises queue.Empty: When nothing arrived within the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                camera_id = min(self._active(), key=lambda cid: self._cameras.peek(cid).items[0][0], default=None)
+                if camera_id is not None:
+                    camera = self._cameras.peek(camera_id)
+                    tag, frame_deadline, item = camera.items.popleft()
+                    self._size -= 1
+                    self._virtual_time = tag
+                    if time.monotonic() > frame_deadline:
+                        camera.shed["deadline"] += 1
+                        if self.on_shed is not None:
+                            try:
+                                self.on_shed(item, FrameSkipped(camera_id, "deadline"))
+                            except Exception as e:
+                                # A failing callback must never take the consumer thread down with it
+                                logging.error(f"[FairScheduler] Shed callback failed: {e}")
+                        continue
+                    camera.processed += 1
+                    return item
+                if self._control:
+                    return self._control.popleft()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._cond.wait(remaining)
+
+    def record_threat(self, camera_id):
+        """
+        Boosts the camera's weight for the next threat_boost_s seconds.
+        """
+        with self._cond:
+            self._cameras.get(camera_id).threat_until = time.monotonic() + self.threat_boost_s
+
+    def qsize(self):
+        return self._size
+
+    def stats(self):
+        """
+        Per-camera queue depth, throughput and shed counts.
+        """
+        now = time.monotonic()
+        with self._cond:
+            return {
+                camera_id: {
+                    "queue_depth": len(camera.items),
+                    "weight": camera.weight,
+                    "threat_boost": now < camera.threat_until,
+                    "enqueued": camera.enqueued,
+                    "processed": camera.processed,
+                    "shed": dict(camera.shed),
+                }
+                for camera_id, camera in self._cameras.items()
+            }
+
+    def _active(self):
+        return [camera_id for camera_id, camera in self._cameras.items() if camera.items]
@@ -0,0 +1,73 @@
+import io
+import threading
+
+import numpy as np
+
+
+_local = threading.local()
+EXIF_ORIENTATION = 0x0112
+
+
+def read_upload(file_storage):
+    """
+    Reads an uploaded file once into a single bytes object.
+    Every later stage wraps these bytes in io.BytesIO, which shares an immutable bytes
+    buffer instead of copying it (a reused bytearray or memoryview would be copied by
+    each BytesIO), so this one allocation is the only copy of the upload.
+    :param file_storage: A werkzeug FileStorage (request.files[...]).
+    """
+    stream = file_storage.stream
+    stream.seek(0)
+    return stream.read()
+
+
+def decode_rgb(image_bytes, target_size=None):
+    """
+    Decodes an image into an HxWx3 uint8 RGB array, turned upright by its EXIF orientation
+    (phones and some cameras store the pixels rotated), as PIL-based model inputs would be.
+    For JPEGs, draft mode lets libjpeg scale down by 1/2, 1/4 or 1/8 while decoding, so
+    a frame much larger than the model input is never decoded at full resolution.
+    :param target_size: Smallest (width, height), or one side length, the caller needs; None decodes at full size.
+    :return: (array, (original width, original height)), the size also upright
+    """
+    if isinstance(target_size, int):
+        target_size = (target_size, target_size)
+    image, original_size = open_upright(image_bytes, target_size)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.asarray(image), original_size
+
+
+def open_upright(image_bytes, draft_size=None):
+    """
+    Opens an image as PIL would show it: turned by its EXIF orientation, if any.
+    :param draft_size: Smallest upright (width, height) needed; lets the JPEG decoder scale down.
+    :return: (image, (original width, original height)), the size upright
+    """
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(image_bytes))
+    orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+    # Orientations 5-8 swap width and height
+    rotated = orientation in (5, 6, 7, 8)
+    original_size = image.size[::-1] if rotated else image.size
+    if draft_size is not None:
+        image.draft("RGB", draft_size[::-1] if rotated else draft_size)
+    if orientation != 1:
+        image = ImageOps.exif_transpose(image)
+    return image, original_size
+
+
+def reusable_buffer(name, shape, dtype=np.float32):
+    """
+    Returns a per-thread array of this shape and dtype, allocated once and reused on later calls.
+    Callers must be done with it before asking for the same buffer again on the same thread.
+    """
+    buffers = getattr(_local, "buffers", None)
+    if buffers is None:
+        buffers = _local.buffers = {}
+    key = (name, tuple(shape), np.dtype(dtype))
+    buffer = buffers.get(key)
+    if buffer is None:
+        buffer = buffers[key] = np.empty(shape, dtype=dtype)
+    return buffer
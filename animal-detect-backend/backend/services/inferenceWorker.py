@@ -0,0 +1,58 @@
+"""
+Entry point of one inference worker process, started by InferenceWorkerPool.
+
+Run as ``python -m backend.services.inferenceWorker`` with the two pipe file
+descriptors inherited from the parent. The worker loads its own detector once
+and then answers batches of image bytes until the pipe closes.
+"""
+import argparse
+import json
+import logging
+import os
+from multiprocessing.connection import Connection
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--method", required=True)
+    parser.add_argument("--read-fd", type=int, required=True)
+    parser.add_argument("--write-fd", type=int, required=True)
+    parser.add_argument("--cpus", default="")
+    parser.add_argument("--backend-options", default="{}")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.cpus:
+        cpus = {int(cpu) for cpu in args.cpus.split(",")}
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+        # Keep math libraries from spawning more threads than the cores we are pinned to
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ.setdefault(var, str(len(cpus)))
+
+    # Imported after the environment is set so torch/onnxruntime pick up the thread limits
+    from backend.services.rekognition import ImageDetection
+
+    reader = Connection(args.read_fd, writable=False)
+    writer = Connection(args.write_fd, readable=False)
+
+    detector = ImageDetection(method=args.method, **json.loads(args.backend_options))
+    detector.warmup()
+    writer.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            images = reader.recv()
+        except EOFError:
+            break
+        if images is None:
+            break
+        try:
+            writer.send(("ok", detector.detect_labels_batch(images)))
+        except Exception as e:
+            logging.exception("[InferenceWorker] Batch failed")
+            writer.send(("error", f"{type(e).__name__}: {e}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+from multiprocessing.connection import Connection
+
+from backend.services.batchInferenceService import BatchInference
+from backend.constants import *
+
+
+# Directory that contains the "backend" package, so workers can run "python -m backend..."
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class WorkerTimeout(RuntimeError):
+    """
+    A worker did not answer in time and was restarted.
+    """
+
+
+class WorkerProcess:
+    def __init__(self, index, method, backend_options=None, cpus=None,
+                 start_timeout=INFERENCE_WORKER_START_TIMEOUT_S, timeout=INFERENCE_WORKER_TIMEOUT_S):
+        """
+        Handle on one inference worker process holding its own loaded model.
+        Image bytes go over a pipe; a worker that dies or hangs is killed and restarted.
+        :param cpus: Optional list of CPU ids the worker is pinned to.
+        :param start_timeout: Seconds to wait for the worker to load its model.
+        :param timeout: Seconds to wait for one batch before the worker is considered hung.
+        """
+        self.index = index
+        self.method = method
+        self.backend_options = backend_options or {}
+        self.cpus = cpus
+        self.start_timeout = start_timeout
+        self.timeout = timeout
+        self.restarts = 0
+        self.batches = 0
+        self.process = None
+        self._reader = None
+        self._writer = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self._start()
+
+    def detect_labels_batch(self, images):
+        """
+        Sends one batch to the worker and waits for its results.
+        """
+        with self._lock:
+            if self.process.poll() is not None:
+                self._restart(f"exited with code {self.process.returncode}")
+            try:
+                if not self._ready:
+                    self._wait_ready()
+                self._writer.send(images)
+                if not self._reader.poll(self.timeout):
+                    raise TimeoutError(f"no answer within {self.timeout}s")
+                status, payload = self._reader.recv()
+            except TimeoutError as e:
+                self._restart(str(e))
+                raise WorkerTimeout(f"Inference worker {self.index} failed: {e}")
+            except (EOFError, OSError) as e:
+                self._restart(str(e))
+                raise RuntimeError(f"Inference worker {self.index} failed: {e}")
+            self.batches += 1
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def check(self):
+        """
+        Restarts the worker if it died while idle. Skipped while a batch is in flight.
+        """
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self.process.poll() is not None:
+                self._restart(f"exited with code {self.process.returncode}")
+        finally:
+            self._lock.release()
+
+    def stop(self):
+        with self._lock:
+            self._shutdown()
+
+    def stats(self):
+        return {
+            "pid": self.process.pid,
+            "alive": self.process.poll() is None,
+            "ready": self._ready,
+            "cpus": self.cpus,
+            "batches": self.batches,
+            "restarts": self.restarts,
+        }
+
+    def _start(self):
+        # Dedicated pipes rather than stdin/stdout, so prints in the backend code cannot corrupt the stream
+        to_child_r, to_child_w = os.pipe()
+        from_child_r, from_child_w = os.pipe()
+        command = [
+            sys.executable, "-m", "backend.services.inferenceWorker",
+            "--method", self.method,
+            "--read-fd", str(to_child_r),
+            "--write-fd", str(from_child_w),
+            "--backend-options", json.dumps(self.backend_options),
+        ]
+        if self.cpus:
+            command += ["--cpus", ",".join(str(cpu) for cpu in self.cpus)]
+        self.process = subprocess.Popen(command, cwd=PACKAGE_ROOT, pass_fds=(to_child_r, from_child_w))
+        os.close(to_child_r)
+        os.close(from_child_w)
+        self._writer = Connection(to_child_w, readable=False)
+        self._reader = Connection(from_child_r, writable=False)
+        self._ready = False
+        logging.info(f"[InferenceWorkerPool] Worker {self.index} started (pid={self.process.pid}, cpus={self.cpus})")
+
+    def _wait_ready(self):
+        if not self._reader.poll(self.start_timeout):
+            raise TimeoutError(f"model not loaded within {self.start_timeout}s")
+        status, _ = self._reader.recv()
+        if status != "ready":
+            raise OSError(f"unexpected startup message '{status}'")
+        self._ready = True
+
+    def _restart(self, reason):
+        logging.error(f"[InferenceWorkerPool] Worker {self.index} (pid={self.process.pid}) {reason}, restarting")
+        self._shutdown()
+        self.restarts += 1
+        self._start()
+
+    def _shutdown(self):
+        for conn in (self._writer, self._reader):
+            try:
+                conn.close()
+            except OSError:
+                pass
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+
+class InferenceWorkerPool(BatchInference):
+    # Retrying a hung batch frame by frame would wait for the timeout once per frame, on a worker
+    # that has to load its model again first; those frames fail right away instead
+    fail_fast_errors = (WorkerTimeout,)
+
+    def __init__(self, method, num_workers=INFERENCE_WORKERS, pin_cpus=INFERENCE_PIN_CPUS,
+                 backend_options=None, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+        """
+        Pool of pre-started inference worker processes, each with its own model,
+        so inference scales across cores instead of sharing one GIL.
+        Frames still go through the micro-batching queue; each worker has one
+        consumer thread that collects a batch and ships it to its process.
+        :param method: Detector backend each worker loads (see ImageDetection).
+        :param num_workers: Number of worker processes; 0 means one per CPU.
+        :param pin_cpus: Pin worker i to its own share of the available CPUs.
+        :param backend_options: Extra keyword arguments for the backend constructor (must be JSON-serializable).
+        """
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        num_workers = num_workers or len(cpus)
+        self.workers = []
+        for index in range(num_workers):
+            worker_cpus = None
+            if pin_cpus:
+                # Spread the CPUs round-robin; with more workers than CPUs, workers share one
+                worker_cpus = cpus[index::num_workers] or [cpus[index % len(cpus)]]
+            self.workers.append(WorkerProcess(index, method, backend_options, cpus=worker_cpus))
+        super().__init__(self.workers, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+        self._closed = threading.Event()
+        self._monitor = threading.Thread(target=self._watch, name="InferenceWorkerMonitor", daemon=True)
+        self._monitor.start()
+
+    def close(self):
+        """
+        Drains the queue, then stops the monitor and all worker processes.
+        """
+        super().close()
+        self._closed.set()
+        self._monitor.join()
+        for worker in self.workers:
+            worker.stop()
+
+    def stats(self):
+        stats = super().stats()
+        stats["workers"] = [worker.stats() for worker in self.workers]
+        return stats
+
+    def _watch(self):
+        while not self._closed.wait(INFERENCE_WORKER_CHECK_INTERVAL_S):
+            for worker in self.workers:
+                worker.check()
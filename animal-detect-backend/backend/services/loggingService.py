@@ -0,0 +1,70 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+
+from backend.constants import *
+
+
+_listener = None
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, every=LOG_SAMPLE_EVERY):
+        """
+        Keeps one in `every` INFO/DEBUG records per call site; warnings and errors always pass.
+        Per-frame log lines stay visible without costing one write per frame.
+        """
+        super().__init__()
+        self.every = max(1, every)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.every == 1 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class _UnformattedQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # QueueHandler.prepare() formats the record (message, traceback) in the calling thread so it
+        # can be pickled; the queue never leaves this process, so the listener's handlers format it
+        return record
+
+
+def setup_async_logging(sample_every=LOG_SAMPLE_EVERY):
+    """
+    Moves the root logger's handlers behind a QueueHandler, so request threads only enqueue
+    records (unformatted) and a background QueueListener formats and writes them. Safe to call twice.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    root = logging.getLogger()
+    handlers = root.handlers[:] or [logging.StreamHandler()]
+    log_queue = queue.SimpleQueue()
+    queue_handler = _UnformattedQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_every))
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(stop_async_logging)
+
+
+def stop_async_logging():
+    """
+    Flushes queued records (e.g. at shutdown).
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,25 +1,59 @@
 import os
 import json
+import threading
+import time
+from collections import OrderedDict
 from AWSIoTPythonSDK.MQTTLib import AWSIoTMQTTClient, AWSIoTMQTTShadowClient
 
 from backend.constants import *
+from backend.services.metricsService import span
+from backend.services.payloadCodec import make_encoder
 
 
 class MessagePublish:
-    def __init__(self):
+    def __init__(self, endpoint=IOT_CORE_ENDPOINT, port=8883, cert_files=None, encoding=MQTT_PAYLOAD_ENCODING,
+                 shadow_min_interval_s=MQTT_SHADOW_MIN_INTERVAL_S, summary_interval_s=MQTT_SUMMARY_INTERVAL_S):
         """
         Initializes the MQTT and shadow clients for publishing messages.
+        The last desired LED state is tracked locally: shadow updates that would not change it
+        are skipped, and changes within shadow_min_interval_s of the previous update are
+        coalesced into one update carrying the latest state. Safe-frame messages are not sent
+        one by one but counted into a summary published every summary_interval_s, which also
+        serves as a heartbeat for the LED device.
+        :param endpoint: Broker host, AWS IoT Core by default (a local broker works for tests).
+        :param port: Broker port.
+        :param cert_files: Optional dict with "root_ca", "private_key" and "cert" paths.
+        :param encoding: MQTT payload encoding, "json", "msgpack" or "cbor" (see payloadCodec).
+                         Shadow documents are always JSON, as AWS IoT requires.
+        :param shadow_min_interval_s: Smallest time between two shadow updates.
+        :param summary_interval_s: How often the safe-frame summary is published.
         """
         self.client_id = "publisher_client"
         self.shadow_client_id = "test_shadow_client"
         self.thing_name = THING_NAME
-        self.endpoint = IOT_CORE_ENDPOINT
-        self.port = 8883
+        self.endpoint = endpoint
+        self.port = port
         self.topic = LED_STATE_TOPIC
+        self.encode = make_encoder(encoding)
+        self.shadow_min_interval_s = shadow_min_interval_s
+        self.summary_interval_s = summary_interval_s
+
+        self._shadow_lock = threading.Lock()
+        self._desired_led = None        # last state sent to the shadow
+        self._pending_led = None        # coalesced state waiting for the interval to pass
+        self._last_shadow_update = 0.0
+        self._shadow_timer = None
+        self._shadow_failures = 0       # deferred updates that failed in a row
+        self._summary_lock = threading.Lock()
+        self._safe_frames = 0
+        self._summary_since = time.time()
+        self._published_alerts = OrderedDict()     # alert_id -> None, oldest first
+        self._counters = {"published": 0, "republish_skipped": 0, "summaries": 0, "safe_batched": 0,
+                          "shadow_updates": 0, "shadow_skipped": 0, "shadow_coalesced": 0, "shadow_retries": 0}
         
         base_dir = os.path.dirname(os.path.abspath(__file__))
         # Initialize certificate file paths
-        self.cert_files =     {
+        self.cert_files = cert_files or {
             "root_ca": os.path.join(base_dir, "root-CA.crt"),
             "private_key": os.path.join(base_dir, "Hack_Rpi.private.key"),
             "cert": os.path.join(base_dir, "Hack_Rpi.cert.pem")
@@ -54,43 +88,179 @@ class MessagePublish:
         except Exception as e:
             print("[MessagePublish] Connection failed:", e)
             raise
+        self._summary_thread = threading.Thread(target=self._summary_loop, name="MessagePublishSummary", daemon=True)
+        self._summary_thread.start()
     
     
-    def publish_threat(self, message):
+    def publish_threat(self, message, raise_errors=False):
         """
         Publishes an alert message to the specified MQTT topic and updates the shadow state.
+        A retry of an alert whose message was already published only repeats the shadow update.
+        :param raise_errors: Re-raise failures instead of printing them (used by the alert dispatcher to retry).
         """
         try:
             # Publish the message to the MQTT topic
-            self.mqtt_client.publish(self.topic, json.dumps(message), 1)
-            print(f"[MessagePublish] Message published to topic: {self.topic}")
+            self._publish_alert(message)
 
-            # Update the shadow's desired state
-            self.update_led_state("on")
+            # Update the shadow's desired state (skipped when the LED is already on)
+            self.update_led_state("on", raise_errors=raise_errors)
         except Exception as e:
             print("[MessagePublish] Failed to publish message or update shadow:", e)
+            if raise_errors:
+                raise
+
+    def publish_safe(self, message, raise_errors=False):
+        """
+        Counts a safe frame into the next periodic summary instead of publishing it.
+        """
+        self.record_safe_frame()
+
+    def record_safe_frame(self):
+        """
+        Counts one frame without a threat into the next summary. Called by the pipeline for
+        every safe frame, since the alert state machine only dispatches transitions.
+        """
+        with self._summary_lock:
+            self._safe_frames += 1
+            self._counters["safe_batched"] += 1
 
-    def publish_safe(self, message):
+    def publish_summary(self, raise_errors=False):
+        """
+        Publishes the safe frames counted since the last summary (QoS 0; a lost one is
+        replaced by the next) together with the current desired LED state.
+        """
+        now = time.time()
+        with self._summary_lock:
+            summary = {"type": "summary", "safe_frames": self._safe_frames,
+                       "since": round(self._summary_since, 3), "until": round(now, 3), "led": self._desired_led}
+            self._safe_frames = 0
+            self._summary_since = now
         try:
-            # # Publish the message to the MQTT topic
-            self.mqtt_client.publish(self.topic, json.dumps(message), 1)
-            print(f"[MessagePublish] Message published to topic: {self.topic}")
+            self._publish(summary, 0)
+            with self._summary_lock:
+                self._counters["summaries"] += 1
+        except Exception as e:
+            print("[MessagePublish] Failed to publish summary:", e)
+            if raise_errors:
+                raise
 
-            # # Update the shadow's desired state
-            # self.update_led_state("off")
+    def publish_clear(self, message, raise_errors=False):
+        """
+        Publishes an all-clear message and turns the LED off in the shadow's desired state.
+        """
+        try:
+            self._publish_alert(message)
+
+            self.update_led_state("off", raise_errors=raise_errors)
         except Exception as e:
             print("[MessagePublish] Failed to publish message or update shadow:", e)
+            if raise_errors:
+                raise
+
+    def update_led_state(self, target_state, raise_errors=False):
+        """
+        Updates the LED state in the shadow's desired state, unless it already is target_state.
+        Within shadow_min_interval_s of the previous update the change is deferred, and only
+        the latest state is sent once the interval has passed.
+        """
+        with self._shadow_lock:
+            if self._shadow_timer is None and target_state == self._desired_led:
+                self._counters["shadow_skipped"] += 1
+                return
+            wait = self._last_shadow_update + self.shadow_min_interval_s - time.monotonic()
+            if wait > 0 or self._shadow_timer is not None:
+                self._counters["shadow_coalesced"] += 1
+                self._pending_led = target_state
+                if self._shadow_timer is None:
+                    self._shadow_timer = threading.Timer(max(0.0, wait), self._flush_led_state)
+                    self._shadow_timer.daemon = True
+                    self._shadow_timer.start()
+                return
+            self._last_shadow_update = time.monotonic()
+        self._send_led_state(target_state, raise_errors)
+
+    def stats(self):
+        """
+        Returns message and shadow update counters.
+        """
+        with self._summary_lock, self._shadow_lock:
+            stats = dict(self._counters)
+            stats["desired_led"] = self._desired_led
+        return stats
+
+    def _publish(self, message, qos):
+        with span("mqtt_publish"):
+            self.mqtt_client.publish(self.topic, self.encode(message), qos)
+        with self._summary_lock:
+            self._counters["published"] += 1
+        print(f"[MessagePublish] Message published to topic: {self.topic}")
+
+    def _publish_alert(self, message):
+        alert_id = message.get("alert_id")
+        with self._summary_lock:
+            if alert_id is not None and alert_id in self._published_alerts:
+                self._counters["republish_skipped"] += 1
+                return
+        self._publish(message, 1)
+        if alert_id is not None:
+            with self._summary_lock:
+                self._published_alerts[alert_id] = None
+                if len(self._published_alerts) > MQTT_ALERT_ID_HISTORY:
+                    self._published_alerts.popitem(last=False)
 
-    def update_led_state(self, target_state):
+    def _send_led_state(self, target_state, raise_errors=False):
         """
-        Updates the LED state in the shadow's desired state.
+        :return: True when the shadow accepted the update.
         """
         desired_payload = {"state": {"desired": {"led": target_state}}}
         try:
-            self.device_shadow.shadowUpdate(json.dumps(desired_payload), None, 5)
-            print(f"[MessagePublish] Shadow LED state updated to: {target_state}")
+            with span("shadow_update"):
+                self.device_shadow.shadowUpdate(json.dumps(desired_payload), None, 5)
         except Exception as e:
             print("[MessagePublish] Failed to update shadow state:", e)
+            with self._shadow_lock:
+                # Unknown shadow state: the next update must not be skipped
+                self._desired_led = None
+            if raise_errors:
+                raise
+            return False
+        with self._shadow_lock:
+            self._desired_led = target_state
+            self._counters["shadow_updates"] += 1
+        print(f"[MessagePublish] Shadow LED state updated to: {target_state}")
+        return True
+
+    def _flush_led_state(self):
+        with self._shadow_lock:
+            target_state, self._pending_led = self._pending_led, None
+            self._shadow_timer = None
+            if target_state == self._desired_led:
+                # e.g. on -> off -> on within one interval: nothing to send
+                self._counters["shadow_skipped"] += 1
+                return
+            self._last_shadow_update = time.monotonic()
+        sent = self._send_led_state(target_state)
+
+        with self._shadow_lock:
+            if sent:
+                self._shadow_failures = 0
+                return
+            # Nobody is left to retry a deferred update (the alert that asked for it was already
+            # acknowledged), so keep retrying with backoff unless a newer state superseded it
+            self._counters["shadow_retries"] += 1
+            if self._pending_led is None:
+                self._pending_led = target_state
+            if self._shadow_timer is None:
+                delay = min(MQTT_SHADOW_RETRY_MAX_S, MQTT_SHADOW_RETRY_BASE_S * (2 ** self._shadow_failures))
+                self._shadow_failures += 1
+                self._shadow_timer = threading.Timer(delay, self._flush_led_state)
+                self._shadow_timer.daemon = True
+                self._shadow_timer.start()
+
+    def _summary_loop(self):
+        while True:
+            time.sleep(self.summary_interval_s)
+            self.publish_summary()
 
 
 # Example usage
@@ -0,0 +1,145 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from backend.constants import *
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=METRICS_LATENCY_BUCKETS_S):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}     # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in series_items:
+            # Buckets are stored per interval; Prometheus wants cumulative counts
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                names = self.label_names + ("le",)
+                lines.append(f"{self.name}_bucket{_labels(names, key + (str(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Minimal in-process metrics registry rendered in the Prometheus text format.
+        Components that already keep their own stats() register a collector instead of
+        duplicating counters; collectors run only when /metrics is scraped.
+        """
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, label_names=()):
+        return self._add(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=METRICS_LATENCY_BUCKETS_S):
+        return self._add(Histogram(name, help_text, label_names, buckets))
+
+    def register_collector(self, collect):
+        """
+        :param collect: Callable returning a list of gauges as (name, help_text, [(labels_dict, value), ...]).
+        """
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collect in collectors:
+            for name, help_text, samples in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(str(v) for v in labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    "animal_detect_stage_seconds", "Time spent in each stage of the detection path.", ("stage",))
+stage_errors = registry.counter(
+    "animal_detect_stage_errors_total", "Stages that ended with an exception.", ("stage",))
+requests_total = registry.counter(
+    "animal_detect_requests_total", "HTTP detection requests by endpoint and status code.", ("endpoint", "status"))
+frames_total = registry.counter(
+    "animal_detect_frames_total", "Processed frames by outcome (threat, safe, no_motion).", ("outcome",))
+
+
+@contextmanager
+def span(stage):
+    """
+    Times a block of the detection path into animal_detect_stage_seconds{stage=...}.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=stage)
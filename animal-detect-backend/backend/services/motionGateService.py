@@ -0,0 +1,127 @@
+import io
+import threading
+
+import numpy as np
+from PIL import Image
+
+from backend.constants import *
+from backend.services.cameraTableService import CameraTable
+from backend.services.metricsService import span
+
+
+class CameraBackground:
+    def __init__(self):
+        self.background = None
+        self.hold = False
+        self.frames = 0
+        self.motion_frames = 0
+        self.skipped = 0
+
+
+class MotionGate:
+    def __init__(self, enabled=MOTION_GATE_ENABLED, width=MOTION_GATE_WIDTH, alpha=MOTION_GATE_ALPHA,
+                 pixel_threshold=MOTION_GATE_PIXEL_THRESHOLD, min_changed_fraction=MOTION_GATE_MIN_CHANGED_FRACTION):
+        """
+        Per-camera running-average background model used to skip inference on static frames.
+        Frames are decoded straight to small grayscale images, compared against the
+        background, and only frames where enough pixels changed are sent to the model.
+        :param enabled: When False, check() always reports motion and nothing is skipped.
+        :param width: Width in pixels of the downscaled frame the model runs on.
+        :param alpha: Background learning rate (0..1); higher adapts faster to lighting changes.
+        :param pixel_threshold: Gray-level difference for a pixel to count as changed.
+        :param min_changed_fraction: Fraction of changed pixels needed to call it motion.
+        """
+        self.enabled = enabled
+        self.width = width
+        self.alpha = alpha
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        # A dropped camera only loses its background; its next frame counts as motion
+        self._cameras = CameraTable(lambda camera_id: CameraBackground())
+        self._lock = threading.Lock()
+
+    def check(self, image_bytes, camera_id):
+        """
+        Compares the frame with the camera's background and updates the background.
+        :return: Dict with "motion" (bool), "score" (fraction of changed pixels) and
+                 "region" ([x1, y1, x2, y2] in full-resolution pixels, or None).
+        """
+        if not self.enabled:
+            return {"motion": True, "score": None, "region": None}
+
+        with span("decode"):
+            frame, full_size = self._decode(image_bytes)
+        with self._lock:
+            camera = self._cameras.get(camera_id)
+            camera.frames += 1
+
+            if camera.background is None or camera.background.shape != frame.shape:
+                # First frame (or resolution change): nothing to compare against yet
+                camera.background = frame
+                camera.motion_frames += 1
+                return {"motion": True, "score": 1.0, "region": [0, 0, full_size[0], full_size[1]]}
+
+            mask = np.abs(frame - camera.background) > self.pixel_threshold
+            score = float(mask.mean())
+            # Running average: bg = (1 - alpha) * bg + alpha * frame
+            camera.background += self.alpha * (frame - camera.background)
+
+            motion = score >= self.min_changed_fraction
+            region = self._region(mask, frame.shape, full_size) if motion else None
+            if motion or camera.hold:
+                # While a threat is being tracked, keep running the model even if the animal stands still
+                camera.motion_frames += 1
+                return {"motion": True, "score": score, "region": region}
+
+            camera.skipped += 1
+            return {"motion": False, "score": score, "region": None}
+
+    def record_result(self, camera_id, threat):
+        """
+        Tells the gate what the model found, so a still animal is not gated away as "no motion".
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cameras.get(camera_id).hold = bool(threat)
+
+    def stats(self):
+        """
+        Returns per-camera frame, motion and skipped-inference counters.
+        """
+        with self._lock:
+            cameras = {
+                camera_id: {
+                    "frames": camera.frames,
+                    "motion_frames": camera.motion_frames,
+                    "skipped_inferences": camera.skipped,
+                }
+                for camera_id, camera in self._cameras.items()
+            }
+        return {
+            "enabled": self.enabled,
+            "skipped_inferences": sum(camera["skipped_inferences"] for camera in cameras.values()),
+            "cameras": cameras,
+        }
+
+    def _decode(self, image_bytes):
+        image = Image.open(io.BytesIO(image_bytes))
+        full_size = image.size
+        height = max(1, round(self.width * full_size[1] / full_size[0]))
+        # JPEG draft mode decodes at 1/2, 1/4 or 1/8 scale, which is much cheaper than a full decode
+        image.draft("L", (self.width, height))
+        image = image.convert("L").resize((self.width, height), Image.BILINEAR)
+        return np.asarray(image, dtype=np.float32), full_size
+
+    @staticmethod
+    def _region(mask, shape, full_size):
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        scale_x = full_size[0] / shape[1]
+        scale_y = full_size[1] / shape[0]
+        return [
+            int(cols[0] * scale_x),
+            int(rows[0] * scale_y),
+            min(full_size[0], int((cols[-1] + 1) * scale_x)),
+            min(full_size[1], int((rows[-1] + 1) * scale_y)),
+        ]
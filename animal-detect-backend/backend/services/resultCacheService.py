@@ -0,0 +1,193 @@
+import hashlib
+import io
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from backend.constants import *
+from backend.services.cameraTableService import CameraTable
+from backend.services.metricsService import span
+
+
+def difference_hash(image_bytes, hash_size=8):
+    """
+    Computes a 64-bit dHash: the frame is shrunk to (hash_size + 1) x hash_size
+    grayscale pixels and each bit records whether a pixel is brighter than its
+    right-hand neighbour. Near-identical frames give hashes a few bits apart.
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_bytes))
+    # Let the JPEG decoder downscale while decoding instead of decoding full size
+    image.draft("L", (hash_size * 8, hash_size * 8))
+    pixels = list(image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).getdata())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class CacheEntry:
+    def __init__(self, result, phash, expires_at):
+        self.result = result
+        self.phash = phash
+        self.expires_at = expires_at
+
+
+class DetectionCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES_PER_CAMERA, ttl_s=CACHE_TTL_S,
+                 perceptual=CACHE_PERCEPTUAL_HASH, max_distance=CACHE_PHASH_MAX_DISTANCE, enabled=CACHE_ENABLED):
+        """
+        Caches detection results per camera, keyed by an exact content hash and,
+        optionally, a perceptual hash so near-duplicate frames also hit.
+        Entries are evicted least-recently-used first and expire after ttl_s seconds.
+        :param max_entries: Maximum number of cached frames per camera.
+        :param ttl_s: Seconds a result stays valid.
+        :param perceptual: Also match frames whose dHash is within max_distance bits.
+        :param max_distance: Largest Hamming distance treated as "the same scene".
+        :param enabled: When False, every lookup is a miss and nothing is stored (e.g. for benchmarks).
+        """
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        # Every entry of a camera that sent nothing for ttl_s has expired, so the camera can go
+        self._cameras = CameraTable(lambda camera_id: OrderedDict(), idle_s=ttl_s)
+        self._lock = threading.Lock()
+        self._counters = {
+            "exact_hits": 0,
+            "perceptual_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def get_or_compute(self, image_bytes, camera_id, compute):
+        """
+        Returns the cached result for this frame, or calls compute(image_bytes) and caches it.
+        Exceptions from compute() propagate and nothing is cached.
+        """
+        result, key = self.lookup(image_bytes, camera_id)
+        if key is None:
+            return result
+        result = compute(image_bytes)
+        self.store(camera_id, key, result)
+        return result
+
+    def lookup(self, image_bytes, camera_id):
+        """
+        First half of get_or_compute, for callers that compute asynchronously.
+        :return: (cached result, None) on a hit, or (None, key) on a miss; pass the key to store().
+        """
+        if not self.enabled:
+            with self._lock:
+                self._counters["misses"] += 1
+            return None, (None, None)
+        digest = hashlib.blake2b(image_bytes, digest_size=16).digest()
+        phash = None
+
+        with self._lock:
+            result = self._get_exact(camera_id, digest)
+        if result is not None:
+            return result, None
+
+        if self.perceptual:
+            try:
+                with span("perceptual_hash"):
+                    phash = difference_hash(image_bytes)
+            except Exception as e:
+                logging.warning(f"[DetectionCache] Could not compute perceptual hash: {e}")
+            if phash is not None:
+                with self._lock:
+                    result = self._get_perceptual(camera_id, phash)
+                if result is not None:
+                    return result, None
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None, (digest, phash)
+
+    def store(self, camera_id, key, result):
+        """
+        Caches the result computed after a lookup() miss.
+        """
+        digest, phash = key
+        if digest is None:
+            return
+        with self._lock:
+            self._put(camera_id, digest, phash, result)
+
+    def clear(self, camera_id=None):
+        """
+        Drops the cached results of one camera, or of every camera.
+        """
+        with self._lock:
+            if camera_id is None:
+                self._cameras.clear()
+            else:
+                self._cameras.pop(camera_id, None)
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the number of cached frames per camera.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = {camera_id: len(entries) for camera_id, entries in self._cameras.items()}
+            stats["evicted_cameras"] = self._cameras.evicted
+        lookups = stats["exact_hits"] + stats["perceptual_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["perceptual_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _get_exact(self, camera_id, digest):
+        entries = self._cameras.peek(camera_id)
+        if not entries:
+            return None
+        entry = entries.get(digest)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del entries[digest]
+            self._counters["expirations"] += 1
+            return None
+        entries.move_to_end(digest)
+        self._counters["exact_hits"] += 1
+        return entry.result
+
+    def _get_perceptual(self, camera_id, phash):
+        entries = self._cameras.peek(camera_id)
+        if not entries:
+            return None
+        self._expire(entries)
+        # Scan most recent first: the previous frame is the most likely match
+        for digest in reversed(entries):
+            entry = entries[digest]
+            if entry.phash is not None and hamming_distance(entry.phash, phash) <= self.max_distance:
+                entries.move_to_end(digest)
+                self._counters["perceptual_hits"] += 1
+                return entry.result
+        return None
+
+    def _put(self, camera_id, digest, phash, result):
+        entries = self._cameras.get(camera_id)
+        entries[digest] = CacheEntry(result, phash, time.monotonic() + self.ttl_s)
+        entries.move_to_end(digest)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _expire(self, entries):
+        now = time.monotonic()
+        expired = [digest for digest, entry in entries.items() if entry.expires_at <= now]
+        for digest in expired:
+            del entries[digest]
+        self._counters["expirations"] += len(expired)
@@ -1,22 +1,32 @@
-import boto3
 import json
 import logging
 
-sns_client = boto3.client("sns", region_name="us-east-1")  # ⬅ 你用的 region
+from backend.constants import *
+from backend.services.cloudClientService import get_client
+from backend.services.metricsService import span
 
-TOPIC_ARN = "arn:aws:sns:us-east-1:408485681593:animal-threat-alert"
 
-def publish_threat_alert(message: dict):
+def publish_threat_alert(message: dict, client=None, raise_errors=False):
+    """
+    Publishes a threat alert to the SNS topic.
+    :param client: Optional SNS client (e.g. a stub in tests); defaults to the shared pooled client.
+    :param raise_errors: Re-raise failures instead of logging them (used by the alert dispatcher to retry).
+    """
     try:
-        response = sns_client.publish(
-            TopicArn=TOPIC_ARN,
-            Subject="⚠️ Animal Threat Detected",
-            Message=json.dumps(message, indent=2)
-        )
+        with span("sns_publish"):
+            response = (client or get_client("sns")).publish(
+                TopicArn=SNS_TOPIC_ARN,
+                Subject="⚠️ Animal Threat Detected",
+                Message=json.dumps(message, indent=2)
+            )
         logging.info("SNS MessageId: %s", response["MessageId"])
     except Exception as e:
         logging.error("❌ Failed to publish SNS message: %s", e)
-        
+        if raise_errors:
+            raise
 
-message = {"msg": "There is a tiger nearby you"}
-publish_threat_alert(message)
\ No newline at end of file
+
+if __name__ == "__main__":
+    # Manual check: sends one test message to the topic
+    message = {"msg": "There is a tiger nearby you"}
+    publish_threat_alert(message, raise_errors=True)
@@ -0,0 +1,211 @@
+import itertools
+import logging
+import threading
+import time
+
+import numpy as np
+
+from backend.constants import *
+from backend.services.cameraTableService import CameraTable
+from backend.services.detectors.boxUtils import pairwise_iou
+
+
+class Track:
+    def __init__(self, track_id, label, box, confidence, now):
+        self.track_id = track_id
+        self.label = label
+        self.box = np.asarray(box, dtype=np.float32)
+        self.detected_box = self.box    # last box the detector reported, for velocity estimates
+        self.velocity = np.zeros(4, dtype=np.float32)   # box corners in pixels per second
+        self.confidence = confidence
+        self.first_seen = now
+        self.last_seen = now        # last frame the detector confirmed the track
+        self.last_update = now      # last frame the box was moved, detected or predicted
+        self.hits = 1
+        self.misses = 0
+
+    def describe(self, now):
+        return {
+            "track_id": self.track_id,
+            "label": self.label,
+            "box": [int(v) for v in self.box],
+            "confidence": round(float(self.confidence), 3),
+            "dwell_s": round(now - self.first_seen, 1),
+            "hits": self.hits,
+        }
+
+
+class CameraTracks:
+    def __init__(self):
+        self.tracks = []
+        self.frames_since_detection = 0
+        self.detected_frames = 0
+        self.tracked_frames = 0
+
+
+class ObjectTracker:
+    def __init__(self, enabled=TRACKER_ENABLED, detect_every=TRACKER_DETECT_EVERY,
+                 iou_threshold=TRACKER_IOU_THRESHOLD, max_centroid_distance=TRACKER_MAX_CENTROID_DISTANCE,
+                 max_misses=TRACKER_MAX_MISSES, confidence_decay=TRACKER_CONFIDENCE_DECAY,
+                 min_confidence=TRACKER_MIN_CONFIDENCE, velocity_smoothing=TRACKER_VELOCITY_SMOOTHING,
+                 max_idle_s=TRACKER_MAX_IDLE_S):
+        """
+        Per-camera multi-object tracker for threat boxes, used to skip inference while an
+        animal stays in view. Detections are associated with the tracks' constant-velocity
+        predictions by IoU (or, for fast movers that no longer overlap, by centroid distance),
+        which keeps a stable track ID and dwell time per animal. Between detections, tracks are
+        moved along their velocity and their confidence decays; the detector runs again every
+        detect_every frames or as soon as a track's confidence drops below min_confidence.
+        :param enabled: When False, predict() always asks for detection and update() only records.
+        :param detect_every: Run the detector at least once every N frames of a camera.
+        :param iou_threshold: Smallest IoU for a detection to continue a track.
+        :param max_centroid_distance: Largest centroid distance, as a fraction of the track box
+                                      diagonal, for a non-overlapping detection to continue a track.
+        :param max_misses: Detections in a row a track may be missing from before it is dropped.
+        :param confidence_decay: Factor applied to a track's confidence on every predicted frame.
+        :param min_confidence: Track confidence below which the detector must confirm it.
+        :param velocity_smoothing: Weight of the newest velocity measurement (0..1).
+        :param max_idle_s: Tracks of a camera that sent no frame for this long are dropped.
+        """
+        self.enabled = enabled
+        self.detect_every = detect_every
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_misses = max_misses
+        self.confidence_decay = confidence_decay
+        self.min_confidence = min_confidence
+        self.velocity_smoothing = velocity_smoothing
+        self.max_idle_s = max_idle_s
+        self._cameras = CameraTable(lambda camera_id: CameraTracks())
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def predict(self, camera_id, now=None):
+        """
+        Decides whether the camera's next frame needs the detector.
+        :return: None when the detector must run, otherwise the predicted tracks (see Track.describe)
+                 to use as this frame's result.
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            camera = self._cameras.get(camera_id, now)
+            tracks = camera.tracks
+            if tracks and now - max(track.last_update for track in tracks) > self.max_idle_s:
+                # The camera went quiet; whatever was tracked may have left long ago
+                tracks.clear()
+            if (not tracks or camera.frames_since_detection + 1 >= self.detect_every
+                    or any(track.misses or track.hits < 2 for track in tracks)):
+                # Nothing to follow, a detection is due, a new track has no velocity yet,
+                # or the last detection lost sight of a track
+                return None
+
+            confidences = np.array([track.confidence for track in tracks]) * self.confidence_decay
+            if confidences.min() < self.min_confidence:
+                return None
+            for track, confidence in zip(tracks, confidences):
+                track.box = track.box + track.velocity * (now - track.last_update)
+                track.confidence = float(confidence)
+                track.last_update = now
+            camera.frames_since_detection += 1
+            camera.tracked_frames += 1
+            return [track.describe(now) for track in tracks]
+
+    def update(self, camera_id, objects, now=None):
+        """
+        Feeds the detector's threat records for a frame and associates them with the camera's tracks.
+        :param objects: {'label', 'confidence', 'box'} records, or None when the detector gave no
+                        boxes that can be tracked (the camera's tracks are then dropped).
+        :return: The camera's current tracks (see Track.describe).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            camera = self._cameras.get(camera_id, now)
+            camera.frames_since_detection = 0
+            camera.detected_frames += 1
+            if objects is None or any(obj['box'] is None for obj in objects):
+                # Box-less labels (e.g. Rekognition scene labels) cannot be followed between
+                # frames, so the detector keeps running on every frame of this camera
+                camera.tracks = []
+                return []
+            self._associate(camera, objects, now)
+            return [track.describe(now) for track in camera.tracks if track.misses == 0]
+
+    def stats(self):
+        """
+        Returns per-camera track counts and how many frames were answered without the detector.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cameras = {
+                camera_id: {
+                    "detected_frames": camera.detected_frames,
+                    "tracked_frames": camera.tracked_frames,
+                    "tracks": [track.describe(now) for track in camera.tracks],
+                }
+                for camera_id, camera in self._cameras.items()
+            }
+        return {
+            "enabled": self.enabled,
+            "skipped_inferences": sum(camera["tracked_frames"] for camera in cameras.values()),
+            "cameras": cameras,
+        }
+
+    def _associate(self, camera, boxed, now):
+        tracks = camera.tracks
+        matched_tracks, matched_objects = set(), set()
+        if tracks and boxed:
+            predicted = np.stack([track.box + track.velocity * (now - track.last_update) for track in tracks])
+            detected = np.array([obj['box'] for obj in boxed], dtype=np.float32)
+            iou = pairwise_iou(predicted, detected)
+
+            # Centroid distance relative to the predicted box diagonal, for animals that moved past overlap
+            centers_p = (predicted[:, :2] + predicted[:, 2:]) / 2
+            centers_d = (detected[:, :2] + detected[:, 2:]) / 2
+            diagonal = np.maximum(np.hypot(*(predicted[:, 2:] - predicted[:, :2]).T), 1.0)
+            distance = np.linalg.norm(centers_p[:, None, :] - centers_d[None, :, :], axis=2) / diagonal[:, None]
+
+            same_label = np.array([[track.label == obj['label'] for obj in boxed] for track in tracks])
+            allowed = same_label & ((iou >= self.iou_threshold) | (distance <= self.max_centroid_distance))
+            # Greedy assignment, best pairs first: highest IoU, then closest centroid
+            score = np.where(allowed, iou - distance * 1e-3, -np.inf)
+            for flat in np.argsort(-score, axis=None):
+                t, d = np.unravel_index(flat, score.shape)
+                if not np.isfinite(score[t, d]):
+                    break
+                if t in matched_tracks or d in matched_objects:
+                    continue
+                matched_tracks.add(t)
+                matched_objects.add(d)
+                self._refresh(tracks[t], boxed[d], now)
+
+        kept = []
+        for index, track in enumerate(tracks):
+            if index not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    logging.info(f"[Tracker] Track {track.track_id} ({track.label}) lost after "
+                                 f"{now - track.first_seen:.1f}s")
+                    continue
+            kept.append(track)
+        for index, obj in enumerate(boxed):
+            if index not in matched_objects:
+                track = Track(next(self._ids), obj['label'], obj['box'], obj['confidence'] or 1.0, now)
+                logging.info(f"[Tracker] New track {track.track_id} ({track.label})")
+                kept.append(track)
+        camera.tracks = kept
+
+    def _refresh(self, track, obj, now):
+        box = np.asarray(obj['box'], dtype=np.float32)
+        dt = now - track.last_seen
+        if dt > 0:
+            measured = (box - track.detected_box) / dt
+            track.velocity = self.velocity_smoothing * measured + (1 - self.velocity_smoothing) * track.velocity
+        track.detected_box = box
+        track.box = box
+        track.confidence = obj['confidence'] or 1.0
+        track.last_seen = now
+        track.last_update = now
+        track.hits += 1
+        track.misses = 0
@@ -0,0 +1,129 @@
+import asyncio
+import collections
+import contextlib
+import json
+import logging
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+
+import backend.pipeline as pipeline
+from backend.services.fairSchedulerService import FrameSkipped
+from backend.constants import *
+
+
+'''
+Persistent frame ingestion: a camera keeps one WebSocket open, sends each
+JPEG as a binary message and gets the detection result back as a JSON text
+message on the same connection.
+
+example:
+async with websockets.connect("ws://host:5003/?camera_id=cam1") as ws:
+    await ws.send(jpeg_bytes)
+    result = json.loads(await ws.recv())
+
+A text message {"camera_id": "..."} changes the camera id mid-stream.
+If the camera sends faster than frames are processed, the oldest queued
+frames are dropped; every result carries the running "dropped" count.
+'''
+
+
+class FrameStream:
+    def __init__(self, connection, camera_id, max_queued=STREAM_MAX_QUEUED_FRAMES):
+        """
+        State of one camera connection: a small drop-oldest frame queue between
+        the receive loop and the processing loop.
+        """
+        self.connection = connection
+        self.camera_id = camera_id
+        self.frames = collections.deque(maxlen=max_queued)
+        self.frame_ready = asyncio.Event()
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+
+    async def receive(self):
+        async for data in self.connection:
+            if isinstance(data, str):
+                try:
+                    self.camera_id = json.loads(data).get("camera_id") or self.camera_id
+                except (ValueError, AttributeError):
+                    logging.warning(f"[StreamServer] Ignoring bad control message from {self.camera_id}")
+                continue
+            self.received += 1
+            if len(self.frames) == self.frames.maxlen:
+                # deque(maxlen) evicts the oldest frame on append
+                self.dropped += 1
+            self.frames.append((self.received, data))
+            self.frame_ready.set()
+
+    async def process(self):
+        while True:
+            await self.frame_ready.wait()
+            if not self.frames:
+                self.frame_ready.clear()
+                continue
+            seq, image_bytes = self.frames.popleft()
+            try:
+                # CPU steps run in an executor and the batch queue result is awaited, so no thread waits on it
+                message = await pipeline.process_frame_async(image_bytes, self.camera_id)
+            except FrameSkipped as e:
+                message = {"success": False, "skipped": True, "error": e.reason}
+            except Exception as e:
+                logging.exception("[StreamServer] Detection failed: %s", e)
+                message = {"success": False, "error": "Internal error"}
+            self.processed += 1
+            try:
+                await self.connection.send(json.dumps(dict(message, seq=seq, dropped=self.dropped)))
+            except websockets.ConnectionClosed:
+                # The camera went away; receive() ends too and handle_connection cleans up
+                return
+
+
+def _request_path(connection):
+    # websockets >= 13 exposes connection.request; older versions expose connection.path
+    request = getattr(connection, "request", None)
+    return request.path if request is not None else getattr(connection, "path", "/")
+
+
+async def handle_connection(connection):
+    query = parse_qs(urlsplit(_request_path(connection)).query)
+    camera_id = query.get("camera_id", [DEFAULT_CAMERA_ID])[0]
+    stream = FrameStream(connection, camera_id)
+    print(f"[StreamServer] Camera {camera_id} connected")
+
+    processor = asyncio.create_task(stream.process())
+    try:
+        await stream.receive()
+    except websockets.ConnectionClosed:
+        pass
+    except Exception as e:
+        print("[StreamServer] Connection error:", e)
+    finally:
+        processor.cancel()
+        # Await the task so its exception (if any) is retrieved instead of logged by asyncio at GC
+        with contextlib.suppress(asyncio.CancelledError):
+            await processor
+        print(f"[StreamServer] Camera {stream.camera_id} disconnected "
+              f"(received={stream.received}, processed={stream.processed}, dropped={stream.dropped})")
+
+
+async def main(host="0.0.0.0", port=STREAM_PORT):
+    # max_queue=1 stops the library from buffering frames we would drop anyway, so TCP pushes back on the camera
+    async with websockets.serve(handle_connection, host, port, max_size=STREAM_MAX_FRAME_BYTES, max_queue=1):
+        print(f"[StreamServer] WebSocket server started at ws://{host}:{port}")
+        await asyncio.Future()  # Run forever
+
+
+def start_in_thread(host="0.0.0.0", port=STREAM_PORT):
+    """
+    Runs the streaming server next to the Flask app, sharing its detection pipeline.
+    """
+    thread = threading.Thread(target=asyncio.run, args=(main(host, port),), name="StreamServer", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1 +1,206 @@
-THREAT_LABELS = {'Tiger', 'Leopard'}
\ No newline at end of file
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+# Canonical threats reported by the backend (the default camera profile)
+THREAT_LABELS = {'Tiger', 'Leopard'}
+
+# Threat taxonomy: canonical name -> how detectors may name it and how sure they must be.
+# "labels" are matched exactly against detector labels (Rekognition names, COCO class names),
+# "terms" are looked for in free text (OpenAI descriptions); "parent" builds the hierarchy,
+# so a profile that enables "Big Cat" also enables Tiger and Leopard. A detector label that is
+# not listed still matches through its Rekognition parent labels (e.g. "Snow Leopard" -> "Leopard").
+# Generic labels for domestic animals ("Pig", "Hog") are deliberately not mapped to a threat.
+THREAT_TAXONOMY = {
+    'Big Cat': {'severity': 'high', 'min_confidence': 0.7, 'parent': None,
+                'labels': ('Big Cat',), 'terms': ('big cat', 'big cats', 'wild cat')},
+    'Tiger': {'severity': 'critical', 'min_confidence': 0.6, 'parent': 'Big Cat',
+              'labels': ('Tiger', 'Bengal Tiger', 'Siberian Tiger'),
+              'terms': ('tiger', 'tigers', 'tigress', 'panthera tigris')},
+    'Leopard': {'severity': 'critical', 'min_confidence': 0.6, 'parent': 'Big Cat',
+                'labels': ('Leopard', 'Panther', 'Jaguar', 'Snow Leopard', 'Cheetah'),
+                'terms': ('leopard', 'leopards', 'panther', 'panthers', 'jaguar', 'cheetah', 'panthera pardus')},
+    'Bear': {'severity': 'critical', 'min_confidence': 0.6, 'parent': None,
+             'labels': ('Bear', 'Black Bear', 'Brown Bear', 'Grizzly Bear', 'bear'),
+             'terms': ('bear', 'bears', 'grizzly')},
+    'Elephant': {'severity': 'high', 'min_confidence': 0.6, 'parent': None,
+                 'labels': ('Elephant', 'elephant'), 'terms': ('elephant', 'elephants')},
+    'Wild Boar': {'severity': 'medium', 'min_confidence': 0.6, 'parent': None,
+                  'labels': ('Boar', 'Wild Boar'), 'terms': ('wild boar', 'boar', 'boars', 'wild pig')},
+}
+
+SEVERITY_ORDER = ('low', 'medium', 'high', 'critical')
+
+# Optional JSON file with per-camera threat profiles, e.g.
+# {"default": ["Tiger", "Leopard"], "cameras": {"gate": ["Big Cat", "Bear"]}}
+THREAT_PROFILES_PATH = os.getenv("THREAT_PROFILES_PATH")
+THREAT_PROFILES_RELOAD_S = 5  # how often the profile file's modification time is checked
+
+
+class ThreatTaxonomy:
+    def __init__(self, taxonomy=THREAT_TAXONOMY):
+        """
+        Compiled index over the taxonomy: detector labels resolve with one dict lookup and
+        free text is scanned once by a single regex alternation, whatever the number of threats.
+        """
+        self.taxonomy = taxonomy
+        self._by_label = {}
+        self._by_term = {}
+        for name, entry in taxonomy.items():
+            self._by_label[name.lower()] = name
+            for label in entry.get('labels', ()):
+                self._by_label[label.lower()] = name
+            for term in entry.get('terms', ()):
+                self._by_term[term.lower()] = name
+        # Longest terms first so "snow leopard" wins over "leopard"; \b keeps "bear" out of "bearing"
+        alternation = "|".join(re.escape(term) for term in sorted(self._by_term, key=len, reverse=True))
+        self._pattern = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE) if alternation else None
+
+    def canonical(self, label, parents=()):
+        """
+        Returns the canonical threat for a detector label, or None.
+        :param parents: The label's parent labels, nearest first (Rekognition "Parents"); used
+                        when the label itself is not in the taxonomy.
+        """
+        for name in (label, *parents):
+            threat = self._by_label.get(name.lower())
+            if threat is not None:
+                return threat
+        return None
+
+    def expand(self, names):
+        """
+        Returns the given threats plus every threat below them in the hierarchy.
+        """
+        names = set(names)
+        expanded = set()
+        for name, entry in self.taxonomy.items():
+            node = name
+            while node is not None:
+                if node in names:
+                    expanded.add(name)
+                    break
+                node = self.taxonomy.get(node, {}).get('parent')
+        return expanded
+
+    def match_records(self, detected_objects):
+        """
+        Maps detector records to canonical threats, keeping only those above the threat's confidence threshold.
+        Records without a confidence (e.g. free-text backends) always pass.
+        :return: Dict of canonical threat -> best confidence.
+        """
+        threats = {}
+        for obj in self.match_objects(detected_objects):
+            name, confidence = obj['label'], obj['confidence']
+            if name not in threats or (confidence or 0.0) > (threats[name] or 0.0):
+                threats[name] = confidence
+        return threats
+
+    def match_objects(self, detected_objects):
+        """
+        Same matching as match_records, but keeps every matching record (and its box).
+        :return: List of {'label', 'confidence', 'box'} records relabelled with their canonical threat.
+        """
+        matched = []
+        for obj in detected_objects:
+            name = self.canonical(obj['label'], obj.get('parents') or ())
+            if name is None:
+                continue
+            confidence = obj.get('confidence')
+            if confidence is not None and confidence < self.taxonomy[name].get('min_confidence', 0.0):
+                continue
+            matched.append({'label': name, 'confidence': confidence, 'box': obj.get('box')})
+        return matched
+
+    def match_text(self, text):
+        """
+        Returns the canonical threats mentioned in a free-text description.
+        """
+        if self._pattern is None or not text:
+            return set()
+        return {self._by_term[match.group(0).lower()] for match in self._pattern.finditer(text)}
+
+    def severity(self, names):
+        """
+        Returns the highest severity among the given threats, or None.
+        """
+        levels = [self.taxonomy[name].get('severity', 'high') for name in names if name in self.taxonomy]
+        return max(levels, key=SEVERITY_ORDER.index) if levels else None
+
+
+class ThreatProfiles:
+    def __init__(self, path=THREAT_PROFILES_PATH, taxonomy=None, reload_s=THREAT_PROFILES_RELOAD_S):
+        """
+        Which threats each camera alerts on. Profiles are read from a JSON file and re-read
+        when the file changes, so cameras can be reconfigured without a restart.
+        Without a file every camera uses THREAT_LABELS.
+        """
+        self.path = path
+        self.taxonomy = taxonomy or threat_taxonomy
+        self.reload_s = reload_s
+        self._default = self.taxonomy.expand(THREAT_LABELS)
+        self._cameras = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """
+        Re-reads the profile file. A broken file keeps the previous profiles.
+        """
+        if not self.path:
+            return
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path) as f:
+                config = json.load(f)
+            default = self.taxonomy.expand(config.get('default', THREAT_LABELS))
+            cameras = {camera_id: self.taxonomy.expand(names) for camera_id, names in config.get('cameras', {}).items()}
+        except Exception as e:
+            logging.error(f"[ThreatProfiles] Could not load {self.path}: {e}")
+            return
+        with self._lock:
+            self._default, self._cameras, self._mtime = default, cameras, mtime
+        logging.info(f"[ThreatProfiles] Loaded profiles for {len(cameras)} cameras from {self.path}")
+
+    def threats_for(self, camera_id):
+        """
+        Returns the set of canonical threats enabled for a camera.
+        """
+        self._reload_if_changed()
+        with self._lock:
+            return self._cameras.get(camera_id, self._default)
+
+    def filter(self, camera_id, threats):
+        """
+        Keeps only the threats the camera's profile alerts on.
+        """
+        enabled = self.threats_for(camera_id)
+        return {threat for threat in threats if threat in enabled}
+
+    def describe(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "default": sorted(self._default),
+                "cameras": {camera_id: sorted(names) for camera_id, names in self._cameras.items()},
+            }
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if not self.path or now - self._checked_at < self.reload_s:
+            return
+        self._checked_at = now
+        try:
+            changed = os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return
+        if changed:
+            self.reload()
+
+
+threat_taxonomy = ThreatTaxonomy()
@@ -0,0 +1,48 @@
+import sys
+import time
+import types
+
+
+def install(latency_ms=20):
+    """
+    Registers a stand-in AWSIoTPythonSDK.MQTTLib whose publish and shadow update only sleep,
+    so the benchmark measures the backend and not the network to AWS IoT Core.
+    Must run before backend.pipeline is imported.
+    """
+    delay = latency_ms / 1000.0
+    calls = {"publish": 0, "shadow_update": 0}
+
+    class FakeShadowHandler:
+        def shadowUpdate(self, payload, callback, timeout):
+            time.sleep(delay)
+            calls["shadow_update"] += 1
+
+    class FakeClient:
+        def __init__(self, client_id, *args, **kwargs):
+            self.client_id = client_id
+
+        def __getattr__(self, name):
+            # configureEndpoint, configureCredentials, ...: accepted and ignored
+            if name.startswith("configure"):
+                return lambda *args, **kwargs: None
+            raise AttributeError(name)
+
+        def connect(self, *args, **kwargs):
+            return True
+
+        def publish(self, topic, payload, qos):
+            time.sleep(delay)
+            calls["publish"] += 1
+            return True
+
+        def createShadowHandlerWithName(self, name, persistent):
+            return FakeShadowHandler()
+
+    package = types.ModuleType("AWSIoTPythonSDK")
+    mqtt_lib = types.ModuleType("AWSIoTPythonSDK.MQTTLib")
+    mqtt_lib.AWSIoTMQTTClient = FakeClient
+    mqtt_lib.AWSIoTMQTTShadowClient = FakeClient
+    package.MQTTLib = mqtt_lib
+    sys.modules["AWSIoTPythonSDK"] = package
+    sys.modules["AWSIoTPythonSDK.MQTTLib"] = mqtt_lib
+    return calls
@@ -0,0 +1,384 @@
+"""
+Benchmark / load test for the detection backend.
+
+Replays a corpus of JPEGs against /detect_photo at several concurrency levels, for every
+detector backend and serving mode asked for. Rekognition and SNS are served by a local stub
+with injected latency (bench.stubServer), AWS IoT by bench.fakeIot, so runs are reproducible
+and cost nothing. The server's result cache and tracker are off unless --reuse on is given,
+so every request reaches the detector. Reports throughput, p50/p95/p99 latency and peak server memory, saves the
+results as a JSON baseline and compares them with an earlier one.
+
+Run from animal-detect-backend/:
+
+    python -m bench.loadTest --methods mock rek --modes thread process --concurrency 1 8 32 \\
+        --requests 400 --output bench/results/baseline.json
+    python -m bench.loadTest --methods mock rek --modes thread process --concurrency 1 8 32 \\
+        --requests 400 --compare bench/results/baseline.json
+"""
+import argparse
+import io
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.stubServer import StubAwsServer
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_corpus(path=None, count=32, size=(640, 480), seed=0):
+    """
+    Returns the JPEG bytes of every .jpg under path, or `count` synthetic frames
+    (seeded noise plus a few shapes) when no corpus directory is given.
+    """
+    if path:
+        files = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path) for name in names if name.lower().endswith((".jpg", ".jpeg"))
+        )
+        if not files:
+            raise SystemExit(f"No JPEG files found under {path}")
+        corpus = []
+        for file_path in files:
+            with open(file_path, "rb") as f:
+                corpus.append(f.read())
+        return corpus
+
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    rng = np.random.default_rng(seed)
+    corpus = []
+    for _ in range(count):
+        pixels = rng.integers(60, 140, (size[1], size[0], 3), dtype=np.uint8)
+        image = Image.fromarray(pixels, "RGB")
+        draw = ImageDraw.Draw(image)
+        for _ in range(3):
+            x, y = int(rng.integers(0, size[0] - 80)), int(rng.integers(0, size[1] - 80))
+            draw.ellipse([x, y, x + 80, y + 60], fill=tuple(int(v) for v in rng.integers(0, 255, 3)))
+        buf = io.BytesIO()
+        image.save(buf, format="JPEG", quality=80)
+        corpus.append(buf.getvalue())
+    return corpus
+
+
+class MemorySampler:
+    def __init__(self, pid, interval_s=0.2):
+        """
+        Samples the resident memory of a process and all its descendants (inference workers) from /proc.
+        """
+        self.pid = pid
+        self.interval_s = interval_s
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="MemorySampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.peak_bytes
+
+    def reset(self):
+        self.peak_bytes = self.current_bytes()
+
+    def current_bytes(self):
+        return sum(_rss_bytes(pid) for pid in [self.pid] + _descendants(self.pid))
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.peak_bytes = max(self.peak_bytes, self.current_bytes())
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _descendants(pid):
+    children = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        return []
+    return children + [grandchild for child in children for grandchild in _descendants(child)]
+
+
+def start_server(method, mode, port, stub_url, args):
+    env = dict(
+        os.environ,
+        DETECTOR_METHOD=method,
+        SERVING_MODE=mode,
+        AWS_ENDPOINT_URL=stub_url,
+        AWS_ACCESS_KEY_ID="bench",
+        AWS_SECRET_ACCESS_KEY="bench",
+        AWS_REGION="us-east-1",
+        MOCK_DETECTOR_LATENCY_MS=str(args.detector_latency_ms),
+        LOG_SAMPLE_EVERY=str(args.log_sample_every),
+        # A replayed corpus would otherwise mostly measure cache hits and tracker predictions
+        CACHE_ENABLED="1" if args.reuse == "on" else "0",
+        TRACKER_ENABLED="1" if args.reuse == "on" else "0",
+    )
+    if args.workers:
+        env["INFERENCE_WORKERS"] = str(args.workers)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "bench.runServer", "--port", str(port), "--iot-latency-ms", str(args.iot_latency_ms)],
+        cwd=BACKEND_ROOT, env=env,
+        stdout=subprocess.DEVNULL if not args.verbose else None,
+        stderr=subprocess.DEVNULL if not args.verbose else None,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.start_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server for {method}/{mode} exited with code {process.returncode}")
+        try:
+            if requests.get(base_url + "/health", timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Server for {method}/{mode} did not start within {args.start_timeout}s")
+
+
+def run_load(base_url, corpus, concurrency, total_requests, cameras):
+    """
+    Sends total_requests uploads with `concurrency` client threads (one keep-alive session each).
+    :return: (sorted latencies in ms, number of errors, wall time in s)
+    """
+    counter = itertools.count()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client():
+        session = requests.Session()
+        while True:
+            i = next(counter)
+            if i >= total_requests:
+                return
+            files = {"image": ("frame.jpg", corpus[i % len(corpus)], "image/jpeg")}
+            data = {"camera_id": f"bench-{i % cameras}"}
+            start = time.perf_counter()
+            try:
+                ok = session.post(base_url + "/detect_photo", files=files, data=data, timeout=60).ok
+            except requests.RequestException:
+                ok = False
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed_ms)
+                else:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    return sorted(latencies), errors[0], time.perf_counter() - started
+
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, min(len(sorted_values), math.ceil(p / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize(method, mode, concurrency, latencies, errors, wall_s, peak_bytes, server_stats):
+    completed = len(latencies)
+    return {
+        "method": method,
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": completed + errors,
+        "errors": errors,
+        "throughput_rps": round(completed / wall_s, 2) if wall_s else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / completed, 2) if completed else None,
+            "p50": _round(percentile(latencies, 50)),
+            "p95": _round(percentile(latencies, 95)),
+            "p99": _round(percentile(latencies, 99)),
+            "max": _round(latencies[-1] if latencies else None),
+        },
+        "peak_rss_mb": round(peak_bytes / 2 ** 20, 1),
+        "server": server_stats,
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def server_stats(base_url):
+    stats = {}
+    for name in ("inference_stats", "cache_stats", "alert_stats"):
+        try:
+            stats[name] = requests.get(f"{base_url}/{name}", timeout=5).json()
+        except (requests.RequestException, ValueError):
+            stats[name] = None
+    inference = stats.get("inference_stats") or {}
+    cache = stats.get("cache_stats") or {}
+    # Keep the baseline file readable: only the headline numbers
+    return {
+        "mean_batch_size": inference.get("mean_batch_size"),
+        "cache_hit_rate": cache.get("hit_rate"),
+        "alerts": stats.get("alert_stats"),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints each result next to the baseline and returns the regressions:
+    p95 latency up, or throughput down, by more than `tolerance` (a fraction).
+    """
+    previous = {(r["method"], r["mode"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        key = (result["method"], result["mode"], result["concurrency"])
+        base = previous.get(key)
+        if base is None:
+            print(f"  {key}: no baseline")
+            continue
+        p95, base_p95 = result["latency_ms"]["p95"], base["latency_ms"]["p95"]
+        rps, base_rps = result["throughput_rps"], base["throughput_rps"]
+        print(f"  {key}: p95 {base_p95} -> {p95} ms, throughput {base_rps} -> {rps} req/s")
+        if p95 is not None and base_p95 and p95 > base_p95 * (1 + tolerance):
+            regressions.append(f"{key}: p95 latency {base_p95} -> {p95} ms")
+        if base_rps and rps < base_rps * (1 - tolerance):
+            regressions.append(f"{key}: throughput {base_rps} -> {rps} req/s")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of JPEGs to replay (synthetic frames when omitted)")
+    parser.add_argument("--corpus-size", type=int, default=32, help="Number of synthetic frames")
+    parser.add_argument("--methods", nargs="+", default=["mock"], help="Detector backends (DETECTOR_METHOD)")
+    parser.add_argument("--modes", nargs="+", default=["thread"], help="Serving modes (SERVING_MODE)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests before each backend/mode")
+    parser.add_argument("--cameras", type=int, default=4, help="Distinct camera ids to spread uploads over")
+    parser.add_argument("--workers", type=int, default=0, help="INFERENCE_WORKERS for process mode (0 = default)")
+    parser.add_argument("--cloud-latency-ms", type=float, default=80, help="Injected Rekognition/SNS latency")
+    parser.add_argument("--cloud-jitter-ms", type=float, default=20)
+    parser.add_argument("--threat-ratio", type=float, default=0.2, help="Share of stubbed frames with a tiger")
+    parser.add_argument("--iot-latency-ms", type=float, default=20, help="Injected MQTT/shadow latency")
+    parser.add_argument("--detector-latency-ms", type=int, default=30, help="Latency of the mock detector")
+    parser.add_argument("--log-sample-every", type=int, default=50, help="LOG_SAMPLE_EVERY for the server")
+    parser.add_argument("--reuse", choices=["off", "on"], default="off",
+                        help="Result cache and tracker on the server; off makes every request run the detector")
+    parser.add_argument("--port", type=int, default=5102)
+    parser.add_argument("--start-timeout", type=float, default=180)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("--verbose", action="store_true", help="Show the server's output")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    corpus = load_corpus(args.corpus, args.corpus_size, seed=args.seed)
+    print(f"[Bench] Corpus: {len(corpus)} frames, {sum(map(len, corpus)) / len(corpus) / 1024:.0f} KiB average")
+    print(f"[Bench] Result cache and tracker: {args.reuse}"
+          + ("" if args.reuse == "off" else " (repeated frames measure cache hits, not the detector)"))
+
+    stub = StubAwsServer(latency_ms=args.cloud_latency_ms, jitter_ms=args.cloud_jitter_ms,
+                         threat_ratio=args.threat_ratio, seed=args.seed).start()
+    results = []
+    try:
+        for method, mode in itertools.product(args.methods, args.modes):
+            process, base_url = start_server(method, mode, args.port, stub.url, args)
+            sampler = MemorySampler(process.pid).start()
+            try:
+                run_load(base_url, corpus, min(4, args.warmup) or 1, args.warmup, args.cameras)
+                for concurrency in args.concurrency:
+                    sampler.reset()
+                    latencies, errors, wall_s = run_load(base_url, corpus, concurrency, args.requests, args.cameras)
+                    result = summarize(method, mode, concurrency, latencies, errors, wall_s,
+                                       sampler.peak_bytes, server_stats(base_url))
+                    results.append(result)
+                    latency = result["latency_ms"]
+                    print(f"[Bench] {method:>8} {mode:>7} c={concurrency:<3} "
+                          f"{result['throughput_rps']:8.1f} req/s  p50 {latency['p50']} ms  "
+                          f"p95 {latency['p95']} ms  p99 {latency['p99']} ms  "
+                          f"errors {errors}  peak RSS {result['peak_rss_mb']} MB")
+            finally:
+                sampler.stop()
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+    finally:
+        stub.stop()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "verbose")},
+            "stub_calls": stub.calls,
+            "result_reuse": args.reuse,
+        },
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"[Bench] Compared with {args.compare} (revision {baseline.get('meta', {}).get('git_revision')}):")
+        baseline_reuse = baseline.get("meta", {}).get("result_reuse", "on")
+        if baseline_reuse != args.reuse:
+            print(f"[Bench] Warning: baseline ran with result reuse {baseline_reuse}, this run with {args.reuse}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("[Bench] Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("[Bench] No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Starts the Flask app for a benchmark run with the AWS IoT client replaced by bench.fakeIot.
+Rekognition and SNS are reached through AWS_ENDPOINT_URL (see bench.stubServer).
+
+    python -m bench.runServer --port 5102 --iot-latency-ms 20
+"""
+import argparse
+import logging
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=5102)
+    parser.add_argument("--iot-latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    from bench import fakeIot
+
+    fakeIot.install(args.iot_latency_ms)
+    # Per-request logging would dominate the measurement
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    from backend.app import app
+
+    app.run(host="127.0.0.1", port=args.port, debug=False, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class StubAwsServer:
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=50, jitter_ms=10, threat_ratio=0.2, seed=0):
+        """
+        Local HTTP endpoint standing in for Rekognition DetectLabels and SNS Publish.
+        The backend reaches it through AWS_ENDPOINT_URL, so worker processes use it too.
+        :param latency_ms: Mean injected latency per call.
+        :param jitter_ms: Uniform +/- jitter around the mean.
+        :param threat_ratio: Fraction of DetectLabels calls that report a tiger.
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.threat_ratio = threat_ratio
+        self.random = random.Random(seed)
+        self.calls = {"DetectLabels": 0, "Publish": 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="StubAws", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _delay(self):
+        with self._lock:
+            delay = self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000.0)
+
+    def _detect_labels(self):
+        with self._lock:
+            self.calls["DetectLabels"] += 1
+            threat = self.random.random() < self.threat_ratio
+        labels = [{"Name": "Grass", "Confidence": 97.0, "Instances": [], "Parents": []}]
+        if threat:
+            labels.append({"Name": "Tiger", "Confidence": 93.5, "Instances": [],
+                           "Parents": [{"Name": "Big Cat"}, {"Name": "Wildlife"}]})
+        return {"Labels": labels, "LabelModelVersion": "3.0"}
+
+    def _publish(self):
+        with self._lock:
+            self.calls["Publish"] += 1
+        return str(uuid.uuid4())
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, like the real endpoints
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub._delay()
+                target = self.headers.get("X-Amz-Target", "")
+                if target.endswith(".DetectLabels"):
+                    self._send(200, "application/x-amz-json-1.1", json.dumps(stub._detect_labels()))
+                elif target.endswith(".Publish"):
+                    self._send(200, "application/x-amz-json-1.0", json.dumps({"MessageId": stub._publish()}))
+                elif parse_qs(body.decode("utf-8", "replace")).get("Action") == ["Publish"]:
+                    # SNS query protocol
+                    xml = ('<PublishResponse xmlns="http://sns.amazonaws.com/doc/2010-03-31/">'
+                           f'<PublishResult><MessageId>{stub._publish()}</MessageId></PublishResult>'
+                           f'<ResponseMetadata><RequestId>{uuid.uuid4()}</RequestId></ResponseMetadata>'
+                           '</PublishResponse>')
+                    self._send(200, "text/xml", xml)
+                else:
+                    self._send(400, "application/json", json.dumps({"__type": "UnknownOperation", "message": target}))
+
+            def _send(self, status, content_type, text):
+                data = text.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
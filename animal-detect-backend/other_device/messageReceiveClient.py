@@ -3,9 +3,11 @@ from AWSIoTPythonSDK.MQTTLib import AWSIoTMQTTShadowClient, AWSIoTMQTTClient
 import os
 import time
 import json
+from collections import deque
 
 from constants import *
 from led_control import turn_on_light, turn_off_light
+from payloadCodec import decode
 
 class MessageReceiveClient:
     def __init__(self):
@@ -91,10 +93,29 @@ class MessageReceiveClient:
             print("無法處理 delta 訊息：", e)
 
     
+_seen_alert_ids = deque(maxlen=64)
+
+
 def message_callback(client, userdata, message):
     print("\n[MQTT Message] 收到訊息")
-    payload = message.payload.decode()
-    print(f"Payload: {payload}")
+    # JSON, msgpack or CBOR, depending on the backend's MQTT_PAYLOAD_ENCODING
+    try:
+        payload = decode(message.payload)
+    except Exception as e:
+        print("[MQTT Message] Could not decode payload:", e)
+        return
+    # The backend retries an alert with the same alert_id; show each alert once
+    alert_id = payload.get("alert_id")
+    if alert_id is not None:
+        if alert_id in _seen_alert_ids:
+            print(f"[MQTT Message] Duplicate alert {alert_id} ignored")
+            return
+        _seen_alert_ids.append(alert_id)
+    if payload.get("type") == "summary":
+        # Periodic summary of safe frames; also tells us the backend is alive
+        print(f"[MQTT Message] Summary: {payload['safe_frames']} safe frames, LED should be {payload['led']}")
+    else:
+        print(f"Payload: {payload}")
 
     # print(f"  message: {message.json()}")
     # print(f"  Payload: {message.payload.decode('utf-8')}")
@@ -0,0 +1,46 @@
+import json
+
+
+# First byte of a binary payload names its encoding; JSON payloads always start with "{".
+# Copy of backend/services/payloadCodec.py (the LED device does not ship the backend): keep them in sync.
+_MSGPACK_TAG = b"\x01"
+_CBOR_TAG = b"\x02"
+
+
+def make_encoder(encoding="json"):
+    """
+    Returns a function turning a message dict into an MQTT payload.
+    :param encoding: "json", "msgpack" or "cbor". The binary encodings need the msgpack or
+                     cbor2 package; when it is missing, JSON is used instead.
+    """
+    if encoding == "msgpack":
+        try:
+            import msgpack
+            return lambda message: _MSGPACK_TAG + msgpack.packb(message, use_bin_type=True)
+        except ImportError:
+            print("[PayloadCodec] msgpack is not installed, sending JSON payloads")
+    elif encoding == "cbor":
+        try:
+            import cbor2
+            return lambda message: _CBOR_TAG + cbor2.dumps(message)
+        except ImportError:
+            print("[PayloadCodec] cbor2 is not installed, sending JSON payloads")
+    elif encoding != "json":
+        raise ValueError(f"Unknown payload encoding '{encoding}'; use json, msgpack or cbor.")
+    return lambda message: json.dumps(message, separators=(",", ":"))
+
+
+def decode(payload):
+    """
+    Turns an MQTT payload from any encoder above back into a message dict.
+    """
+    if isinstance(payload, str):
+        return json.loads(payload)
+    tag, body = payload[:1], payload[1:]
+    if tag == _MSGPACK_TAG:
+        import msgpack
+        return msgpack.unpackb(body, raw=False)
+    if tag == _CBOR_TAG:
+        import cbor2
+        return cbor2.loads(body)
+    return json.loads(payload.decode("utf-8"))
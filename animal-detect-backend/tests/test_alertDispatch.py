@@ -0,0 +1,62 @@
+import threading
+
+from backend.services.alertDispatchService import AlertDispatcher
+
+
+class FlakyHandler:
+    def __init__(self, failures):
+        self.failures = failures
+        self.messages = []
+        self.done = threading.Event()
+
+    def __call__(self, message):
+        self.messages.append(message)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker unavailable")
+        self.done.set()
+
+
+def make_dispatcher(max_retries=3):
+    return AlertDispatcher(max_retries=max_retries, backoff_base=0.001, backoff_max=0.01)
+
+
+def test_failed_alert_is_retried_with_the_same_alert_id():
+    dispatcher = make_dispatcher()
+    handler = FlakyHandler(failures=2)
+    dispatcher.register_sink("mqtt", {"threat": handler})
+    message = {"danger": True, "threat": ["Tiger"]}
+    assert dispatcher.dispatch("threat", message)
+    dispatcher.close(timeout=5)
+
+    assert len(handler.messages) == 3
+    assert len({m["alert_id"] for m in handler.messages}) == 1
+    assert "alert_id" not in message
+    metrics = dispatcher.metrics()["mqtt"]
+    assert (metrics["sent"], metrics["retries"], metrics["failed"]) == (1, 2, 0)
+
+
+def test_sink_gives_up_after_max_retries():
+    dispatcher = make_dispatcher(max_retries=1)
+    handler = FlakyHandler(failures=5)
+    dispatcher.register_sink("sns", {"threat": handler})
+    dispatcher.dispatch("threat", {"threat": ["Bear"]})
+    dispatcher.close(timeout=5)
+
+    assert len(handler.messages) == 2
+    assert dispatcher.metrics()["sns"]["failed"] == 1
+
+
+def test_sinks_share_the_alert_id_and_filtering():
+    dispatcher = make_dispatcher()
+    sns, mqtt = FlakyHandler(failures=0), FlakyHandler(failures=0)
+    dispatcher.register_sink("sns", {"threat": sns})
+    dispatcher.register_sink("mqtt", {"threat": mqtt, "clear": mqtt})
+    dispatcher.dispatch("threat", {"threat": ["Tiger"]})
+    dispatcher.dispatch("clear", {"danger": False})
+    dispatcher.dispatch("threat", {"threat": ["Tiger"]}, sinks=["mqtt"])
+    dispatcher.close(timeout=5)
+
+    assert len(sns.messages) == 1 and len(mqtt.messages) == 3
+    assert sns.messages[0]["alert_id"] == mqtt.messages[0]["alert_id"]
+    assert len({m["alert_id"] for m in mqtt.messages}) == 3
@@ -0,0 +1,33 @@
+from backend.services.alertStateService import AlertStateMachine
+
+
+def make_machine(**options):
+    transitions = []
+    machine = AlertStateMachine(lambda event, message: transitions.append((event, message)),
+                                confirm_frames=2, window=3, cooldown_s=300, quiet_period_s=30,
+                                tick_interval_s=3600, **options)
+    return machine, transitions
+
+
+def test_threat_is_confirmed_then_cleared():
+    machine, transitions = make_machine()
+    machine.update("cam", {"Tiger"}, now=0)
+    assert transitions == []
+    machine.update("cam", {"Tiger"}, now=1)
+    machine.update("cam", {"Tiger"}, now=2)     # within the cooldown: suppressed
+    machine.tick(now=40)
+    assert [event for event, _ in transitions] == ["threat", "clear"]
+    assert transitions[0][1]["threat"] == ["Tiger"]
+
+
+def test_alerting_cameras_are_not_forgotten():
+    machine, transitions = make_machine()
+    machine._cameras.max_cameras = 1
+    machine.update("alerting", {"Tiger"}, now=0)
+    machine.update("alerting", {"Tiger"}, now=1)
+    for index in range(3):
+        machine.update(f"quiet{index}", set(), now=2 + index)
+    assert "alerting" in machine.stats()["cameras"]
+    assert len(machine.stats()["cameras"]) == 2
+    machine.tick(now=40)
+    assert transitions[-1] == ("clear", {"success": True, "danger": False, "camera_id": "alerting"})
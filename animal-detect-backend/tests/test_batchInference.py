@@ -0,0 +1,65 @@
+import threading
+
+from backend.services.batchInferenceService import BatchInference
+from backend.services.inferenceWorkerPool import InferenceWorkerPool, WorkerTimeout
+
+
+class FailingDetector:
+    def __init__(self, error):
+        self.error = error
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def detect_labels_batch(self, images):
+        with self.lock:
+            self.calls.append(list(images))
+        if len(images) > 1 or images == [b"bad"]:
+            raise self.error
+        return [{"Tiger"}]
+
+
+def submit_batch(batcher, images):
+    # Submitted within max_wait_ms, so the frames run as one batch
+    futures = [batcher.submit(image, "cam") for image in images]
+    return [future.exception(timeout=5) or future.result() for future in futures]
+
+
+def test_failed_batch_is_retried_frame_by_frame():
+    detector = FailingDetector(ValueError("bad frame"))
+    batcher = BatchInference(detector, max_batch_size=3, max_wait_ms=200)
+    try:
+        results = submit_batch(batcher, [b"a", b"bad", b"c"])
+    finally:
+        batcher.close()
+    assert results[0] == {"Tiger"} and results[2] == {"Tiger"}
+    assert isinstance(results[1], ValueError)
+
+
+class PoolQueue(BatchInference):
+    # The worker pool's batch handling without starting worker processes
+    fail_fast_errors = InferenceWorkerPool.fail_fast_errors
+
+
+def test_hung_worker_fails_the_batch_at_once():
+    detector = FailingDetector(WorkerTimeout("no answer within 30s"))
+    batcher = PoolQueue(detector, max_batch_size=3, max_wait_ms=200)
+    try:
+        results = submit_batch(batcher, [b"a", b"b", b"c"])
+    finally:
+        batcher.close()
+    assert all(isinstance(result, WorkerTimeout) for result in results)
+    assert len(detector.calls) == 1
+
+
+class ShortDetector:
+    def detect_labels_batch(self, images):
+        return [{"Tiger"}] * (len(images) - 1)
+
+
+def test_missing_results_fail_the_frames_instead_of_hanging():
+    batcher = BatchInference(ShortDetector(), max_batch_size=3, max_wait_ms=200)
+    try:
+        results = submit_batch(batcher, [b"a", b"b", b"c"])
+    finally:
+        batcher.close()
+    assert all(isinstance(result, RuntimeError) for result in results)
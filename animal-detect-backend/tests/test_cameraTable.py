@@ -0,0 +1,37 @@
+from backend.services.cameraTableService import CameraTable
+
+
+def test_least_recently_seen_camera_is_dropped_first():
+    table = CameraTable(lambda camera_id: {"id": camera_id}, max_cameras=2, idle_s=60)
+    table.get("a", now=0)
+    table.get("b", now=1)
+    table.get("a", now=2)
+    table.get("c", now=3)
+    assert sorted(camera_id for camera_id, _ in table.items()) == ["a", "c"]
+    assert table.evicted == 1
+
+
+def test_idle_cameras_are_dropped():
+    table = CameraTable(lambda camera_id: {}, max_cameras=10, idle_s=60)
+    table.get("a", now=0)
+    table.get("b", now=50)
+    table.get("c", now=100)
+    assert "a" not in table and "b" in table and "c" in table
+
+
+def test_state_survives_until_evicted():
+    table = CameraTable(lambda camera_id: [], max_cameras=10, idle_s=60)
+    table.get("a", now=0).append(1)
+    assert table.get("a", now=30) == [1]
+    assert table.peek("missing") is None
+
+
+def test_cameras_that_cannot_be_evicted_are_kept():
+    table = CameraTable(lambda camera_id: {"busy": camera_id == "busy"}, max_cameras=1, idle_s=60,
+                        can_evict=lambda state: not state["busy"])
+    table.get("busy", now=0)
+    table.get("x", now=1000)
+    # Over the limit, but the busy camera stays and the requested one is never dropped
+    assert "busy" in table and "x" in table
+    table.get("y", now=1001)
+    assert "x" not in table and "y" in table
@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+import backend.services.cloudClientService as cloudClient
+
+
+class FakeSession:
+    def __init__(self):
+        self.created = []
+
+    def client(self, service_name, **options):
+        self.created.append((service_name, options))
+        return object()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    # Exercises the client cache without boto3: the session and botocore Config are replaced
+    session = FakeSession()
+    monkeypatch.setattr(cloudClient, "_session", session)
+    monkeypatch.setattr(cloudClient, "client_config", lambda **options: options)
+    cloudClient.reset_clients()
+    yield session
+    cloudClient.reset_clients()
+
+
+def test_clients_are_reused(session):
+    first = cloudClient.get_client("sns", region_name="us-east-1")
+    assert cloudClient.get_client("sns", region_name="us-east-1") is first
+    assert cloudClient.get_client("sns", region_name="eu-west-1") is not first
+    assert cloudClient.get_client("sns", region_name="us-east-1", max_pool_connections=4) is not first
+    assert len(session.created) == 3
+
+
+def test_concurrent_callers_share_one_client(session):
+    barrier = threading.Barrier(8)
+    clients = []
+
+    def call():
+        barrier.wait()
+        clients.append(cloudClient.get_client("rekognition", region_name="us-east-1"))
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(session.created) == 1
+    assert all(client is clients[0] for client in clients)
+
+
+def test_reset_clients_drops_the_cache(session):
+    first = cloudClient.get_client("sns", region_name="us-east-1")
+    cloudClient.reset_clients()
+    assert cloudClient.get_client("sns", region_name="us-east-1") is not first
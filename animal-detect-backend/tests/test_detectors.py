@@ -0,0 +1,22 @@
+import pytest
+
+from backend.services.detectors import DETECTOR_BACKENDS, create_backend, register_backend
+from backend.services.detectors.mockDetector import MockDetector
+
+
+def test_create_backend_by_name():
+    backend = create_backend("MOCK", labels=["Tiger"], latency_ms=0)
+    assert isinstance(backend, MockDetector)
+    assert backend.detect(b"frame") == [{"label": "Tiger", "confidence": 1.0, "box": None}]
+    assert backend.detect_batch([b"a", b"b"]) == [backend.detect(b"a")] * 2
+
+
+def test_unknown_backend_lists_the_choices():
+    with pytest.raises(ValueError, match="mock"):
+        create_backend("resnet")
+
+
+def test_register_backend(monkeypatch):
+    monkeypatch.setattr("backend.services.detectors.DETECTOR_BACKENDS", dict(DETECTOR_BACKENDS))
+    register_backend("Fixture", "backend.services.detectors.mockDetector:MockDetector")
+    assert isinstance(create_backend("fixture", latency_ms=0), MockDetector)
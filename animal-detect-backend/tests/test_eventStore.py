@@ -0,0 +1,66 @@
+import pytest
+
+from backend.services.eventStoreService import EventStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(path=str(tmp_path / "events.db"), flush_interval_s=0.01)
+    yield store
+    store.close(timeout=5)
+
+
+def test_round_trip(store):
+    store.record("cam1", {"Tiger"}, severity="critical", ts=100.0)
+    store.record("cam2", {"Bear", "Tiger"}, severity="critical", tracks=[{"track_id": 1}], tracked=True, ts=200.0)
+    store.record("cam1", set(), ts=300.0)  # safe frames are not recorded by default
+    store.flush(timeout=5)
+
+    events = store.query()["events"]
+    assert [event["ts"] for event in events] == [200.0, 100.0]
+    assert events[0]["labels"] == ["Bear", "Tiger"]
+    assert events[0]["tracked"] is True
+    assert events[0]["tracks"] == [{"track_id": 1}]
+    assert [event["camera_id"] for event in store.query(label="Bear")["events"]] == ["cam2"]
+    assert [event["ts"] for event in store.query(camera_id="cam1", start=50, end=150)["events"]] == [100.0]
+
+    counts = {group["key"]: group["events"] for group in store.aggregate("label")}
+    assert counts == {"Tiger": 2, "Bear": 1}
+    assert store.stats()["written"] == 2
+
+
+def test_pagination(store):
+    for ts in range(5):
+        store.record("cam1", {"Tiger"}, ts=float(ts))
+    store.flush(timeout=5)
+
+    first = store.query(limit=3)
+    second = store.query(limit=3, cursor=first["next_cursor"])
+    assert [event["ts"] for event in first["events"] + second["events"]] == [4.0, 3.0, 2.0, 1.0, 0.0]
+    assert second["next_cursor"] is None
+    with pytest.raises(ValueError):
+        store.query(cursor="not-a-cursor")
+
+
+def test_disabled_store():
+    store = EventStore(path=None)
+    assert store.enabled is False
+    assert store.record("cam1", {"Tiger"}) is False
+    with pytest.raises(RuntimeError):
+        store.query()
+
+
+def test_purge_uses_the_time_indexes(store):
+    store.record("cam1", {"Tiger"}, ts=1.0)
+    store.record("cam1", {"Bear"}, ts=10 ** 10)
+    store.flush(timeout=5)
+    connection = store._connect()
+    for table in ("events", "event_labels"):
+        plan = " ".join(row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN DELETE FROM {table} WHERE ts < ?", (5.0,)))
+        assert "USING" in plan and "INDEX" in plan, plan
+
+    store.retention_days = 1
+    store._purge(connection)
+    assert [event["labels"] for event in store.query()["events"]] == [["Bear"]]
+    assert connection.execute("SELECT COUNT(*) FROM event_labels").fetchone()[0] == 1
+    connection.close()
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from backend.services.batchInferenceService import BatchInference
+from backend.services.fairSchedulerService import FairScheduler, FrameSkipped
+
+
+class SlowDetector:
+    def __init__(self, delay_s):
+        self.delay_s = delay_s
+        self.release = threading.Event()
+
+    def detect_labels_batch(self, images):
+        self.release.wait(self.delay_s)
+        return [set() for _ in images]
+
+
+def test_cancelled_frame_shed_on_deadline_keeps_worker_alive():
+    detector = SlowDetector(delay_s=1.0)
+    batcher = BatchInference(detector, max_batch_size=1, max_wait_ms=1)
+    batcher._queue.deadline_s = 0.2
+    try:
+        busy = batcher.submit(b"busy", "cam")      # occupies the worker
+        time.sleep(0.05)
+        cancelled = batcher.submit(b"late", "cam")
+        assert cancelled.cancel()
+        time.sleep(0.3)                             # the cancelled frame is now past its deadline
+        detector.release.set()
+        busy.result(timeout=5)
+        time.sleep(0.1)
+
+        assert all(worker.is_alive() for worker in batcher._workers)
+        assert batcher.detect_labels(b"next", timeout=5, camera_id="cam") == set()
+    finally:
+        batcher.close()
+
+
+def test_on_shed_errors_do_not_escape_get():
+    def broken(item, error):
+        raise RuntimeError("boom")
+
+    scheduler = FairScheduler(deadline_s=0.0, on_shed=broken)
+    scheduler.put("stale", "cam")
+    time.sleep(0.01)
+    scheduler.put_control("stop")
+    assert scheduler.get(timeout=1) == "stop"
+    assert scheduler.stats()["cam"]["shed"]["deadline"] == 1
+
+
+def test_full_camera_queue_is_shed_without_blocking_other_cameras():
+    scheduler = FairScheduler(max_per_camera=2, deadline_s=10)
+    scheduler.put(1, "chatty")
+    scheduler.put(2, "chatty")
+    with pytest.raises(FrameSkipped) as skipped:
+        scheduler.put(3, "chatty")
+    assert skipped.value.reason == "queue_full"
+    scheduler.put("q", "quiet")
+    # Start-time fair queuing interleaves the quiet camera with the chatty one
+    assert [scheduler.get(timeout=1) for _ in range(3)] == [1, "q", 2]
+
+
+def test_idle_cameras_are_forgotten_but_not_while_frames_are_queued():
+    scheduler = FairScheduler(deadline_s=10)
+    scheduler._cameras.max_cameras = 3
+    scheduler.put("waiting", "busy")
+    for index in range(10):
+        scheduler.put(index, f"cam{index}")
+    assert "busy" in scheduler.stats()
+    items = [scheduler.get(timeout=1) for _ in range(11)]
+    assert sorted(map(str, items)) == sorted(["waiting"] + [str(index) for index in range(10)])
+    scheduler.put("next", "new")
+    assert len(scheduler.stats()) <= 3
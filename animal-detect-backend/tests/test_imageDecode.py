@@ -0,0 +1,37 @@
+import io
+
+from PIL import Image
+
+from backend.services.imageDecodeService import EXIF_ORIENTATION, decode_rgb
+
+
+def rotated_jpeg(size=(400, 200), orientation=6):
+    """Landscape pixels with a blue left edge, tagged to be shown rotated 90 degrees clockwise."""
+    image = Image.new("RGB", size, (255, 0, 0))
+    image.paste((0, 0, 255), (0, 0, size[0] // 4, size[1]))
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", exif=exif)
+    return buf.getvalue()
+
+
+def test_exif_orientation_is_applied():
+    array, size = decode_rgb(rotated_jpeg())
+    assert size == (200, 400)
+    assert array.shape == (400, 200, 3)
+    # Rotated clockwise, the blue left edge is now at the top
+    assert array[5, 100, 2] > 200 and array[395, 100, 0] > 200
+
+
+def test_draft_decoding_keeps_the_upright_size():
+    array, size = decode_rgb(rotated_jpeg(), 100)
+    assert size == (200, 400)
+    assert array.shape[0] > array.shape[1] >= 100
+
+
+def test_untagged_images_are_unchanged():
+    buf = io.BytesIO()
+    Image.new("RGB", (400, 200)).save(buf, format="JPEG")
+    array, size = decode_rgb(buf.getvalue())
+    assert size == (400, 200) and array.shape == (200, 400, 3)
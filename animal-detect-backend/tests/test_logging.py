@@ -0,0 +1,44 @@
+import logging
+import threading
+
+import backend.services.loggingService as loggingService
+from backend.services.loggingService import setup_async_logging, stop_async_logging
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+class Frame:
+    """Log argument that remembers which thread turned it into text."""
+    def __init__(self):
+        self.formatted_in = []
+
+    def __str__(self):
+        self.formatted_in.append(threading.current_thread().name)
+        return "frame 7"
+
+
+def test_records_are_formatted_by_the_listener(monkeypatch):
+    # Start a listener of our own even if an imported pipeline already started one
+    monkeypatch.setattr(loggingService, "_listener", None)
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    handler = RecordingHandler()
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+    frame = Frame()
+    try:
+        setup_async_logging(sample_every=1)
+        logging.info("got %s", frame)
+        stop_async_logging()
+    finally:
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+    assert handler.messages == ["got frame 7"]
+    assert frame.formatted_in and threading.current_thread().name not in frame.formatted_in
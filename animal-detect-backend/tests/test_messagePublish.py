@@ -0,0 +1,76 @@
+import time
+
+import bench.fakeIot as fakeIot
+
+fakeIot.install(latency_ms=0)
+
+from backend.services.alertDispatchService import AlertDispatcher  # noqa: E402
+from backend.services.messagePublishService import MessagePublish  # noqa: E402
+
+
+class FlakyShadow:
+    def __init__(self, failures):
+        self.failures = failures
+        self.payloads = []
+
+    def shadowUpdate(self, payload, callback, timeout):
+        if self.failures:
+            self.failures -= 1
+            raise TimeoutError("shadow update timed out")
+        self.payloads.append(payload)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_redundant_shadow_updates_are_skipped():
+    publisher = MessagePublish(shadow_min_interval_s=0, summary_interval_s=3600)
+    publisher.device_shadow = shadow = FlakyShadow(failures=0)
+    publisher.update_led_state("on")
+    publisher.update_led_state("on")
+    assert len(shadow.payloads) == 1
+    assert publisher.stats()["shadow_skipped"] == 1
+
+
+def test_failed_deferred_shadow_update_is_retried(monkeypatch):
+    monkeypatch.setattr("backend.services.messagePublishService.MQTT_SHADOW_RETRY_BASE_S", 0.01)
+    publisher = MessagePublish(shadow_min_interval_s=0.05, summary_interval_s=3600)
+    publisher.device_shadow = shadow = FlakyShadow(failures=2)
+    publisher.update_led_state("on")       # within the interval of the initial "off": deferred
+
+    assert wait_for(lambda: publisher.stats()["desired_led"] == "on")
+    assert publisher.stats()["shadow_retries"] == 2
+    assert shadow.payloads[-1] == '{"state": {"desired": {"led": "on"}}}'
+
+
+def test_safe_frames_are_summarised():
+    publisher = MessagePublish(summary_interval_s=3600)
+    sent = []
+    publisher.mqtt_client.publish = lambda topic, payload, qos: sent.append((payload, qos))
+    for _ in range(5):
+        publisher.record_safe_frame()
+    publisher.publish_summary()
+    assert len(sent) == 1
+    assert '"safe_frames":5' in sent[0][0] and sent[0][1] == 0
+
+
+def test_alert_retry_does_not_publish_twice():
+    publisher = MessagePublish(shadow_min_interval_s=0, summary_interval_s=3600)
+    publisher.device_shadow = shadow = FlakyShadow(failures=1)
+    dispatcher = AlertDispatcher(backoff_base=0.001, backoff_max=0.01)
+    dispatcher.register_sink("mqtt", {"threat": lambda message: publisher.publish_threat(message, raise_errors=True)})
+    published_before = publisher.stats()["published"]
+    dispatcher.dispatch("threat", {"danger": True, "threat": ["Tiger"]})
+    dispatcher.close(timeout=5)
+
+    stats = publisher.stats()
+    assert stats["published"] - published_before == 1
+    assert stats["republish_skipped"] == 1
+    assert stats["desired_led"] == "on"
+    assert len(shadow.payloads) == 1
@@ -0,0 +1,34 @@
+import io
+
+from PIL import Image
+
+from backend.services.motionGateService import MotionGate
+
+
+def jpeg(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (320, 240), color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_static_frames_are_skipped_until_something_moves():
+    gate = MotionGate(enabled=True)
+    assert gate.check(jpeg((0, 0, 0)), "cam")["motion"]         # first frame: no background yet
+    assert not gate.check(jpeg((0, 0, 0)), "cam")["motion"]
+    assert gate.check(jpeg((255, 255, 255)), "cam")["motion"]
+    assert gate.stats()["skipped_inferences"] == 1
+
+
+def test_threat_holds_the_gate_open():
+    gate = MotionGate(enabled=True)
+    gate.check(jpeg((0, 0, 0)), "cam")
+    gate.record_result("cam", {"Tiger"})
+    assert gate.check(jpeg((0, 0, 0)), "cam")["motion"]
+
+
+def test_cameras_are_bounded():
+    gate = MotionGate(enabled=True)
+    gate._cameras.max_cameras = 2
+    for camera_id in ("cam1", "cam2", "cam3"):
+        gate.check(jpeg((0, 0, 0)), camera_id)
+    assert sorted(gate.stats()["cameras"]) == ["cam2", "cam3"]
@@ -0,0 +1,80 @@
+import io
+
+import pytest
+from PIL import Image
+
+from backend.services.detectors import DETECTOR_BACKENDS
+from backend.services.detectors.baseDetector import DetectorBackend
+from backend.services.detectors.multiResolutionDetector import MultiResolutionDetector
+
+
+class RecordingDetector(DetectorBackend):
+    name = "Recording"
+    records = []
+    calls = []
+
+    def _detect(self, image_bytes):
+        RecordingDetector.calls.append(Image.open(io.BytesIO(image_bytes)).size)
+        # Only the first (coarse) pass finds anything
+        return RecordingDetector.records if len(RecordingDetector.calls) == 1 else []
+
+
+class BilledRecordingDetector(RecordingDetector):
+    billed = True
+
+
+@pytest.fixture(autouse=True)
+def inner_backends(monkeypatch):
+    backends = dict(DETECTOR_BACKENDS, recording="tests.test_multiResolution:RecordingDetector",
+                    billed="tests.test_multiResolution:BilledRecordingDetector")
+    monkeypatch.setattr("backend.services.detectors.DETECTOR_BACKENDS", backends)
+    RecordingDetector.records, RecordingDetector.calls = [], []
+
+
+def jpeg(size):
+    buf = io.BytesIO()
+    Image.new("RGB", size).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_only_threat_regions_are_refined():
+    RecordingDetector.records = [
+        {"label": "Tiger", "confidence": 0.9, "box": [10, 10, 100, 100]},
+        {"label": "Car", "confidence": 0.9, "box": [200, 200, 300, 300]},
+        {"label": "Person", "confidence": 0.9, "box": [300, 10, 400, 100]},
+    ]
+    detector = MultiResolutionDetector(inner="recording", coarse_size=640)
+    detector.detect(jpeg((1280, 960)))
+    assert len(RecordingDetector.calls) == 2
+
+
+def test_empty_downscaled_frame_is_tiled():
+    detector = MultiResolutionDetector(inner="recording", coarse_size=640, tiles=(2, 2))
+    detector.detect(jpeg((1280, 960)))
+    assert len(RecordingDetector.calls) == 1 + 4
+
+
+def test_no_tiles_when_the_coarse_pass_was_full_resolution():
+    detector = MultiResolutionDetector(inner="recording", coarse_size=640, tiles=(2, 2))
+    detector.detect(jpeg((640, 480)))
+    assert RecordingDetector.calls == [(640, 480)]
+
+
+def test_no_tiles_for_billed_backends_by_default():
+    detector = MultiResolutionDetector(inner="billed", coarse_size=640, tiles=(2, 2))
+    assert detector.billed
+    detector.detect(jpeg((1280, 960)))
+    assert len(RecordingDetector.calls) == 1
+
+    RecordingDetector.calls = []
+    MultiResolutionDetector(inner="billed", coarse_size=640, tiles=(2, 2), tile_billed=True).detect(jpeg((1280, 960)))
+    assert len(RecordingDetector.calls) == 5
+
+
+def test_rotated_frames_are_processed_upright():
+    from tests.test_imageDecode import rotated_jpeg
+
+    detector = MultiResolutionDetector(inner="recording", coarse_size=640, tiles=(2, 2))
+    detector.detect(rotated_jpeg(size=(1280, 960)))
+    assert RecordingDetector.calls[0] == (480, 640)
+    assert all(height > width for width, height in RecordingDetector.calls[1:])
@@ -0,0 +1,41 @@
+import pytest
+
+from backend.constants import DEFAULT_CAMERA_ID
+from backend.requestParams import get_camera_id, get_edge_metadata, parse_time
+
+
+def test_camera_id_from_form_then_header():
+    assert get_camera_id({"camera_id": "3"}, {"X-Camera-Id": "7"}) == "3"
+    assert get_camera_id({}, {"X-Camera-Id": "7"}) == "7"
+    assert get_camera_id({}, {}) == DEFAULT_CAMERA_ID
+
+
+def test_plain_upload_has_no_edge_metadata():
+    assert get_edge_metadata({"camera_id": "3"}) is None
+
+
+def test_valid_edge_metadata():
+    edge = get_edge_metadata({"edge_label": "Tiger", "edge_confidence": "0.9", "edge_boxes": "[[1, 2, 30, 40.5]]"})
+    assert edge == {"label": "Tiger", "confidence": 0.9, "boxes": [[1, 2, 30, 40.5]]}
+
+
+@pytest.mark.parametrize("form", [
+    {"edge_confidence": "high"},
+    {"edge_confidence": "1.5"},
+    {"edge_confidence": "nan"},
+    {"edge_confidence": "0.5", "edge_boxes": "[[1, 2"},
+    {"edge_confidence": "0.5", "edge_boxes": "{\"x\": 1}"},
+    {"edge_confidence": "0.5", "edge_boxes": "[[1, 2, 3]]"},
+    {"edge_confidence": "0.5", "edge_boxes": "[[1, 2, 3, \"4\"]]"},
+])
+def test_malformed_edge_metadata_is_rejected(form):
+    with pytest.raises(ValueError):
+        get_edge_metadata(form)
+
+
+def test_parse_time():
+    assert parse_time(None) is None
+    assert parse_time("1700000000") == 1700000000.0
+    assert parse_time("2024-05-01T00:00:00+00:00") == 1714521600.0
+    with pytest.raises(ValueError):
+        parse_time("yesterday")
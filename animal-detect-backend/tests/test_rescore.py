@@ -0,0 +1,82 @@
+import io
+import tarfile
+import threading
+
+from PIL import Image
+
+from backend import rescore
+
+
+def jpeg_bytes(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def write_tarball(path, count):
+    with tarfile.open(path, "w:gz") as tar:
+        for index in range(count):
+            data = jpeg_bytes((index * 20 % 256, 0, 0))
+            info = tarfile.TarInfo(f"cam1/frame{index:03d}.jpg")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def run_with_timeout(**kwargs):
+    # A regression here used to hang forever, so fail instead of blocking the suite
+    outcome = {}
+
+    def target():
+        try:
+            outcome["counters"] = rescore.run(**kwargs)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(30)
+    assert not thread.is_alive(), "rescore.run() hung"
+    return outcome
+
+
+def test_scores_tarball(tmp_path):
+    source = tmp_path / "frames.tgz"
+    write_tarball(source, 10)
+    outcome = run_with_timeout(source=str(source), output=str(tmp_path / "out.csv"), method="mock", batch_size=4)
+    assert outcome["counters"]["scored"] == 10
+
+
+def test_read_error_raises_instead_of_hanging(tmp_path, monkeypatch):
+    source = tmp_path / "frames.tgz"
+    write_tarball(source, 40)
+    real_iter_images = rescore.iter_images
+
+    def truncated(path):
+        # What a corrupt tarball looks like to run(): a few images, then a read error
+        for index, image in enumerate(real_iter_images(path)):
+            if index == 5:
+                raise tarfile.ReadError("unexpected end of data")
+            yield image
+
+    monkeypatch.setattr(rescore, "iter_images", truncated)
+    outcome = run_with_timeout(source=str(source), output=str(tmp_path / "out.csv"), method="mock", batch_size=4)
+    assert isinstance(outcome["error"], tarfile.ReadError)
+
+
+def test_writer_failure_raises_instead_of_hanging(tmp_path, monkeypatch):
+    source = tmp_path / "frames.tgz"
+    write_tarball(source, 40)
+
+    def broken_writer(output):
+        class Writer:
+            def write(self, rows):
+                raise OSError("disk full")
+
+            def close(self):
+                pass
+        return Writer()
+
+    monkeypatch.setattr(rescore, "open_writer", broken_writer)
+    outcome = run_with_timeout(source=str(source), output=str(tmp_path / "out.csv"), method="mock",
+                               batch_size=2, prefetch=1)
+    assert isinstance(outcome["error"], OSError)
@@ -0,0 +1,44 @@
+from backend.services.resultCacheService import DetectionCache
+
+
+def test_exact_hit_reuses_result():
+    cache = DetectionCache()
+    calls = []
+
+    def compute(image_bytes):
+        calls.append(image_bytes)
+        return {"Tiger"}
+
+    assert cache.get_or_compute(b"frame", "cam", compute) == {"Tiger"}
+    assert cache.get_or_compute(b"frame", "cam", compute) == {"Tiger"}
+    assert len(calls) == 1
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_results_are_per_camera():
+    cache = DetectionCache()
+    cache.get_or_compute(b"frame", "cam1", lambda image_bytes: {"Tiger"})
+    assert cache.get_or_compute(b"frame", "cam2", lambda image_bytes: set()) == set()
+
+
+def test_perceptual_matching_is_off_by_default():
+    assert DetectionCache().perceptual is False
+
+
+def test_disabled_cache_always_computes():
+    cache = DetectionCache(enabled=False)
+    calls = []
+    for _ in range(3):
+        cache.get_or_compute(b"frame", "cam", lambda image_bytes: calls.append(image_bytes) or set())
+    assert len(calls) == 3
+    assert cache.stats()["misses"] == 3
+
+
+def test_cameras_are_bounded():
+    cache = DetectionCache()
+    cache._cameras.max_cameras = 2
+    for camera_id in ("cam1", "cam2", "cam3"):
+        cache.get_or_compute(b"frame", camera_id, lambda image_bytes: {"Tiger"})
+    stats = cache.stats()
+    assert sorted(stats["entries"]) == ["cam2", "cam3"]
+    assert stats["evicted_cameras"] == 1
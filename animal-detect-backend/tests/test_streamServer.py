@@ -0,0 +1,59 @@
+import asyncio
+import gc
+
+import bench.fakeIot as fakeIot
+
+fakeIot.install(latency_ms=0)
+
+import websockets  # noqa: E402
+from websockets.frames import Close  # noqa: E402
+
+import backend.streamServer as streamServer  # noqa: E402
+
+
+async def fake_detection(image_bytes, camera_id):
+    await asyncio.sleep(0.05)
+    return {"success": True, "danger": False}
+
+
+def collect_loop_errors(coroutine):
+    async def run():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        await coroutine()
+        gc.collect()
+        await asyncio.sleep(0)
+        return errors
+
+    return asyncio.run(run())
+
+
+def test_client_disconnect_mid_detection_leaves_no_stray_task_errors(monkeypatch):
+    monkeypatch.setattr(streamServer.pipeline, "process_frame_async", fake_detection)
+
+    async def scenario():
+        async with websockets.serve(streamServer.handle_connection, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            async with websockets.connect(f"ws://127.0.0.1:{port}/?camera_id=cam") as client:
+                await client.send(b"frame")
+            await asyncio.sleep(0.2)
+
+    assert collect_loop_errors(scenario) == []
+
+
+class ClosedConnection:
+    async def send(self, data):
+        raise websockets.ConnectionClosed(Close(1001, "going away"), None)
+
+
+def test_send_to_a_closed_connection_ends_processing(monkeypatch):
+    monkeypatch.setattr(streamServer.pipeline, "process_frame_async", fake_detection)
+
+    async def scenario():
+        stream = streamServer.FrameStream(ClosedConnection(), "cam")
+        stream.frames.append((1, b"frame"))
+        stream.frame_ready.set()
+        await asyncio.wait_for(stream.process(), timeout=5)
+        assert stream.processed == 1
+
+    assert collect_loop_errors(scenario) == []
@@ -0,0 +1,40 @@
+import io
+
+from PIL import Image
+
+from backend.services.detectors.rekDetector import RekognitionDetector
+from backend.threat_labels import threat_taxonomy
+
+
+def test_domestic_pigs_are_not_threats():
+    assert threat_taxonomy.canonical("Pig") is None
+    assert threat_taxonomy.canonical("Hog") is None
+    assert threat_taxonomy.canonical("Wild Boar") == "Wild Boar"
+
+
+def test_unlisted_label_matches_through_its_parents():
+    assert threat_taxonomy.canonical("Clouded Leopard", parents=["Leopard", "Big Cat", "Animal"]) == "Leopard"
+    assert threat_taxonomy.canonical("House Cat", parents=["Cat", "Pet", "Animal"]) is None
+    records = [{"label": "Kodiak Bear", "confidence": 0.9, "box": None, "parents": ["Bear", "Mammal"]}]
+    assert threat_taxonomy.match_records(records) == {"Bear": 0.9}
+
+
+class FakeRekognition:
+    def detect_labels(self, **request):
+        return {"Labels": [
+            {"Name": "Clouded Leopard", "Confidence": 91.0, "Parents": [{"Name": "Leopard"}, {"Name": "Animal"}],
+             "Instances": [{"Confidence": 90.0,
+                            "BoundingBox": {"Left": 0.1, "Top": 0.2, "Width": 0.5, "Height": 0.5}}]},
+            {"Name": "Forest", "Confidence": 99.0, "Parents": [], "Instances": []},
+        ]}
+
+
+def test_rekognition_parents_reach_the_taxonomy():
+    detector = RekognitionDetector()
+    detector.rekognition_client = FakeRekognition()
+    buf = io.BytesIO()
+    Image.new("RGB", (200, 100)).save(buf, format="JPEG")
+    records = detector._detect(buf.getvalue())
+    assert records[0] == {"label": "Clouded Leopard", "confidence": 0.9, "box": [20, 20, 120, 70],
+                          "parents": ["Leopard", "Animal"]}
+    assert threat_taxonomy.match_records(records) == {"Leopard": 0.9}
@@ -0,0 +1,73 @@
+from backend.services.trackerService import ObjectTracker
+
+
+def tiger(box, confidence=0.9):
+    return {"label": "Tiger", "confidence": confidence, "box": box}
+
+
+def make_tracker(**options):
+    options.setdefault("detect_every", 5)
+    return ObjectTracker(enabled=True, **options)
+
+
+def test_moving_animal_keeps_its_track_id():
+    tracker = make_tracker()
+    first = tracker.update("cam", [tiger([0, 0, 20, 100])], now=0.0)
+    second = tracker.update("cam", [tiger([10, 0, 30, 100])], now=1.0)
+    # Moved past the predicted box: no overlap, but the centroid is within a quarter diagonal
+    third = tracker.update("cam", [tiger([40, 0, 60, 100])], now=2.0)
+    assert first[0]["track_id"] == second[0]["track_id"] == third[0]["track_id"]
+    assert third[0]["hits"] == 3
+
+
+def test_predicted_frames_follow_the_velocity():
+    tracker = make_tracker()
+    assert tracker.predict("cam", now=0.0) is None          # nothing tracked yet
+    tracker.update("cam", [tiger([0, 0, 100, 100])], now=0.0)
+    assert tracker.predict("cam", now=0.5) is None          # a new track has no velocity yet
+    tracker.update("cam", [tiger([10, 0, 110, 100])], now=1.0)
+
+    predicted = tracker.predict("cam", now=2.0)
+    assert predicted is not None
+    assert predicted[0]["box"] == [15, 0, 115, 100]         # half the measured speed after smoothing
+    assert tracker.stats()["skipped_inferences"] == 1
+
+
+def test_detector_runs_again_every_detect_every_frames():
+    tracker = make_tracker(detect_every=3)
+    tracker.update("cam", [tiger([0, 0, 100, 100])], now=0.0)
+    tracker.update("cam", [tiger([0, 0, 100, 100])], now=0.1)
+    assert tracker.predict("cam", now=0.2) is not None
+    assert tracker.predict("cam", now=0.3) is not None
+    assert tracker.predict("cam", now=0.4) is None
+
+
+def test_labels_and_cameras_are_tracked_separately():
+    tracker = make_tracker()
+    tiger_track = tracker.update("cam1", [tiger([0, 0, 100, 100])], now=0.0)[0]["track_id"]
+    bear = tracker.update("cam1", [{"label": "Bear", "confidence": 0.9, "box": [0, 0, 100, 100]}], now=1.0)
+    other_camera = tracker.update("cam2", [tiger([0, 0, 100, 100])], now=1.0)
+    assert bear[0]["track_id"] != tiger_track
+    assert other_camera[0]["track_id"] not in (tiger_track, bear[0]["track_id"])
+
+
+def test_boxless_labels_disable_tracking():
+    tracker = make_tracker()
+    tracker.update("cam", [tiger([0, 0, 100, 100])], now=0.0)
+    assert tracker.update("cam", [tiger(None)], now=1.0) == []
+    assert tracker.predict("cam", now=1.1) is None
+
+
+def test_disabled_tracker_always_detects():
+    tracker = ObjectTracker(enabled=False)
+    tracker.update("cam", [tiger([0, 0, 100, 100])], now=0.0)
+    tracker.update("cam", [tiger([0, 0, 100, 100])], now=0.1)
+    assert tracker.predict("cam", now=0.2) is None
+
+
+def test_cameras_are_bounded():
+    tracker = make_tracker()
+    tracker._cameras.max_cameras = 2
+    for index, camera_id in enumerate(("cam1", "cam2", "cam3")):
+        tracker.update(camera_id, [tiger([0, 0, 100, 100])], now=float(index))
+    assert sorted(tracker.stats()["cameras"]) == ["cam2", "cam3"]
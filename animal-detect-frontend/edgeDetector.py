@@ -0,0 +1,178 @@
+import ast
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import requests
+from PIL import Image
+
+# ----- edge detection configuration (override with environment variables) -----
+BACKEND_URL = os.getenv("BACKEND_URL", "http://172.20.10.2:5002/detect_photo")
+CAMERA_ID = os.getenv("CAMERA_ID", "default")
+EDGE_ONNX_MODEL = os.getenv("EDGE_ONNX_MODEL")           # optional YOLOv5 .onnx; motion-only when unset
+EDGE_MIN_CONFIDENCE = float(os.getenv("EDGE_MIN_CONFIDENCE", "0.4"))
+EDGE_UPLOAD_COOLDOWN_S = float(os.getenv("EDGE_UPLOAD_COOLDOWN_S", "1.0"))
+MOTION_WIDTH = 160
+MOTION_ALPHA = 0.05
+MOTION_PIXEL_THRESHOLD = 25
+MOTION_MIN_CHANGED_FRACTION = 0.005
+# COCO classes that count as a candidate animal for the backend to confirm
+ANIMAL_CLASSES = {"bird", "cat", "dog", "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe"}
+# -------------------------------------------------------------------------------
+
+
+class MotionDetector:
+    def __init__(self):
+        """
+        Running-average background model on a small grayscale copy of the frame.
+        """
+        self.background = None
+
+    def detect(self, arr):
+        """
+        :param arr: HxWx3 RGB frame.
+        :return: (fraction of changed pixels, [x1, y1, x2, y2] motion box in frame pixels, or None)
+        """
+        height = max(1, round(MOTION_WIDTH * arr.shape[0] / arr.shape[1]))
+        small = Image.fromarray(arr, "RGB").convert("L").resize((MOTION_WIDTH, height), Image.BILINEAR)
+        frame = np.asarray(small, dtype=np.float32)
+        if self.background is None or self.background.shape != frame.shape:
+            self.background = frame
+            return 0.0, None
+
+        mask = np.abs(frame - self.background) > MOTION_PIXEL_THRESHOLD
+        self.background += MOTION_ALPHA * (frame - self.background)
+        score = float(mask.mean())
+        if score < MOTION_MIN_CHANGED_FRACTION:
+            return score, None
+
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        scale_x = arr.shape[1] / frame.shape[1]
+        scale_y = arr.shape[0] / frame.shape[0]
+        box = [int(cols[0] * scale_x), int(rows[0] * scale_y),
+               min(arr.shape[1], int((cols[-1] + 1) * scale_x)), min(arr.shape[0], int((rows[-1] + 1) * scale_y))]
+        return score, box
+
+
+class OnnxAnimalDetector:
+    def __init__(self, model_path, input_size=320, conf_threshold=EDGE_MIN_CONFIDENCE):
+        """
+        Small YOLOv5 ONNX model (e.g. yolov5n exported at 320px) run on the Pi's CPU.
+        Only the best animal box is needed here, so there is no full NMS.
+        """
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.input_size = input_size
+        self.conf_threshold = conf_threshold
+        names = ast.literal_eval(self.session.get_modelmeta().custom_metadata_map.get("names", "{}"))
+        self.animal_ids = np.array([i for i, name in dict(names).items() if name in ANIMAL_CLASSES]) if names else None
+        self.names = dict(names)
+
+    def detect(self, arr):
+        """
+        :return: (label, confidence, [x1, y1, x2, y2]) of the most confident animal, or None.
+        """
+        height, width = arr.shape[:2]
+        scale = min(self.input_size / height, self.input_size / width)
+        resized = np.asarray(Image.fromarray(arr, "RGB").resize((round(width * scale), round(height * scale))))
+        padded = np.full((self.input_size, self.input_size, 3), 114, dtype=np.uint8)
+        padded[:resized.shape[0], :resized.shape[1]] = resized
+        blob = (padded.transpose(2, 0, 1)[None] / 255.0).astype(np.float32)
+
+        predictions = self.session.run(None, {self.input_name: blob})[0][0]
+        if self.animal_ids is None or not len(self.animal_ids):
+            return None
+        scores = predictions[:, 5 + self.animal_ids] * predictions[:, 4:5]
+        best_row, best_col = np.unravel_index(scores.argmax(), scores.shape)
+        confidence = float(scores[best_row, best_col])
+        if confidence < self.conf_threshold:
+            return None
+        cx, cy, w, h = predictions[best_row, :4] / scale
+        box = [max(0, int(cx - w / 2)), max(0, int(cy - h / 2)), min(width, int(cx + w / 2)), min(height, int(cy + h / 2))]
+        return self.names[int(self.animal_ids[best_col])], confidence, box
+
+
+class EdgeDetector:
+    def __init__(self, backend_url=BACKEND_URL, camera_id=CAMERA_ID, onnx_model=EDGE_ONNX_MODEL):
+        """
+        Runs the motion check (and the ONNX animal detector, when configured) on the camera
+        itself and uploads a frame to the backend only when a candidate animal shows up.
+        Analysis runs on its own thread; frames arriving while it is busy are skipped.
+        """
+        self.backend_url = backend_url
+        self.camera_id = camera_id
+        self.motion = MotionDetector()
+        self.detector = OnnxAnimalDetector(onnx_model) if onnx_model else None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="EdgeDetector")
+        self.session = requests.Session()   # keep-alive connection to the backend
+        self._busy = threading.Lock()
+        self._last_upload = 0.0
+        self._hold = False          # backend confirmed a threat: keep checking even without motion
+        self.frames = 0
+        self.analyzed = 0
+        self.uploads = 0
+
+    def submit(self, arr, jpeg):
+        """
+        Hands a captured frame (RGB array and its JPEG encoding) to the edge check without blocking.
+        """
+        self.frames += 1
+        if not self._busy.acquire(blocking=False):
+            return
+        self.executor.submit(self._analyze, arr, jpeg)
+
+    def stats(self):
+        return {"frames": self.frames, "analyzed": self.analyzed, "uploads": self.uploads}
+
+    def _analyze(self, arr, jpeg):
+        try:
+            self.analyzed += 1
+            score, box = self.motion.detect(arr)
+            if box is None:
+                if not self._hold:
+                    return
+                # A confirmed animal may be standing still; keep sending the whole frame
+                box = [0, 0, arr.shape[1], arr.shape[0]]
+            label, confidence = None, score
+            if self.detector is not None:
+                found = self.detector.detect(arr)
+                if found is None:
+                    return
+                label, confidence, box = found
+            if time.monotonic() - self._last_upload < EDGE_UPLOAD_COOLDOWN_S:
+                return
+            self._upload(arr, jpeg, label, confidence, box)
+        except Exception as e:
+            print("[EdgeDetector] Frame analysis failed:", e)
+        finally:
+            self._busy.release()
+
+    def _upload(self, arr, jpeg, label, confidence, box):
+        x1, y1, x2, y2 = box
+        files = {"image": ("frame.jpg", jpeg, "image/jpeg")}
+        if x2 > x1 and y2 > y1:
+            crop = BytesIO()
+            Image.fromarray(arr[y1:y2, x1:x2], "RGB").save(crop, format="JPEG", quality=90)
+            files["crop"] = ("crop.jpg", crop.getvalue(), "image/jpeg")
+        self._last_upload = time.monotonic()
+        response = self.session.post(
+            self.backend_url,
+            files=files,
+            data={
+                "camera_id": self.camera_id,
+                "edge_label": label or "",
+                "edge_confidence": f"{confidence:.3f}",
+                "edge_boxes": json.dumps([box]),
+            },
+            timeout=10,
+        )
+        self.uploads += 1
+        self._hold = response.ok and bool(response.json().get("danger"))
+        print(f"[EdgeDetector] Uploaded candidate {label or 'motion'} ({confidence:.2f}) -> {response.status_code} {response.text.strip()}")
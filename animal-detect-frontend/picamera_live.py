@@ -1,36 +1,178 @@
 import asyncio
+import os
+import time
 import websockets
 import base64
 
+from concurrent.futures import ThreadPoolExecutor
 from picamera2 import Picamera2
 from io import BytesIO
 from PIL import Image
 
+# ----- stream configuration (override with environment variables) -----
+FRAME_SIZE = (int(os.getenv("FRAME_WIDTH", "640")), int(os.getenv("FRAME_HEIGHT", "480")))
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "80"))
+TARGET_FPS = float(os.getenv("TARGET_FPS", "30"))
+BINARY_FRAMES = os.getenv("BINARY_FRAMES", "0") == "1"   # opt-in: raw JPEG bytes instead of base64 data: URLs
+STATS_INTERVAL_S = 10                                     # how often per-client lag stats are printed
+EDGE_MODE = os.getenv("EDGE_MODE", "0") == "1"             # detect on the Pi, upload only candidate frames
+# -----------------------------------------------------------------------
+
 picam = Picamera2()
 print(picam.is_open)
-picam.configure(picam.create_preview_configuration(main={"size": (640,480)}))
+# libcamera names formats by word order: "BGR888" is R, G, B in memory, which is PIL's "RGB".
+# Capturing 3-channel RGB directly skips the RGBA -> RGB conversion on every frame.
+picam.configure(picam.create_preview_configuration(main={"size": FRAME_SIZE, "format": "BGR888"}))
 picam.start()
 
 
-def get_frames():
-    while True:
-        arr = picam.capture_array()           # RGBA
-        img = Image.fromarray(arr).convert("RGB")   # ➜ RGB
-        buf = BytesIO()
-        img.save(buf, format="JPEG", quality=80)
-        yield b"data:image/jpeg;base64," + base64.b64encode(buf.getvalue())
+class FrameEncoder:
+    def __init__(self, quality=JPEG_QUALITY):
+        """
+        Captures and JPEG-encodes frames on one worker thread so the event loop never blocks.
+        The output buffer is reused between frames instead of allocating a new one each time.
+        """
+        self.quality = quality
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="FrameEncoder")
+        self._buf = BytesIO()
+
+    def capture_and_encode(self):
+        arr = picam.capture_array()           # RGB
+        self._buf.seek(0)
+        self._buf.truncate()
+        Image.fromarray(arr, "RGB").save(self._buf, format="JPEG", quality=self.quality)
+        return arr, self._buf.getvalue()
+
+    async def next_frame(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.capture_and_encode)
+
+
+class ClientStream:
+    def __init__(self, connection):
+        """
+        Per-viewer queue holding at most one frame: a slow viewer skips stale
+        frames instead of falling behind or slowing the camera down.
+        """
+        self.connection = connection
+        self.queue = asyncio.Queue(maxsize=1)
+        self.sent = 0
+        self.dropped = 0
+        self.last_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+
+    def offer(self, frame):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+    def record_sent(self, captured_at):
+        # Lag = time from capture until the frame was handed to this viewer's socket
+        self.last_lag_ms = (time.monotonic() - captured_at) * 1000
+        self.total_lag_ms += self.last_lag_ms
+        self.sent += 1
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "last_lag_ms": round(self.last_lag_ms, 1),
+            "mean_lag_ms": round(self.total_lag_ms / self.sent, 1) if self.sent else 0.0,
+        }
+
+
+class FrameBroadcaster:
+    def __init__(self, encoder, target_fps=TARGET_FPS, edge=None):
+        """
+        One producer captures and encodes each frame once and fans it out to every viewer,
+        so CPU cost stays the same whatever the number of viewers.
+        :param edge: Optional EdgeDetector that also gets every frame.
+        """
+        self.encoder = encoder
+        self.edge = edge
+        self.interval = 1 / target_fps
+        self.clients = {}
+        self.latest = None              # (seq, captured_at, frame) of the newest frame
+        self._has_clients = asyncio.Event()
+        if edge is not None:
+            # Edge detection needs frames even when nobody is watching
+            self._has_clients.set()
+
+    def add(self, connection):
+        client = ClientStream(connection)
+        self.clients[connection] = client
+        if self.latest is not None:
+            client.offer(self.latest)   # new viewers see something immediately
+        self._has_clients.set()
+        return client
+
+    def remove(self, connection):
+        self.clients.pop(connection, None)
+        if not self.clients and self.edge is None:
+            self._has_clients.clear()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        seq = 0
+        while True:
+            # Do not capture at all while nobody is watching
+            await self._has_clients.wait()
+            started = loop.time()
+            arr, jpeg = await self.encoder.next_frame()
+            captured_at = time.monotonic()
+            if self.edge is not None:
+                self.edge.submit(arr, jpeg)
+            seq += 1
+            if BINARY_FRAMES:
+                frame = jpeg
+            else:
+                # Default text mode: existing viewers expect a data: URL
+                frame = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii")
+            self.latest = (seq, captured_at, frame)
+            for client in list(self.clients.values()):
+                client.offer(self.latest)
+            # Pace to the target FPS, counting the time capture and encoding already took
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+
+    async def report(self, every_s=STATS_INTERVAL_S):
+        while True:
+            await asyncio.sleep(every_s)
+            if self.clients:
+                print("[Stream] Per-client stats:",
+                      {str(conn.remote_address): client.stats() for conn, client in self.clients.items()})
+            if self.edge is not None:
+                print("[Stream] Edge detection stats:", self.edge.stats())
+
+
+encoder = FrameEncoder()
+broadcaster = None
+
 
 async def handle_connection(connection):
     print("Client connected")
+    client = broadcaster.add(connection)
     try:
         # connection.recv() / connection.send() instead of websocket.recv()/send()
-        for frame in get_frames():
-            await connection.send(frame.decode("utf-8"))
-            await asyncio.sleep(0.03)
+        while True:
+            _, captured_at, frame = await client.queue.get()
+            await connection.send(frame)
+            client.record_sent(captured_at)
     except Exception as e:
         print("Connection error:", e)
+    finally:
+        broadcaster.remove(connection)
+        print("Client disconnected:", client.stats())
 
 async def main():
+    global broadcaster
+    edge = None
+    if EDGE_MODE:
+        from edgeDetector import EdgeDetector
+        edge = EdgeDetector()
+    broadcaster = FrameBroadcaster(encoder, edge=edge)
+    # Keep references so the background tasks are not garbage-collected
+    tasks = [asyncio.create_task(broadcaster.run()), asyncio.create_task(broadcaster.report())]
     async with websockets.serve(handle_connection, "0.0.0.0", 8000):
         print("WebSocket server started at ws://0.0.0.0:8000")
         await asyncio.Future()  # Run forever